@@ -0,0 +1,374 @@
+# 性能基准：用固定随机种子生成假的客户和跟进记录，在几个数据量下给各个热点路径计时，结果写成 JSON，
+# 不同版本各跑一次，用 --compare 对比就知道哪里变快/变慢了
+#   python benchmark.py --scales 1000 10000 --out bench.json        全部（需要本地 MySQL，库名见 --database）
+#   python benchmark.py --offline --scales 10000 100000              只测不连数据库的部分（Excel 类型转换、搜索索引）
+#   python benchmark.py --compare old.json new.json                  对比两次结果（按中位数）
+# 数据库路径的 SQL 是 MySQL 专用的（LAST_INSERT_ID、REGEXP、RENAME TABLE、GET_LOCK），没法拿 SQLite 代替；
+# 数据库基准只在单独的库里跑（默认 client_db_bench，每个数据量都删库重建），不会碰到正式数据
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DATABASE = "client_db_bench"
+DEFAULT_SCALES = [1000, 10000]
+FOLLOW_PER_CLIENT = 5   # 平均每个客户几条跟进记录
+DEFAULT_SEED = 42
+QUERY_REPEAT = 5        # 查询类基准每个跑几次取中位数
+SAMPLE_CLIENTS = 50     # 跟进记录/客户详情基准随机抽几个客户
+CHANGED_RATIO = 0.01    # 增量同步、差量同步基准改动的客户比例
+INSERT_BATCH = 5000     # 造数据时每批 INSERT 的行数
+
+COUNTRIES = ["美国", "德国", "英国", "法国", "澳大利亚", "巴西", "墨西哥", "南非", "尼日利亚", "肯尼亚",
+             "印度", "巴基斯坦", "菲律宾", "越南", "泰国", "马来西亚", "沙特", "阿联酋", "土耳其", "波兰"]
+PRODUCTS = ["光伏系统", "储能柜", "逆变器", "光伏板", "水泵", "锂电池", "充电桩", "离网系统"]
+GRADES = ["L0", "L1", "L2", "L3", "A", "B", "C"]
+FIRST_NAMES = ["John", "Maria", "Ahmed", "Aylin", "Carlos", "Fatima", "David", "Chen", "Olga", "Samuel",
+               "Priya", "Lucas", "Amina", "Mohammed", "Sophie", "Ivan", "Grace", "Omar", "Nguyen", "Hassan"]
+LAST_NAMES = ["Smith", "Garcia", "Khan", "Barbado", "Silva", "Okafor", "Muller", "Wang", "Petrova", "Brown",
+              "Patel", "Santos", "Diallo", "Ali", "Martin", "Ivanov", "Mwangi", "Haddad", "Tran", "Yilmaz"]
+ZH_PHRASES = ["客户询价", "发送报价", "客户未回复", "继续跟进", "改方案", "客户说需要", "已重新报价", "问运费",
+              "要样品", "考虑到预算", "下周再联系", "确认规格", "发了产品目录", "客户在比价", "约了视频会议",
+              "了解需求", "快速报价了", "需要变频柜", "储能方案", "付款方式待定"]
+EN_WORDS = ["please", "send", "price", "for", "solar", "system", "battery", "inverter", "kw", "shipping",
+            "quotation", "need", "details", "warranty", "installation", "delivery", "time", "pump", "panel", "offer"]
+
+
+# ---------------------- 造数据（固定种子，同样的参数每次生成一样的数据） ----------------------
+def random_text(rng, min_chars, max_chars):
+    """中英混合的一段文字，长度在 [min_chars, max_chars] 之间（中文短句为主，夹一些英文原话）"""
+    target = rng.randint(min_chars, max_chars)
+    parts, length = [], 0
+    while length < target:
+        if rng.random() < 0.7:
+            part = rng.choice(ZH_PHRASES) + rng.choice(["，", "。", "；"])
+        else:
+            part = " ".join(rng.choice(EN_WORDS) for _ in range(rng.randint(3, 8))) + ". "
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:target]
+
+
+def generate_clients(n, seed):
+    """n 个客户（dict 列表，列和 new_quote 一样，不含 Id）；国家+名字 不重复"""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    seen = set()
+    clients = []
+    for i in range(n):
+        country = rng.choice(COUNTRIES)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if (country, name) in seen:
+            name = f"{name} {i}"
+        seen.add((country, name))
+        quote_date = start + timedelta(days=rng.randint(0, 700))
+        clients.append({
+            "时间": f"第{rng.randint(1, 52)}周",
+            "日期": quote_date,
+            "等级": rng.choice(GRADES),
+            "名字": name,
+            "国家": country,
+            "产品": rng.choice(PRODUCTS),
+            "询盘信息": random_text(rng, 20, 400),
+            "客户评价": random_text(rng, 0, 80),
+            "最近跟进日期": quote_date + timedelta(days=rng.randint(0, 60)),
+            "跟进情况": random_text(rng, 10, 300),
+        })
+    return clients
+
+
+def assign_bench_ids(clients):
+    """按 KZ + 日期 + 当天序号 给造出来的客户编 Id（和正式规则一样），返回 Id 列表"""
+    from client_ids import ID_PREFIX, convert_date_format
+    per_day = {}
+    ids = []
+    for client in clients:
+        day = client["日期"]
+        per_day[day] = per_day.get(day, 0) + 1
+        ids.append(convert_date_format(ID_PREFIX, per_day[day], day))
+    return ids
+
+
+def generate_follow_records(client_ids, clients, per_client, seed):
+    """平均每个客户 per_client 条跟进记录（条数随机），时间在询盘日期之后"""
+    rng = random.Random(seed + 1)
+    records = []
+    for client_id, client in zip(client_ids, clients):
+        base = datetime.combine(client["日期"], datetime.min.time())
+        for _ in range(rng.randint(0, per_client * 2)):
+            records.append({
+                "Id": client_id,
+                "跟进时间": base + timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                "跟进情况": random_text(rng, 10, 300),
+            })
+    return records
+
+
+def write_workbook(path, clients, sheet_name):
+    """把客户写成和正式 Excel 一样表头的工作簿（openpyxl 只写模式，大文件也不占内存）"""
+    from openpyxl import Workbook
+    from excel_import import DATE_COLUMNS
+    columns = ["时间", "日期", "等级", "国家", "名字", "客户评价", "产品", "询盘信息", "最近跟进日期", "跟进情况"]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(columns)
+    for client in clients:
+        sheet.append([client[col] if col in DATE_COLUMNS else str(client[col]) for col in columns])
+    workbook.save(path)
+
+
+# ---------------------- 计时 ----------------------
+def measure(results, scale, name, func, repeat=1, rows=None, verbose=False):
+    """跑 repeat 次 func 记下每次的秒数，结果追加到 results；函数里的打印默认吞掉，不干扰输出"""
+    seconds = []
+    for _ in range(repeat):
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with sink:
+            started = time.perf_counter()
+            func()
+            seconds.append(time.perf_counter() - started)
+    result = {"scale": scale, "bench": name, "repeat": repeat, "seconds": seconds,
+              "median": statistics.median(seconds), "min": min(seconds)}
+    if rows is not None:
+        result["rows"] = rows
+        result["rows_per_sec"] = rows / result["median"] if result["median"] else None
+    results.append(result)
+    print(f"  {name:<28} 中位数 {result['median'] * 1000:10.3f} ms" + (f"（{rows} 行）" if rows is not None else ""))
+    return result
+
+
+# ---------------------- 不连数据库的基准 ----------------------
+def run_offline(results, scale, seed, verbose):
+    import pandas as pd
+    from excel_import import normalize_frame, row_hashes
+    from search_index import ClientSearchIndex
+
+    clients = generate_clients(scale, seed)
+    # Excel 读出来都是文本（日期是序列号），和 read_excel(dtype=str) 一样
+    raw = pd.DataFrame([{**c, "日期": str((c["日期"] - date(1899, 12, 30)).days),
+                         "最近跟进日期": c["最近跟进日期"].isoformat()} for c in clients])
+    measure(results, scale, "excel.normalize_frame", lambda: normalize_frame(raw.copy()), repeat=3,
+            rows=scale, verbose=verbose)
+    normalized, _ = normalize_frame(raw.copy())
+    measure(results, scale, "excel.row_hashes", lambda: row_hashes(normalized), repeat=3, rows=scale, verbose=verbose)
+
+    index = ClientSearchIndex()
+
+    def build_index():
+        index.clear()
+        for i, client in enumerate(clients):
+            index.add(i, client)
+
+    measure(results, scale, "search.build_index", build_index, rows=scale, verbose=verbose)
+    measure(results, scale, "search.query", lambda: [index.search(word) for word in ("john", "美国", "光伏", "smi")],
+            repeat=QUERY_REPEAT, verbose=verbose)
+
+
+# ---------------------- 连数据库的基准 ----------------------
+def reset_database(database):
+    """删库重建、升级到最新表结构（每个数据量从干净的库开始）"""
+    from sqlalchemy import text
+    from db import dispose_engines, get_engine
+    from migrations import CLIENT_MIGRATIONS, run_migrations
+    with get_engine("").connect() as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS `{database}`"))
+        conn.execute(text(f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"))
+    dispose_engines()  # 连接池里的连接还指着删掉的库
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_migrations(get_engine(), CLIENT_MIGRATIONS)
+
+
+def insert_rows(conn, table, rows):
+    from sqlalchemy import text
+    columns = list(rows[0])
+    sql = text(f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c in columns)}) "
+               f"VALUES ({', '.join(f':{c}' for c in columns)})")
+    for start in range(0, len(rows), INSERT_BATCH):
+        conn.execute(sql, rows[start:start + INSERT_BATCH])
+        conn.commit()
+
+
+def run_database(results, scale, seed, per_client, workdir, verbose):
+    from sqlalchemy import text
+    from client_ids import assign_missing_ids
+    from db import get_engine
+    from excel_import import EXCEL_SHEET_NAME, import_excel_streaming, sync_excel
+    from migrations import create_id_sequence_table
+    from queries import (CLIENT_PAGE_SIZE, FOLLOW_PAGE_SIZE, follow_cursor, query_changed_clients,
+                         query_client_page, query_client_prefetch, query_follow_page, query_sync_watermark)
+
+    rng = random.Random(seed + 2)
+    clients = generate_clients(scale, seed)
+    client_ids = assign_bench_ids(clients)
+    follow_records = generate_follow_records(client_ids, clients, per_client, seed)
+    with get_engine().connect() as conn:
+        measure(results, scale, "seed.insert_clients",
+                lambda: insert_rows(conn, "new_quote", [dict(c, Id=i) for c, i in zip(clients, client_ids)]),
+                rows=scale, verbose=verbose)
+        measure(results, scale, "seed.insert_follow_records",
+                lambda: insert_rows(conn, "follow_up_record", follow_records), rows=len(follow_records),
+                verbose=verbose)
+        create_id_sequence_table(conn)  # 按造好的 Id 设好序号表的起点
+        conn.commit()
+
+    # 主表格：第一页、把整张表一页页翻完（load_data）、带筛选的第一页
+    def scroll_all():
+        after = None
+        while True:
+            rows = query_client_page("日期", True, after, CLIENT_PAGE_SIZE)
+            if len(rows) < CLIENT_PAGE_SIZE:
+                return
+            after = (rows[-1]["日期"], rows[-1]["Id"])
+
+    measure(results, scale, "clients.first_page", lambda: query_client_page("日期", True, None, CLIENT_PAGE_SIZE),
+            repeat=QUERY_REPEAT, verbose=verbose)
+    measure(results, scale, "clients.scroll_all", scroll_all, rows=scale, verbose=verbose)
+    measure(results, scale, "clients.filtered_page",
+            lambda: query_client_page("日期", True, None, CLIENT_PAGE_SIZE, {"grade": "A", "country": "美"}),
+            repeat=QUERY_REPEAT, verbose=verbose)
+
+    # 增量同步（update_table）：改 1% 的客户，查水位线之后变了的行
+    watermark = query_sync_watermark()
+    changed = rng.sample(client_ids, max(1, int(scale * CHANGED_RATIO)))
+    time.sleep(0.01)  # 保证改动的「更新时间」晚于水位线
+    with get_engine().connect() as conn:
+        conn.execute(text("UPDATE new_quote SET `客户评价` = CONCAT(`客户评价`, '!') WHERE `Id` = :cid"),
+                     [{"cid": cid} for cid in changed])
+        conn.commit()
+    measure(results, scale, "clients.changed_since", lambda: query_changed_clients(watermark),
+            repeat=QUERY_REPEAT, rows=len(changed), verbose=verbose)
+
+    # 时间轴（load_time_line）：最新一页 + 往前翻一页；客户详情预取
+    sample = rng.sample(client_ids, min(SAMPLE_CLIENTS, scale))
+
+    def timeline_pages():
+        for cid in sample:
+            rows = query_follow_page(cid, None, FOLLOW_PAGE_SIZE)
+            if rows:
+                query_follow_page(cid, follow_cursor(rows[-1]), FOLLOW_PAGE_SIZE)
+
+    measure(results, scale, "timeline.pages", timeline_pages, repeat=QUERY_REPEAT, rows=len(sample), verbose=verbose)
+    measure(results, scale, "client.prefetch", lambda: [query_client_prefetch(cid, FOLLOW_PAGE_SIZE) for cid in sample],
+            repeat=QUERY_REPEAT, rows=len(sample), verbose=verbose)
+
+    # Id 回填：拷一份没有 Id 的客户表，按批 UPDATE ... JOIN 生成
+    with get_engine().connect() as conn:
+        conn.execute(text("CREATE TABLE bench_backfill LIKE new_quote"))
+        conn.execute(text("ALTER TABLE bench_backfill DROP PRIMARY KEY, MODIFY `Id` VARCHAR(50) NULL"))
+        conn.execute(text("""
+            INSERT INTO bench_backfill (`时间`, `日期`, `等级`, `名字`, `国家`, `产品`, `询盘信息`, `客户评价`,
+                                        `最近跟进日期`, `跟进情况`)
+            SELECT `时间`, `日期`, `等级`, `名字`, `国家`, `产品`, `询盘信息`, `客户评价`, `最近跟进日期`, `跟进情况`
+            FROM new_quote
+        """))
+        conn.commit()
+        measure(results, scale, "ids.backfill", lambda: assign_missing_ids(conn, "bench_backfill"), rows=scale,
+                verbose=verbose)
+        conn.execute(text("DROP TABLE bench_backfill"))
+
+    # Excel：整表导入（staging + 换表），然后改 1% 的客户做差量同步，再同步一次没变的
+    workbook = os.path.join(workdir, f"bench_{scale}.xlsx")
+    write_workbook(workbook, clients, EXCEL_SHEET_NAME)
+    measure(results, scale, "excel.import_streaming",
+            lambda: import_excel_streaming(workbook, EXCEL_SHEET_NAME, "new_quote"), rows=scale, verbose=verbose)
+    edited = [dict(c) for c in clients]
+    for i in rng.sample(range(scale), max(1, int(scale * CHANGED_RATIO))):
+        edited[i]["跟进情况"] += " 已更新"
+    edited_workbook = os.path.join(workdir, f"bench_{scale}_edited.xlsx")
+    write_workbook(edited_workbook, edited, EXCEL_SHEET_NAME)
+    measure(results, scale, "excel.sync_changed", lambda: sync_excel(edited_workbook, EXCEL_SHEET_NAME), rows=scale,
+            verbose=verbose)
+    measure(results, scale, "excel.sync_unchanged", lambda: sync_excel(edited_workbook, EXCEL_SHEET_NAME), rows=scale,
+            verbose=verbose)
+
+
+# ---------------------- 结果 ----------------------
+def git_version():
+    """当前代码版本（git 提交号），不是 git 仓库时返回 None"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    """按 (数据量, 基准名) 对比两次结果的中位数，打印变化比例"""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["scale"], r["bench"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    print(f"{'数据量':>8}  {'基准':<28} {'旧(ms)':>10} {'新(ms)':>10} {'变化':>8}")
+    for result in new:
+        before = old.get((result["scale"], result["bench"]))
+        if before is None:
+            continue
+        change = result["median"] / before["median"] - 1 if before["median"] else 0
+        print(f"{result['scale']:>8}  {result['bench']:<28} {before['median'] * 1000:>10.3f} "
+              f"{result['median'] * 1000:>10.3f} {change:>+8.1%}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="客户管理系统性能基准")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="客户数量（可以给多个）")
+    parser.add_argument("--follow-per-client", type=int, default=FOLLOW_PER_CLIENT, help="平均每个客户几条跟进记录")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子（同样的种子生成同样的数据）")
+    parser.add_argument("--database", default=BENCH_DATABASE, help="基准用的 MySQL 库（会被删掉重建）")
+    parser.add_argument("--offline", action="store_true", help="只跑不连数据库的基准")
+    parser.add_argument("--out", help="结果写到这个 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示被测函数自己的打印")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两个结果文件")
+    args = parser.parse_args(argv)
+    if args.compare:
+        return compare(*args.compare)
+
+    # 所有模块都从 db.MYSQL_DB 取默认库，必须在 import db 之前换成基准库
+    from_env = os.environ.get("CRM_MYSQL_DB")
+    if not args.offline and args.database == (from_env or "client_db"):
+        parser.error("基准库不能是正在用的客户库（会被删掉重建），换一个 --database")
+    os.environ["CRM_MYSQL_DB"] = args.database
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            print(f"数据量 {scale}：")
+            run_offline(results, scale, args.seed, args.verbose)
+            if not args.offline:
+                reset_database(args.database)
+                run_database(results, scale, args.seed, args.follow_per_client, workdir, args.verbose)
+    if not args.offline:
+        from db import dispose_engines
+        dispose_engines()
+
+    report = {
+        "meta": {
+            "version": git_version(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "scales": args.scales,
+            "follow_per_client": args.follow_per_client,
+            "database": None if args.offline else args.database,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# 客户详情和最近跟进记录的内存缓存：最近打开过的客户再打开时不用再查数据库
+# 只在界面线程里读写（后台查询的结果通过信号回到界面线程后才放进来），不用加锁
+from collections import OrderedDict
+
+CLIENT_CACHE_SIZE = 200  # 最多缓存多少个客户（详情和跟进记录各算各的），再多就丢掉最久没看的
+
+
+class LRUCache:
+    """固定容量的 LRU 缓存：OrderedDict 的顺序就是使用顺序，最久没用的在最前面"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ClientCache:
+    """按客户 Id 缓存：完整的客户信息（修改/跟进窗口回显用）、最新一页跟进记录（时间轴第一页用）"""
+
+    def __init__(self, maxsize=CLIENT_CACHE_SIZE):
+        self.details = LRUCache(maxsize)
+        self.follow_pages = LRUCache(maxsize)
+
+    def invalidate(self, client_ids, follow_records=True):
+        """客户被修改（自己保存或者同步到别人的修改）后作废缓存，下次打开重新查"""
+        for client_id in client_ids:
+            self.details.pop(client_id)
+            if follow_records:
+                self.follow_pages.pop(client_id)
+
+    def clear(self):
+        self.details.clear()
+        self.follow_pages.clear()
+
+
+_cache = None
+
+
+def client_cache():
+    """全程序共用一份客户缓存（第一次用的时候才创建）"""
+    global _cache
+    if _cache is None:
+        _cache = ClientCache()
+    return _cache
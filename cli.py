@@ -0,0 +1,149 @@
+# 命令行入口：一个脚本、多个子命令，批处理和定时任务用
+#   python cli.py gui                      打开界面
+#   python cli.py clients --grade A -n 20  查客户（不加载 PyQt5 和 pandas）
+#   python cli.py import-excel [文件] [--sheet 工作表] [--table 表名] [--stream [--chunk-size N]]
+#   python cli.py import-excel [文件] --sync [--delete]  差量同步：只写 Excel 里新增/改过的客户
+#   python cli.py gen-ids [--yes]          给客户生成 Id
+#   python cli.py migrate-follow [--chunk-size N] [--pause 秒] [--max-rate 行/秒] [--restart]  跟进情况迁移到跟进表
+#   python cli.py migrate [--force]        升级数据库结构（建表、加列、加索引）
+#   python cli.py journal [--flush] [--retry-failed]  查看/同步本机还没写进数据库的修改
+# 每个子命令用到时才 import 对应模块，查个数据不用等界面库、pandas 加载完
+import argparse
+import sys
+
+
+def cmd_gui(args):
+    from main import run_gui
+    return run_gui([sys.argv[0]])
+
+
+def cmd_clients(args):
+    from queries import query_client_page
+    filters = {"grade": args.grade, "country": args.country, "product": args.product}
+    rows = query_client_page(args.sort, not args.asc, None, args.limit, filters=filters)
+    for row in rows:
+        print("\t".join(str(row[col] if row[col] is not None else "") for col in args.columns))
+    print(f"共 {len(rows)} 条", file=sys.stderr)
+    return 0
+
+
+def cmd_import_excel(args):
+    if args.sync:
+        from excel_import import sync_excel
+        result = sync_excel(args.file, args.sheet, delete=args.delete, chunk_size=args.chunk_size)
+    elif args.stream:
+        from excel_import import import_excel_streaming
+        result = import_excel_streaming(args.file, args.sheet, args.table, args.chunk_size)
+    else:
+        from excel_import import import_excel
+        result = import_excel(args.file, args.sheet, args.table)
+    return 0 if result is not None else 1
+
+
+def cmd_gen_ids(args):
+    from client_ids import MYSQL_DB, MYSQL_TABLE, generate_client_id
+    if not args.yes and input(f"⚠️ 修改 `{MYSQL_DB}`.`{MYSQL_TABLE}`，继续？(y/n)：").lower() != "y":
+        print("🚫 取消执行")
+        return 1
+    return 0 if generate_client_id() is not None else 1
+
+
+def cmd_migrate_follow(args):
+    from follow_migration import migrate_data_from_quote_to_follow
+    options = {"chunk_size": args.chunk_size} if args.chunk_size else {}
+    copied = migrate_data_from_quote_to_follow(pause=args.pause, max_rate=args.max_rate, restart=args.restart, **options)
+    return 0 if copied is not None else 1
+
+
+def cmd_migrate(args):
+    from db import get_engine
+    from migrations import CLIENT_MIGRATIONS, run_migrations
+    applied = run_migrations(get_engine(), CLIENT_MIGRATIONS, force=args.force)
+    print(f"已执行迁移：{applied}" if applied else "数据库已是最新版本")
+    return 0
+
+
+def cmd_journal(args):
+    from journal import flush_journal, write_journal
+    journal = write_journal()
+    if args.retry_failed:
+        print(f"{journal.retry_failed()} 条失败的修改已放回待同步")
+    if args.flush:
+        total = 0
+        while True:
+            synced, failed = flush_journal(journal)
+            total += len(synced)
+            for entry, error in failed:
+                print(f"❌ #{entry.seq} {entry.kind} 客户 {entry.client_id}：{error}")
+            if not synced and not failed:
+                break
+        print(f"✅ 已同步 {total} 条")
+    counts = journal.counts()
+    print(f"待同步 {counts.get('pending', 0)} 条，同步失败 {counts.get('failed', 0)} 条（日志文件：{journal.path}）")
+    for entry, error in journal.failed():
+        print(f"  #{entry.seq} {entry.kind} 客户 {entry.client_id}：{error}")
+    return 1 if counts.get("failed") else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="客户管理命令行工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("gui", help="打开客户管理界面")
+    p.set_defaults(func=cmd_gui)
+
+    p = sub.add_parser("clients", help="按条件查客户，一行一个（制表符分隔）")
+    p.add_argument("--grade", help="等级")
+    p.add_argument("--country", help="国家（前缀匹配）")
+    p.add_argument("--product", help="产品（前缀匹配）")
+    p.add_argument("--sort", default="日期", choices=["Id", "日期", "最近跟进日期"], help="排序列")
+    p.add_argument("--asc", action="store_true", help="正序（默认倒序）")
+    p.add_argument("-n", "--limit", type=int, default=50, help="最多显示几条")
+    p.add_argument("--columns", nargs="+", default=["Id", "日期", "等级", "名字", "国家", "产品", "最近跟进日期"],
+                   help="要显示的列")
+    p.set_defaults(func=cmd_clients)
+
+    from excel_import import EXCEL_FILE_PATH, EXCEL_SHEET_NAME, SQL_TABLE_NAME, IMPORT_CHUNK_ROWS  # 只有常量，不会加载 pandas
+    p = sub.add_parser("import-excel", help="把 Excel 客户表导入 MySQL（写进 staging 表校验后整表换上去，老客户沿用原 Id）")
+    p.add_argument("file", nargs="?", default=EXCEL_FILE_PATH, help="Excel 文件路径")
+    p.add_argument("--sheet", default=EXCEL_SHEET_NAME, help="工作表名")
+    p.add_argument("--table", default=SQL_TABLE_NAME, help="写入的表名")
+    p.add_argument("--stream", action="store_true", help="流式导入：逐行读取、分批写入，大文件内存不涨")
+    p.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_ROWS, help="流式导入/差量同步每批写入的行数")
+    p.add_argument("--sync", action="store_true", help="差量同步到客户表：按内容指纹只写新增、改过的行，不换整张表")
+    p.add_argument("--delete", action="store_true", help="差量同步时把 Excel 里已经没有的客户也删掉")
+    p.set_defaults(func=cmd_import_excel)
+
+    p = sub.add_parser("gen-ids", help="给客户表生成 Id 并设为主键")
+    p.add_argument("-y", "--yes", action="store_true", help="不询问直接执行（定时任务用）")
+    p.set_defaults(func=cmd_gen_ids)
+
+    p = sub.add_parser("migrate-follow", help="把客户表里的跟进情况迁移到跟进记录表（分批、可断点续跑、可重复执行）")
+    p.add_argument("--chunk-size", type=int, help="每批搬多少个客户（默认见 follow_migration.COPY_CHUNK_ROWS）")
+    p.add_argument("--pause", type=float, default=0.0, help="每批之间歇几秒（营业时间跑时减轻数据库压力）")
+    p.add_argument("--max-rate", type=float, help="每秒最多处理多少个客户")
+    p.add_argument("--restart", action="store_true", help="忽略断点，从头再搬一遍（已有的记录照样跳过）")
+    p.set_defaults(func=cmd_migrate_follow)
+
+    p = sub.add_parser("migrate", help="把客户库升级到最新的表结构（建表、加列、加索引）")
+    p.add_argument("--force", action="store_true", help="所有步骤重跑一遍（表被整个替换过时用）")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("journal", help="查看本机还没同步到数据库的跟进记录/客户修改")
+    p.add_argument("--flush", action="store_true", help="马上把待同步的修改全部写进数据库")
+    p.add_argument("--retry-failed", action="store_true", help="把同步失败的修改放回待同步（配合 --flush）")
+    p.set_defaults(func=cmd_journal)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    finally:
+        if "db" in sys.modules:  # 用过数据库才需要关连接池
+            sys.modules["db"].dispose_engines()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# 给 new_quote 的每个客户生成 Id（KZ + 日期 + 当天序号）并设为主键
+# 只依赖 SQLAlchemy；连接配置和连接池在 db.py 里统一管理，执行时才连数据库
+# 新客户的 Id 由序号表（migrations.ID_SEQUENCE_TABLE）按天原子发号，多台电脑同时录入也不会重复
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import text
+from datetime import datetime, date
+from db import MYSQL_DB, get_engine, dispose_engines, statement
+# Id 列和主键由迁移负责（migrations.add_client_id），这里只负责生成 Id
+from migrations import CLIENT_MIGRATIONS, ID_SEQUENCE_TABLE, column_exists, run_migrations
+
+MYSQL_TABLE = "new_quote"
+ID_PREFIX = "KZ"
+ID_PATTERN = re.compile(rf"^{ID_PREFIX}(\d{{8}})(\d+)$")  # KZ + 8 位日期 + 当天序号
+ID_BATCH_ROWS = 50000  # 生成 Id 时每条 UPDATE 处理多少行（按临时行号分段，每段一个事务）
+ROW_NO_COLUMN = "_row_no"  # 生成 Id 时临时加的自增行号列（做完就删）
+# 每个程序一次向序号表预留多少个号（1 = 每录一个客户取一次，Id 连续；调大了少访问数据库，但没用完的号会空着）
+ID_BLOCK_SIZE = int(os.environ.get("CRM_ID_BLOCK_SIZE", "1"))
+
+# 日期转换函数（不变）
+def convert_date_format(prefix, row_num, date_input):
+    if not date_input:
+        date_str = datetime.now().strftime("%Y%m%d")
+    else:
+        if isinstance(date_input, str):
+            try:
+                date_obj = datetime.strptime(date_input, "%Y-%m-%d")
+            except ValueError:
+                try:
+                    date_obj = datetime.strptime(date_input, "%Y%m%d")
+                except ValueError:
+                    date_obj = datetime.now()
+            date_str = date_obj.strftime("%Y%m%d")
+        elif isinstance(date_input, (datetime, date)):
+            date_str = date_input.strftime("%Y%m%d")
+        else:
+            date_str = datetime.now().strftime("%Y%m%d")
+    id_str = f"{prefix}{date_str}{str(row_num).zfill(3)}"
+    return id_str
+
+def id_day(date_input):
+    """Id 里的日期部分 "20250913"（没有日期或者认不出来时用今天，和 convert_date_format 一样）"""
+    return convert_date_format(ID_PREFIX, 0, date_input)[len(ID_PREFIX):len(ID_PREFIX) + 8]
+
+
+def reserve_ids(conn, day, count):
+    """向序号表给 day 预留 count 个连续序号（一条语句原子加上去，马上提交），返回这段序号的最后一个"""
+    conn.execute(statement("reserve_client_ids"), {"day": day, "count": count})
+    last = conn.execute(text("SELECT LAST_INSERT_ID()")).scalar()
+    conn.commit()
+    return last
+
+
+def allocate_ids(conn, dates):
+    """一批新客户的 Id（和 dates 一一对应）：每一天只向序号表预留一次，批量导入时用"""
+    days = [id_day(date_input) for date_input in dates]
+    next_seq = {day: reserve_ids(conn, day, count) - count + 1 for day, count in Counter(days).items()}
+    ids = []
+    for date_input, day in zip(dates, days):
+        ids.append(convert_date_format(ID_PREFIX, next_seq[day], date_input))
+        next_seq[day] += 1
+    return ids
+
+
+class ClientIdAllocator:
+    """界面录入新客户时发 Id：每次向序号表预留 block_size 个号，用完再取（多线程共用，加锁）"""
+
+    def __init__(self, block_size=ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # 日期 -> [下一个可用序号, 预留到的最后一个序号]
+
+    def next_id(self, conn, date_input=None):
+        day = id_day(date_input)
+        with self._lock:
+            block = self._blocks.get(day)
+            if block is None or block[0] > block[1]:
+                last = reserve_ids(conn, day, self.block_size)
+                block = self._blocks[day] = [last - self.block_size + 1, last]
+            seq = block[0]
+            block[0] += 1
+        return convert_date_format(ID_PREFIX, seq, date_input)
+
+
+_allocator = None
+
+
+def client_id_allocator():
+    """全程序共用一个 Id 分配器（预留的号在进程内共享）"""
+    global _allocator
+    if _allocator is None:
+        _allocator = ClientIdAllocator()
+    return _allocator
+
+
+def assign_missing_ids(conn, table=MYSQL_TABLE, reference=None, batch_rows=ID_BATCH_ROWS):
+    """按集合给 table 里 Id 为空的行生成 Id（KZ + 日期 + 当天序号，没有日期的用今天），返回生成了几个
+    当天序号接在这一天已经用掉的最大序号后面（序号表、reference 表里的也算上），不会和已有的 Id 重复
+    没有 Id 的行没有主键可用，先临时加一列自增行号（带索引），按行号每 batch_rows 行一条 UPDATE ... JOIN，
+    边做边打印进度，做完删掉这一列"""
+    missing = conn.execute(text(f"SELECT COUNT(*) FROM `{table}` WHERE `Id` IS NULL")).scalar()
+    if not missing:
+        return 0
+    if column_exists(conn, table, ROW_NO_COLUMN):  # 上次中途退出留下的
+        conn.execute(text(f"ALTER TABLE `{table}` DROP COLUMN `{ROW_NO_COLUMN}`"))
+    conn.execute(text(f"ALTER TABLE `{table}` ADD COLUMN `{ROW_NO_COLUMN}` BIGINT NOT NULL AUTO_INCREMENT, "
+                      f"ADD UNIQUE KEY uk_{ROW_NO_COLUMN} (`{ROW_NO_COLUMN}`)"))
+    try:
+        last = conn.execute(text(f"SELECT MAX(`{ROW_NO_COLUMN}`) FROM `{table}`")).scalar()
+        update_sql = text(assign_ids_sql(table, reference))
+        record_sql = text(record_sequences_sql(table))
+        done = 0
+        started = time.perf_counter()
+        for low in range(1, last + 1, batch_rows):
+            params = {"low": low, "high": low + batch_rows - 1,
+                      "prefix": ID_PREFIX, "id_pattern": f"^{ID_PREFIX}[0-9]{{9,}}$"}
+            # 整张序号表加锁到这批提交：这期间界面录入要等一下，不会和这批拿到同一个号
+            conn.execute(text(f"SELECT COUNT(*) FROM {ID_SEQUENCE_TABLE} FOR UPDATE"))
+            done += conn.execute(update_sql, params).rowcount
+            conn.execute(record_sql, params)
+            conn.commit()
+            elapsed = time.perf_counter() - started
+            print(f"🔑 已生成 {done}/{missing} 个 Id，{done / elapsed if elapsed else 0:.0f} 个/秒")
+        return done
+    finally:
+        conn.execute(text(f"ALTER TABLE `{table}` DROP COLUMN `{ROW_NO_COLUMN}`"))
+
+
+def assign_ids_sql(table, reference=None):
+    """给一段行号（:low ~ :high）里 Id 为空的行生成 Id 的 UPDATE ... JOIN
+    n：这段里每一行的日期和当天排第几（按名字）；u：每天已经用到的最大序号（每批都重新算，包括前几批刚生成的）"""
+    used_ids = f"SELECT `Id` FROM `{table}`" + (f" UNION ALL SELECT `Id` FROM `{reference}`" if reference else "")
+    day = "DATE_FORMAT(COALESCE(`日期`, CURDATE()), '%Y%m%d')"
+    seq = "COALESCE(u.used, 0) + n.row_num"
+    return f"""
+        UPDATE `{table}` AS t
+        JOIN (
+            SELECT `{ROW_NO_COLUMN}`, {day} AS day,
+                   ROW_NUMBER() OVER (PARTITION BY {day} ORDER BY `名字`, `{ROW_NO_COLUMN}`) AS row_num
+            FROM `{table}`
+            WHERE `Id` IS NULL AND `{ROW_NO_COLUMN}` BETWEEN :low AND :high
+        ) AS n ON t.`{ROW_NO_COLUMN}` = n.`{ROW_NO_COLUMN}`
+        LEFT JOIN (
+            SELECT day, MAX(used) AS used FROM (
+                -- 只看符合 KZ+8 位日期+序号 格式的 Id，CAST 不会碰到非数字
+                SELECT SUBSTRING(`Id`, {len(ID_PREFIX) + 1}, 8) AS day,
+                       CAST(SUBSTRING(`Id`, {len(ID_PREFIX) + 9}) AS UNSIGNED) AS used
+                FROM ({used_ids}) AS ids
+                WHERE `Id` REGEXP :id_pattern
+                UNION ALL
+                SELECT `day`, `last_seq` FROM {ID_SEQUENCE_TABLE}
+            ) AS all_used
+            GROUP BY day
+        ) AS u ON u.day = n.day
+        SET t.`Id` = CONCAT(:prefix, n.day, LPAD({seq}, GREATEST(3, LENGTH({seq})), '0'))
+    """
+
+
+def record_sequences_sql(table):
+    """回填完一段行号后，把这段里用到的最大序号记进序号表，之后界面发号接着往后排"""
+    return f"""
+        INSERT INTO {ID_SEQUENCE_TABLE} (`day`, `last_seq`)
+        SELECT * FROM (
+            SELECT SUBSTRING(`Id`, {len(ID_PREFIX) + 1}, 8) AS day,
+                   MAX(CAST(SUBSTRING(`Id`, {len(ID_PREFIX) + 9}) AS UNSIGNED)) AS used
+            FROM `{table}`
+            WHERE `{ROW_NO_COLUMN}` BETWEEN :low AND :high AND `Id` REGEXP :id_pattern
+            GROUP BY day
+        ) AS batch
+        ON DUPLICATE KEY UPDATE `last_seq` = GREATEST(`last_seq`, batch.used)
+    """
+
+
+def generate_client_id():
+    """给还没有 Id 的客户生成 Id（已有的 Id 不动，跟进记录都挂在上面），然后把 Id 设为主键"""
+    try:
+        # 1. 确保 Id 列存在（数据库已是最新版本时只查一次版本号）
+        run_migrations(get_engine(), CLIENT_MIGRATIONS)
+        # 2. 按批 UPDATE ... JOIN 生成 Id，几条语句搞定，不用一行一个 UPDATE
+        started = time.perf_counter()
+        with get_engine().connect() as conn:
+            count = assign_missing_ids(conn, MYSQL_TABLE)
+        # 3. Id 都填好了，重跑一遍迁移把主键补上（每一步都会先检查，已有的跳过）
+        run_migrations(get_engine(), CLIENT_MIGRATIONS, force=True)
+        print(f"\n🎉 执行完成！生成 {count} 个 Id，用时 {time.perf_counter() - started:.1f} 秒")
+        return count
+    except Exception as e:
+        print(f"\n❌ 全局失败：{str(e)}")
+        return None
+    finally:
+        dispose_engines()
+        print("🔌 连接已关闭")
@@ -0,0 +1,134 @@
+# 数据库连接：所有脚本共用这一份配置和连接池，第一次真正要查数据库时才创建 engine
+# 连接信息可以用环境变量覆盖（比如换服务器、换密码不用改代码）：
+#   CRM_MYSQL_HOST / CRM_MYSQL_PORT / CRM_MYSQL_USER / CRM_MYSQL_PASSWORD / CRM_MYSQL_DB
+#   CRM_DB_POOL_SIZE / CRM_DB_MAX_OVERFLOW / CRM_DB_POOL_RECYCLE / CRM_DB_POOL_TIMEOUT
+import os
+
+MYSQL_HOST = os.environ.get("CRM_MYSQL_HOST", "localhost")       # 本地 MySQL 地址
+MYSQL_PORT = int(os.environ.get("CRM_MYSQL_PORT", "3306"))
+MYSQL_USER = os.environ.get("CRM_MYSQL_USER", "root")            # MySQL 用户名
+MYSQL_PASSWORD = os.environ.get("CRM_MYSQL_PASSWORD", "123456")  # MySQL 密码
+MYSQL_DB = os.environ.get("CRM_MYSQL_DB", "client_db")           # 客户数据库名
+MYSQL_CHARSET = "utf8mb4"  # 中文、emoji 都能存
+
+# 连接池：界面的后台查询线程（workers.QUERY_THREADS=4）+ 写入日志同步线程 + 界面线程录入新客户，默认 5 个常驻连接
+POOL_SIZE = int(os.environ.get("CRM_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("CRM_DB_MAX_OVERFLOW", "5"))      # 忙的时候最多再临时借几个
+POOL_RECYCLE = int(os.environ.get("CRM_DB_POOL_RECYCLE", "3600"))   # 连接用满 1 小时就换新的，避开 MySQL wait_timeout
+POOL_TIMEOUT = int(os.environ.get("CRM_DB_POOL_TIMEOUT", "30"))     # 连接池借不到连接时最多等几秒
+
+# 各处反复用到的固定 SQL，第一次用时包成 text() 缓存起来（SQLAlchemy 按语句对象缓存编译结果）
+STATEMENTS = {
+    "column_exists": """
+        SELECT COUNT(*)
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name AND COLUMN_NAME = :col_name
+    """,
+    "table_columns": """
+        SELECT COLUMN_NAME
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name
+        ORDER BY ORDINAL_POSITION
+    """,
+    "index_names": """
+        SELECT DISTINCT INDEX_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = :table_name
+    """,
+    "client_by_id": "SELECT * FROM new_quote WHERE `Id` = :cid",
+    # 原子地给某一天预留 :count 个序号：新的一天插入一行，已有就加上去；LAST_INSERT_ID(x) 把结果留给本连接读
+    "reserve_client_ids": """
+        INSERT INTO client_id_sequence (`day`, `last_seq`) VALUES (:day, LAST_INSERT_ID(:count))
+        ON DUPLICATE KEY UPDATE `last_seq` = LAST_INSERT_ID(`last_seq` + :count)
+    """,
+    # 跟进记录按 (Id, 跟进时间, 记录Id) 键集分页：第一页取最新的，之后从上一页最后一条往前接着取
+    # 同一时间有多条记录时靠自增的 记录Id 排出唯一的先后，翻页不会跳过或重复
+    # 起点条件展开写成 OR：MySQL 对 (a, b) < (x, y) 这种行比较不走范围扫描
+    "follow_records_first_page": """
+        SELECT `记录Id`, `跟进时间`, `跟进情况`, `日志键`
+        FROM follow_up_record
+        WHERE `Id` = :customer_id
+        ORDER BY `跟进时间` DESC, `记录Id` DESC
+        LIMIT :limit
+    """,
+    "follow_records_before": """
+        SELECT `记录Id`, `跟进时间`, `跟进情况`, `日志键`
+        FROM follow_up_record
+        WHERE `Id` = :customer_id
+          AND (`跟进时间` < :before OR (`跟进时间` = :before AND `记录Id` < :before_key))
+        ORDER BY `跟进时间` DESC, `记录Id` DESC
+        LIMIT :limit
+    """,
+    # 本地日志的 日志键 确定一条跟进记录（有唯一键）：已经插入过就跳过，重放两次也不会多出一条；
+    # 同一时间的另一条跟进是另一个 日志键，照样插入
+    "insert_follow_up": """
+        INSERT INTO follow_up_record (`Id`, `跟进时间`, `跟进情况`, `日志键`)
+        SELECT :customer_id, :follow_time, :follow_content, :entry_key FROM DUAL
+        WHERE NOT EXISTS (
+            SELECT 1 FROM follow_up_record WHERE `日志键` = :entry_key
+        )
+    """,
+    "update_follow_up": """
+        UPDATE follow_up_record
+        SET `跟进时间` = :follow_time, `跟进情况` = :follow_content
+        WHERE `Id` = :customer_id AND `跟进时间` = :original_time
+    """,
+    "update_client_follow_up": """
+        UPDATE new_quote
+        SET `最近跟进日期` = :follow_time, `跟进情况` = :follow_content
+        WHERE `Id` = :customer_id
+    """,
+    "update_client": """
+        UPDATE new_quote
+        SET `名字` = :name, `国家` = :country, `产品` = :product, `等级` = :grade, `客户评价` = :feedback
+        WHERE `Id` = :cid
+    """,
+}
+
+_engines = {}  # 数据库名 -> engine（同一个库只建一次连接池）
+_statements = {}  # 语句名 -> text() 对象
+
+
+def get_engine(database=None):
+    """取某个库的 engine（默认客户库）；database="" 表示只连 MySQL 服务器、不选库（建库时用）
+    第一次调用才 import SQLAlchemy 并创建连接池；create_engine 本身不连数据库，第一次查询才连"""
+    database = MYSQL_DB if database is None else database
+    engine = _engines.get(database)
+    if engine is None:
+        from sqlalchemy import create_engine
+        from sqlalchemy.engine import URL
+        url = URL.create(
+            "mysql+pymysql",
+            username=MYSQL_USER,
+            password=MYSQL_PASSWORD,  # URL.create 会处理密码里的 @ : / 等特殊字符
+            host=MYSQL_HOST,
+            port=MYSQL_PORT,
+            database=database or None,
+            query={"charset": MYSQL_CHARSET},
+        )
+        engine = create_engine(
+            url,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_recycle=POOL_RECYCLE,
+            pool_timeout=POOL_TIMEOUT,
+            pool_pre_ping=True,  # 借出连接前先 ping 一下，断掉的连接自动换新的
+        )
+        _engines[database] = engine
+    return engine
+
+
+def statement(name):
+    """取一条预先写好的 SQL（text() 对象只建一次，后面重复使用）"""
+    stmt = _statements.get(name)
+    if stmt is None:
+        from sqlalchemy import text
+        stmt = _statements[name] = text(STATEMENTS[name])
+    return stmt
+
+
+def dispose_engines():
+    """关闭所有连接池（程序退出前调用）"""
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
@@ -0,0 +1,552 @@
+# Excel 导入 MySQL：pandas 很重，只在真正导入时才 import（命令行其他子命令用不到）
+# 两种读取方式：
+#   import_excel           pandas 整表读进内存（数据量小的时候简单）
+#   import_excel_streaming openpyxl 只读模式一行一行读，攒够一批转换后批量 INSERT，几十万行内存也不涨
+# 两种都先写进 staging 表，校验通过后 RENAME TABLE 换上去，导入中途界面不会看到空表或半张表
+# 每天更新同一个 Excel 时用 sync_excel 差量同步：按每行的内容指纹比较，只写新增/改过的行
+import time
+
+from db import MYSQL_DB, get_engine
+
+EXCEL_FILE_PATH = "客户跟进表-新询盘更新12月5日 - 副本.xlsx"  # 你的 Excel 文件路径（比如放在桌面就写完整路径）
+EXCEL_SHEET_NAME = "新询盘"  # 你 Excel 里改过名字的工作表名（比如“高三学生信息”）
+SQL_TABLE_NAME = "new_quote"   # 要在 MySQL 里新建的表名（自定义，比如“学生信息表”）
+DATE_COLUMNS = ["日期", "最近跟进日期"]  # Excel 里存成序列号的日期列
+IMPORT_CHUNK_ROWS = 2000  # 流式导入每批多少行（一批一个事务，pymysql 会把一批拼成多行 INSERT ... VALUES）
+EXCEL_EPOCH = "1899-12-30"  # Excel 日期序列号的起点（已经算上了 Excel 把 1900 年当闰年的 bug）
+# 能当日期序列号的最大数字（pandas 的时间差最多约 106751 天，也就是 2192 年）；更大的数字（比如电话号码）算转换失败
+EXCEL_MAX_SERIAL = 106750
+# 每列的类型：date 日期列，没列出来的都按 text 处理（见 normalize_frame）
+COLUMN_TYPES = {col: "date" for col in DATE_COLUMNS}
+REPORT_LIMIT = 20  # 转换失败的单元格最多逐条打印多少个（其余只报数量）
+STAGING_SUFFIX = "_staging"  # 导入先写进 表名_staging，校验通过后再换成正式表
+OLD_SUFFIX = "_old"          # 换表时旧表临时改成的名字（换完马上删掉）
+
+
+def create_mysql_engine(database=MYSQL_DB):
+    """先连 MySQL 服务器建库（已存在则跳过），再返回连到这个库的 engine；失败返回 None"""
+    from sqlalchemy import text
+    try:
+        # 1. 先创建一个“连接到 MySQL 服务器”的引擎（不是具体数据库，因为新数据库还没创建）
+        with get_engine("").connect() as conn:
+            # 2. 执行 SQL：创建新数据库（如果不存在）
+            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {database} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;"))
+            print(f"✅ 新数据库 {database} 创建成功（如果已存在则跳过）")
+        # 3. 再创建一个“连接到新数据库”的引擎（后续写入数据用这个）
+        return get_engine(database)
+    except Exception as e:
+        print(f"❌ 数据库连接/创建失败：{str(e)}")
+        return None
+
+
+def read_excel_data(file_path, sheet_name):
+    import pandas as pd
+    try:
+        # 1. 读取 Excel 数据（关键参数：指定工作表、第一行作为列名）
+        df = pd.read_excel(
+            io=file_path,          # Excel 文件路径
+            sheet_name=sheet_name, # 要读取的工作表名
+            header=0,              # 第 0 行（第一行）作为 DataFrame 的列名（对应后续 SQL 字段名）
+            skiprows=0,            # 跳过前 0 行（如果 Excel 前几行是标题/注释，可改成 1 或 2）
+            na_filter=False,       # 不自动把空单元格替换成 NaN（保留原始空值，后续写入 SQL 为 NULL）
+            dtype=str              # 先统一按字符串读取（避免数字/日期自动转错类型，后续再调整）
+        )
+
+        # 2. 数据校验：确保读取到数据，且有列名
+        if df.empty:
+            raise ValueError("❌ Excel 工作表为空，没有可读取的数据")
+        if len(df.columns) == 0:
+            raise ValueError("❌ 未读取到列名，请检查 Excel 第一行是否为表头（字段名）")
+
+        # 3. 打印读取结果（让你直观看到读了多少数据、列名是什么）
+        print(f"✅ Excel 数据读取成功！")
+        print(f"📊 数据概况：共 {len(df)} 行数据，{len(df.columns)} 列字段")
+        print(f"🏷️  列名（对应后续 SQL 字段名）：{list(df.columns)}")
+        print(f"👀 前 2 行数据预览：")
+        print(df.head(2))  # 打印前 2 行，确认数据格式正确
+
+        return df
+
+    except FileNotFoundError:
+        print(f"❌ 找不到 Excel 文件：{file_path}")
+        return None
+    except ValueError as ve:
+        print(f"❌ 数据读取错误：{str(ve)}")
+        return None
+    except Exception as e:
+        print(f"❌ Excel 读取失败：{str(e)}")
+        return None
+
+
+def import_excel(file_path=EXCEL_FILE_PATH, sheet_name=EXCEL_SHEET_NAME, table_name=SQL_TABLE_NAME):
+    """读 Excel、转换类型，经 staging 表整表换上去（见 load_and_swap）；成功返回写入行数，失败返回 None"""
+    engine = create_mysql_engine()
+    if engine is None:
+        print("数据库连接失败，程序退出")
+        return None
+    df = read_excel_data(file_path, sheet_name)
+    if df is None:
+        print("Excel 数据读取失败，程序退出")
+        return None
+    # 整个表已经在内存里了，按批切开写入（切片保留 RangeIndex，normalize_frame 会换算成 Excel 行号）
+    frames = (df.iloc[start:start + IMPORT_CHUNK_ROWS].copy() for start in range(0, len(df), IMPORT_CHUNK_ROWS))
+    return load_and_swap(engine, table_name, list(df.columns), frames)
+
+
+def import_excel_streaming(file_path=EXCEL_FILE_PATH, sheet_name=EXCEL_SHEET_NAME, table_name=SQL_TABLE_NAME,
+                           chunk_size=IMPORT_CHUNK_ROWS):
+    """流式导入：openpyxl 只读模式逐行读取，每 chunk_size 行转换一次、写一批，经 staging 表整表换上去
+    内存里最多只有一批数据，边导入边打印速度；成功返回写入行数，失败返回 None"""
+    engine = create_mysql_engine()
+    if engine is None:
+        print("数据库连接失败，程序退出")
+        return None
+    workbook = open_workbook(file_path)
+    if workbook is None:
+        return None
+    try:
+        sheet = read_sheet(workbook, sheet_name)
+        if sheet is None:
+            return None
+        rows, positions, columns = sheet
+        return load_and_swap(engine, table_name, columns, excel_chunks(rows, positions, columns, chunk_size))
+    finally:
+        workbook.close()  # 只读模式要手动关闭文件
+
+
+def open_workbook(file_path):
+    """openpyxl 只读模式打开 Excel（不会把整个表加载进内存，用完要 close）；打不开时打印原因、返回 None"""
+    from openpyxl import load_workbook
+    try:
+        return load_workbook(file_path, read_only=True, data_only=True)
+    except FileNotFoundError:
+        print(f"❌ 找不到 Excel 文件：{file_path}")
+        return None
+    except Exception as e:  # 不是 xlsx、文件损坏、被别的程序占用等
+        print(f"❌ Excel 读取失败：{str(e)}")
+        return None
+
+
+def read_sheet(workbook, sheet_name):
+    """读表头，返回 (剩下的行, 要导入的列位置, 列名)；没有这个工作表或者工作表为空返回 None"""
+    if sheet_name not in workbook.sheetnames:
+        print(f"❌ Excel 里没有工作表「{sheet_name}」，现有的工作表：{workbook.sheetnames}")
+        return None
+    rows = workbook[sheet_name].iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        print("❌ Excel 工作表为空，没有可读取的数据")
+        return None
+    # 表头为空的列（表格右边多出来的空列）不导入
+    positions = [i for i, name in enumerate(header) if name is not None and str(name).strip()]
+    columns = [str(header[i]).strip() for i in positions]
+    print(f"🏷️  列名（对应后续 SQL 字段名）：{columns}")
+    return rows, positions, columns
+
+
+def excel_chunks(rows, positions, columns, chunk_size):
+    """把 openpyxl 读出来的行攒成一批一批的 DataFrame（单元格都是文本，行索引是 Excel 行号）"""
+    import pandas as pd
+    chunk, chunk_rows = [], []  # 这一批的单元格文本、对应的 Excel 行号
+    for excel_row, raw in enumerate(rows, start=2):  # 第 1 行是表头
+        if raw is None or all(value is None for value in raw):
+            continue  # 整行都是空的跳过
+        # 先统一转成文本（和 pandas dtype=str 读出来的一样），类型转换留给 normalize_frame 整批做
+        chunk.append([to_text(raw[pos] if pos < len(raw) else None) for pos in positions])
+        chunk_rows.append(excel_row)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk, columns=columns, index=chunk_rows)
+            chunk, chunk_rows = [], []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=columns, index=chunk_rows)
+
+
+def load_and_swap(engine, table_name, columns, frames):
+    """不动正式表导入：先把 frames 全部写进 表名_staging（和正式表一样的列、主键、索引），校验通过后
+    用一条 RENAME TABLE 原子地换上去。导入过程中界面看到的一直是旧数据，换表之后直接是完整的新数据；
+    老客户（国家+名字 相同）沿用原来的 Id，跟进记录不会断，导入后也不用再跑 给数据库加上ID.py
+    导入期间界面里改过、新录入的客户在换表前合并进 staging，不会被 Excel 覆盖掉（见 swap_tables）
+    任何一步失败都只删掉 staging 表，正式表原样不动。成功返回写入行数，失败返回 None"""
+    from sqlalchemy import text
+    from migrations import CLIENT_MIGRATIONS, ROW_HASH_COLUMN, SYNC_COLUMN, run_migrations
+
+    staging = table_name + STAGING_SUFFIX
+    if table_name == SQL_TABLE_NAME:
+        run_migrations(engine, CLIENT_MIGRATIONS)  # 新库先把正式表按最新结构建好，staging 照着它建
+    try:
+        with engine.connect() as conn:
+            live_columns = create_staging_table(conn, table_name, staging, columns)
+            # 导入开始的时间（数据库的时钟，和「更新时间」一致）：换表前把这之后正式表里变过的行合并过来
+            since = None
+            if table_name == SQL_TABLE_NAME and SYNC_COLUMN in live_columns:
+                since = conn.execute(text("SELECT CURRENT_TIMESTAMP(3)")).scalar()
+            # 表里有「内容哈希」列时顺便写上每行的指纹，之后差量同步（sync_excel）直接拿来比较
+            with_hash = ROW_HASH_COLUMN in live_columns and ROW_HASH_COLUMN not in columns
+            names = [f"`{col}`" for col in columns] + ([f"`{ROW_HASH_COLUMN}`"] if with_hash else [])
+            params = [f":c{i}" for i in range(len(columns))] + ([":row_hash"] if with_hash else [])
+            insert_sql = text(f"INSERT INTO `{staging}` ({', '.join(names)}) VALUES ({', '.join(params)})")
+            total = 0
+            problems = []
+            started = time.perf_counter()
+            for frame in frames:
+                total += write_chunk(conn, insert_sql, frame, problems, total, started, with_hash)
+            elapsed = time.perf_counter() - started
+            print(f"✅ 数据写入 staging 表成功！共 {total} 行数据，用时 {elapsed:.1f} 秒"
+                  f"（{total / elapsed if elapsed else 0:.0f} 行/秒）")
+            report_problems(problems)
+            # 只有客户表要按 国家+名字 接上老 Id；Excel 里自带 Id 列时直接用 Excel 的
+            fill_ids = table_name == SQL_TABLE_NAME and "Id" in live_columns and "Id" not in columns
+            if fill_ids:
+                fill_staging_ids(conn, table_name, staging)
+            validate_staging(conn, table_name, staging, total, check_ids=fill_ids)
+            swap_tables(conn, table_name, staging, live_columns, since)
+        print(f"✅ 已换上新数据！表名：{table_name}，共 {total} 行数据")
+        return total
+    except Exception as e:
+        print(f"❌ 导入失败（正式表 {table_name} 没有改动）：{str(e)}")
+        with engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{staging}`"))
+        return None
+
+
+def create_staging_table(conn, table_name, staging, columns):
+    """建一张空的 staging 表，返回正式表的列名（正式表还不存在时是空列表）
+    正式表已存在：CREATE TABLE ... LIKE 照搬它的列、默认值、主键和索引；否则按 Excel 表头建"""
+    from sqlalchemy import text
+    from migrations import CLIENT_UNIQUE_KEY, index_names, table_columns
+
+    conn.execute(text(f"DROP TABLE IF EXISTS `{staging}`"))  # 上次失败留下来的
+    live_columns = table_columns(conn, table_name)
+    if not live_columns:
+        create_import_table(conn, staging, columns)
+        return live_columns
+    unknown = [col for col in columns if col not in live_columns]
+    if unknown:
+        raise ValueError(f"Excel 里有表 {table_name} 没有的列：{unknown}")
+    conn.execute(text(f"CREATE TABLE `{staging}` LIKE `{table_name}`"))
+    unique_name = CLIENT_UNIQUE_KEY[0]
+    if unique_name in index_names(conn, staging):
+        # 国家+名字 唯一键先去掉：Excel 里有重复客户时写到一半报错没法看，写完由 validate_staging 统一查出来报告
+        conn.execute(text(f"ALTER TABLE `{staging}` DROP INDEX {unique_name}"))
+    if "Id" in live_columns and "Id" not in columns:
+        # Id 要等数据写完再填（见 fill_staging_ids），先去掉主键、允许为空，校验时再加回来
+        drop_key = "DROP PRIMARY KEY, " if "PRIMARY" in index_names(conn, staging) else ""
+        conn.execute(text(f"ALTER TABLE `{staging}` {drop_key}MODIFY `Id` VARCHAR(50) NULL"))
+    conn.commit()
+    return live_columns
+
+
+def create_import_table(conn, table_name, columns):
+    """按 Excel 表头建表：日期列 DATE，其他 TEXT（和 to_sql 建出来的一样）"""
+    from sqlalchemy import text
+    definitions = ", ".join(f"`{col}` {'DATE' if col in DATE_COLUMNS else 'TEXT'}" for col in columns)
+    conn.execute(text(f"DROP TABLE IF EXISTS `{table_name}`"))
+    conn.execute(text(f"CREATE TABLE `{table_name}` ({definitions}) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"))
+    conn.commit()
+
+
+def write_chunk(conn, insert_sql, df, problems, done, started, with_hash=False):
+    """转换一批的类型、写入（一个事务），打印累计行数和速度，返回这批的行数；转换失败的单元格追加到 problems
+    with_hash=True 时每行多一个 row_hash 参数（见 row_hashes）"""
+    df, chunk_problems = normalize_frame(df)
+    problems.extend(chunk_problems)
+    hashes = row_hashes(df) if with_hash else None
+    df.columns = [f"c{i}" for i in range(len(df.columns))]
+    if with_hash:
+        df["row_hash"] = hashes
+    conn.execute(insert_sql, frame_records(df))
+    conn.commit()
+    done += len(df)
+    elapsed = time.perf_counter() - started
+    print(f"📥 已导入 {done} 行，{done / elapsed if elapsed else 0:.0f} 行/秒")
+    return len(df)
+
+
+def fill_staging_ids(conn, table_name, staging):
+    """staging 里的客户先按 国家+名字 沿用正式表里的 Id（跟进记录挂在老 Id 上），剩下的新客户再生成 Id"""
+    from sqlalchemy import text
+    from client_ids import assign_missing_ids
+
+    kept = conn.execute(text(f"""
+        UPDATE `{staging}` AS s
+        JOIN `{table_name}` AS q ON s.`国家` = q.`国家` AND s.`名字` = q.`名字`
+        SET s.`Id` = q.`Id`
+    """)).rowcount
+    created = assign_missing_ids(conn, staging, reference=table_name)
+    conn.commit()
+    print(f"🔑 沿用老 Id {kept} 个，新客户生成 Id {created} 个")
+
+
+def validate_staging(conn, table_name, staging, expected_rows, check_ids):
+    """换表前的检查：有数据、行数和写入的一致；正式表有 国家+名字 唯一键时不能有重复客户，通过后把唯一键加回来；
+    check_ids 时 Id 不能为空或重复，通过后把主键加回来。不通过抛出 ValueError（正式表不会被换掉）"""
+    from sqlalchemy import text
+    from migrations import CLIENT_UNIQUE_KEY, index_names
+    rows = conn.execute(text(f"SELECT COUNT(*) FROM `{staging}`")).scalar()
+    if rows == 0:
+        raise ValueError("Excel 里没有数据，不替换正式表")
+    if rows != expected_rows:
+        raise ValueError(f"staging 表有 {rows} 行，和写入的 {expected_rows} 行对不上")
+    unique_name, unique_columns = CLIENT_UNIQUE_KEY
+    if unique_name in index_names(conn, table_name):
+        # 和唯一键一样只比较前 20/50 个字
+        duplicates = conn.execute(text(f"""
+            SELECT LEFT(`国家`, 20), LEFT(`名字`, 50), COUNT(*) FROM `{staging}`
+            GROUP BY LEFT(`国家`, 20), LEFT(`名字`, 50) HAVING COUNT(*) > 1 LIMIT {REPORT_LIMIT}
+        """)).all()
+        if duplicates:
+            listed = "、".join(f"{country}/{name}（{count} 行）" for country, name, count in duplicates)
+            raise ValueError(f"Excel 里有重复的 国家+名字，合并后再导入：{listed}")
+        conn.execute(text(f"ALTER TABLE `{staging}` ADD UNIQUE KEY {unique_name} ({unique_columns})"))
+    if not check_ids:
+        return
+    missing = conn.execute(text(f"SELECT COUNT(*) FROM `{staging}` WHERE `Id` IS NULL")).scalar()
+    if missing:
+        raise ValueError(f"还有 {missing} 个客户没有 Id")
+    duplicates = conn.execute(text(f"""
+        SELECT `Id` FROM `{staging}` GROUP BY `Id` HAVING COUNT(*) > 1 LIMIT {REPORT_LIMIT}
+    """)).scalars().all()
+    if duplicates:
+        raise ValueError(f"有重复的 Id（多半是正式表里有重复的 国家+名字）：{duplicates}")
+    conn.execute(text(f"ALTER TABLE `{staging}` MODIFY `Id` VARCHAR(50) NOT NULL, ADD PRIMARY KEY (`Id`)"))
+
+
+def swap_tables(conn, table_name, staging, live_columns, since=None):
+    """RENAME TABLE 一条语句同时改两个表名（原子操作），读的人要么看到旧表、要么看到新表，不会看到空表
+    since 不为空时（客户表）先锁住两张表：把正式表里 since 之后变过的行合并进 staging，再把 staging 每行的
+    「更新时间」刷成现在，然后换表、解锁。锁表期间别人的写入要等一下，不会写进马上被丢掉的旧表；
+    界面的增量同步水位线也不会越过换表的时间，换表后下一次同步就能拉到新数据（需要 MySQL 8.0.13+）"""
+    from sqlalchemy import text
+    from migrations import SYNC_COLUMN
+    if not live_columns:
+        conn.execute(text(f"RENAME TABLE `{staging}` TO `{table_name}`"))
+        return
+    old = table_name + OLD_SUFFIX
+    conn.execute(text(f"DROP TABLE IF EXISTS `{old}`"))
+    if since is None:
+        conn.execute(text(f"RENAME TABLE `{table_name}` TO `{old}`, `{staging}` TO `{table_name}`"))
+        conn.execute(text(f"DROP TABLE `{old}`"))
+        return
+    conn.execute(text(f"LOCK TABLES `{table_name}` WRITE, `{staging}` WRITE"))
+    try:
+        kept = merge_live_changes(conn, table_name, staging, live_columns, since)
+        conn.execute(text(f"UPDATE `{staging}` SET `{SYNC_COLUMN}` = CURRENT_TIMESTAMP(3)"))
+        conn.commit()
+        conn.execute(text(f"RENAME TABLE `{table_name}` TO `{old}`, `{staging}` TO `{table_name}`"))
+    finally:
+        conn.execute(text("UNLOCK TABLES"))  # 连接还回连接池前一定要解锁
+    conn.execute(text(f"DROP TABLE `{old}`"))
+    if kept:
+        print(f"ℹ️ 导入期间界面里改过/新录入的 {kept} 个客户已保留")
+
+
+def merge_live_changes(conn, table_name, staging, live_columns, since):
+    """把正式表里「更新时间」不早于 since 的行（导入期间界面里改过、新录入的客户）合并进 staging，返回行数
+    以正式表为准：Id 或者 国家+名字 和 staging 里某行相同就覆盖那一行（「内容哈希」保留 Excel 的，
+    之后差量同步不会拿 Excel 把界面里的修改改回去），没有的插入。锁表期间执行，不能给表起别名"""
+    from sqlalchemy import text
+    from migrations import ROW_HASH_COLUMN, SYNC_COLUMN
+    changed = conn.execute(text(f"SELECT COUNT(*) FROM `{table_name}` WHERE `{SYNC_COLUMN}` >= :since"),
+                           {"since": since}).scalar()
+    if not changed:
+        return 0
+    names = ", ".join(f"`{col}`" for col in live_columns)
+    updates = ", ".join(f"`{col}` = changed.`{col}`" for col in live_columns if col != ROW_HASH_COLUMN)
+    conn.execute(text(f"""
+        INSERT INTO `{staging}` ({names})
+        SELECT * FROM (
+            SELECT {names} FROM `{table_name}` WHERE `{SYNC_COLUMN}` >= :since
+        ) AS changed
+        ON DUPLICATE KEY UPDATE {updates}
+    """), {"since": since})
+    return changed
+
+
+def sync_excel(file_path=EXCEL_FILE_PATH, sheet_name=EXCEL_SHEET_NAME, delete=False, chunk_size=IMPORT_CHUNK_ROWS):
+    """差量同步到客户表：Excel 每行按 国家+名字 找到库里的客户，内容指纹和库里存的一样就跳过，
+    只把新增的、改过的行分批写进去（delete=True 时 Excel 里已经没有的客户也删掉）
+    库里的指纹是上次导入时 Excel 的内容：界面上改过、Excel 里没动的客户不会被 Excel 覆盖回去
+    每批一个事务，中途失败重跑一遍即可（已经写进去的行指纹一致，会被跳过）
+    成功返回 {"inserted": n, "updated": n, "deleted": n, "unchanged": n}，失败返回 None"""
+    from sqlalchemy import bindparam, text
+    from client_ids import allocate_ids
+    from migrations import CLIENT_MIGRATIONS, ROW_HASH_COLUMN, run_migrations, table_columns
+    from queries import client_key
+
+    engine = create_mysql_engine()
+    if engine is None:
+        print("数据库连接失败，程序退出")
+        return None
+    run_migrations(engine, CLIENT_MIGRATIONS)  # 确保有「内容哈希」列
+    workbook = open_workbook(file_path)
+    if workbook is None:
+        return None
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    try:
+        sheet = read_sheet(workbook, sheet_name)
+        if sheet is None:
+            return None
+        rows, positions, columns = sheet
+        with engine.connect() as conn:
+            live_columns = table_columns(conn, SQL_TABLE_NAME)
+            unknown = [col for col in columns if col not in live_columns or col in ("Id", ROW_HASH_COLUMN)]
+            if unknown or not {"国家", "名字"} <= set(columns):
+                raise ValueError(f"Excel 的列和客户表对不上（必须有 国家、名字，不能有表里没有的列）：{unknown}")
+            # 库里现有客户：国家+名字 -> (Id, 内容指纹)；只读这几列，几十万行也不大
+            existing = {}
+            for client_id, country, name, digest in conn.execute(text(
+                    f"SELECT `Id`, `国家`, `名字`, `{ROW_HASH_COLUMN}` FROM {SQL_TABLE_NAME}")):
+                existing[client_key(country, name)] = (client_id, digest)
+            names = columns + [ROW_HASH_COLUMN]
+            insert_sql = text(f"INSERT INTO {SQL_TABLE_NAME} (`Id`, {', '.join(f'`{col}`' for col in names)}) "
+                              f"VALUES (:Id, {', '.join(f':{col}' for col in names)})")
+            update_sql = text(f"UPDATE {SQL_TABLE_NAME} SET {', '.join(f'`{col}` = :{col}' for col in names)} "
+                              f"WHERE `Id` = :Id")
+            seen, duplicates, problems = set(), [], []
+            started = time.perf_counter()
+            for frame in excel_chunks(rows, positions, columns, chunk_size):
+                df, chunk_problems = normalize_frame(frame)
+                problems.extend(chunk_problems)
+                hashes = row_hashes(df)
+                inserts, updates = [], []
+                for excel_row, record, digest in zip(df.index, frame_records(df), hashes):
+                    key = client_key(record["国家"], record["名字"])
+                    if key in seen:
+                        duplicates.append((excel_row, record["国家"], record["名字"]))
+                        continue
+                    seen.add(key)
+                    record[ROW_HASH_COLUMN] = digest
+                    found = existing.get(key)
+                    if found is None:
+                        inserts.append(record)
+                    elif found[1] != digest:
+                        record["Id"] = found[0]
+                        updates.append(record)
+                    else:
+                        counts["unchanged"] += 1
+                if inserts:
+                    # 新客户的 Id 向序号表按天成批预留，和同时在录入的界面不会撞号
+                    for record, client_id in zip(inserts, allocate_ids(conn, [r["日期"] for r in inserts])):
+                        record["Id"] = client_id
+                    conn.execute(insert_sql, inserts)
+                if updates:
+                    conn.execute(update_sql, updates)
+                conn.commit()
+                counts["inserted"] += len(inserts)
+                counts["updated"] += len(updates)
+            # Excel 里没有了的客户：只算 Excel 导入过的（有指纹的），界面里录入的客户不动
+            gone = [client_id for key, (client_id, digest) in existing.items() if key not in seen and digest]
+            if delete and gone:
+                if not seen:
+                    raise ValueError("Excel 里没有数据，不删除客户")
+                delete_sql = text(f"DELETE FROM {SQL_TABLE_NAME} WHERE `Id` IN :ids").bindparams(
+                    bindparam("ids", expanding=True))
+                for start in range(0, len(gone), chunk_size):
+                    counts["deleted"] += conn.execute(delete_sql, {"ids": gone[start:start + chunk_size]}).rowcount
+                    conn.commit()
+            elif gone:
+                print(f"ℹ️ 有 {len(gone)} 个客户 Excel 里已经没有了（加 --delete 才会删除）")
+        elapsed = time.perf_counter() - started
+        print(f"✅ 差量同步完成，用时 {elapsed:.1f} 秒：新增 {counts['inserted']}，修改 {counts['updated']}，"
+              f"删除 {counts['deleted']}，没变 {counts['unchanged']}")
+        report_problems(problems)
+        if duplicates:
+            print(f"⚠️ 有 {len(duplicates)} 行 国家+名字 和前面的行重复，已跳过：")
+            for row, country, name in duplicates[:REPORT_LIMIT]:
+                print(f"   第 {row} 行：{country} {name}")
+        return counts
+    except Exception as e:
+        print(f"❌ 差量同步失败：{str(e)}")
+        return None
+    finally:
+        workbook.close()
+
+
+def row_hashes(df):
+    """每行内容的指纹（SHA-1）：按列名排序拼成「列名=值」再哈希，Excel 里调整列的顺序指纹不变
+    df 是 normalize_frame 转换后的（日期按 YYYY-MM-DD，空值当空串），返回和 df 同索引的 Series"""
+    import hashlib
+    import pandas as pd
+    parts = []
+    for col in sorted(df.columns):
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d")
+        parts.append(col + "=" + values.fillna("").astype(str))
+    joined = parts[0].str.cat(parts[1:], sep="\x1f")  # 按列整体拼接，只有最后的哈希是逐行算的
+    return joined.map(lambda text: hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def to_text(value):
+    """单元格转成文本（和 pandas dtype=str 读出来的一样：空单元格是空串，整数不带 .0）"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def normalize_frame(df):
+    """按 COLUMN_TYPES 整列转换类型（每一列几次 pandas 向量运算，不逐个单元格调函数）
+    df 的行索引是 Excel 行号（pandas 读的是从 0 开始的位置，这里自动换算），返回 (转换后的 df, 转换失败列表)
+    转换失败列表每项是 (Excel 行号, 列名, 原始内容)，这些单元格写进数据库是 NULL"""
+    import pandas as pd
+    if isinstance(df.index, pd.RangeIndex):
+        df.index = df.index + 2  # read_excel 的第 0 行数据在 Excel 里是第 2 行（第 1 行是表头）
+    problems = []
+    for col in df.columns:
+        if COLUMN_TYPES.get(col) == "date":
+            df[col], failed = normalize_dates(df[col])
+            problems.extend((row, col, value) for row, value in failed.items())
+        else:
+            df[col] = normalize_text(df[col])
+    return df, problems
+
+
+def normalize_dates(series):
+    """日期列：纯数字的是 Excel 序列号，一次性加到起始日期上；其他的按日期文本一次性解析
+    返回 (日期列, 转不了的原始内容 Series)"""
+    import pandas as pd
+    text = series.fillna("").astype(str).str.strip()
+    empty = text.eq("") | text.str.lower().isin(["nan", "nat", "none"])
+    numbers = pd.to_numeric(text.where(~empty), errors="coerce")
+    is_serial = numbers.between(0, EXCEL_MAX_SERIAL)
+    bad_number = numbers.notna() & ~is_serial  # 超出日期范围的数字，不能当序列号，也不当日期文本解析
+    is_text = ~empty & numbers.isna()
+    result = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    if is_serial.any():
+        result[is_serial] = pd.Timestamp(EXCEL_EPOCH) + pd.to_timedelta(numbers[is_serial], unit="D")
+    if is_text.any():
+        # 先按标准格式（2025-01-08、2025-01-08 10:00:00）整列解析，剩下的（2025/1/8 之类）再逐个推断格式
+        result[is_text] = pd.to_datetime(text[is_text], format="ISO8601", errors="coerce")
+        retry = is_text & result.isna()
+        if retry.any():
+            result[retry] = pd.to_datetime(text[retry], format="mixed", errors="coerce")
+    result = result.dt.normalize()  # 只要日期部分
+    failed = bad_number | (is_text & result.isna())
+    return result, series[failed]
+
+
+def normalize_text(series):
+    """文本列：统一成字符串并去掉首尾空格（空单元格是空串，和原来 na_filter=False 读出来的一样）"""
+    return series.fillna("").astype(str).str.strip()
+
+
+def frame_records(df):
+    """DataFrame 转成 INSERT 用的参数列表：日期转成 date，缺失值（NaT/NaN）转成 None（写进数据库是 NULL）"""
+    import pandas as pd
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.date
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def report_problems(problems):
+    """打印转换失败的单元格（Excel 行号、列名、原始内容），不悄悄吞掉"""
+    if not problems:
+        return
+    print(f"⚠️ 有 {len(problems)} 个单元格转换失败，已按空值（NULL）写入：")
+    for row, col, value in problems[:REPORT_LIMIT]:
+        print(f"   第 {row} 行「{col}」：{value!r}")
+    if len(problems) > REPORT_LIMIT:
+        print(f"   ……其余 {len(problems) - REPORT_LIMIT} 个不再逐条列出")
@@ -0,0 +1,98 @@
+# 把 new_quote 里的跟进情况迁移到 follow_up_record 表（只依赖 SQLAlchemy，不加载界面）
+# 按主键分批搬：每批一个小事务，只锁这一批的行，营业时间也能跑；每批连同断点一起提交，中途断了接着跑，
+# 已经有的记录（同一客户、同一跟进时间）跳过，重复执行不会多出重复数据
+import time
+
+from sqlalchemy import text
+
+from db import get_engine
+from migrations import CLIENT_MIGRATIONS, COPY_CHECKPOINT_TABLE, run_migrations
+
+COPY_CHUNK_ROWS = 1000  # 每批搬多少个客户（按 Id 顺序）
+FOLLOW_COPY_NAME = "new_quote -> follow_up_record"  # 断点表里这个任务的名字
+
+# 一批的搬运语句：:after < Id <= :upto 这一段客户，没有跟进日期的没法成为跟进记录，已经搬过的跳过
+FOLLOW_COPY_SQL = """
+    INSERT INTO follow_up_record (`Id`, `跟进时间`, `跟进情况`)
+    SELECT q.`Id`, q.`最近跟进日期`, q.`跟进情况`
+    FROM new_quote AS q
+    WHERE q.`Id` > :after AND q.`Id` <= :upto
+      AND q.`最近跟进日期` IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM follow_up_record AS f WHERE f.`Id` = q.`Id` AND f.`跟进时间` = q.`最近跟进日期`
+      )
+"""
+
+
+def migrate_data_from_quote_to_follow(chunk_size=COPY_CHUNK_ROWS, pause=0.0, max_rate=None, restart=False):
+    """从 new_quote 表迁移数据到 follow_up_record 表，返回这次新搬的行数（失败返回 None）"""
+    try:
+        run_migrations(get_engine(), CLIENT_MIGRATIONS)  # 确保有断点表和 (Id, 跟进时间) 索引
+        copied = copy_in_chunks(FOLLOW_COPY_NAME, "new_quote", "Id", FOLLOW_COPY_SQL,
+                                chunk_size=chunk_size, pause=pause, max_rate=max_rate, restart=restart)
+        print("数据迁移成功！")
+        return copied
+    except Exception as e:
+        print(f"迁移失败（已完成的批次不会丢，重新运行会从断点继续）：{str(e)}")
+        return None
+
+
+def copy_in_chunks(name, source_table, key_column, copy_sql, chunk_size=COPY_CHUNK_ROWS, pause=0.0,
+                   max_rate=None, restart=False):
+    """按 source_table 的主键 key_column 顺序分批执行 copy_sql（用 :after、:upto 限定这一批的主键范围）
+    每批和断点（搬到的主键、累计行数）在同一个事务里提交，断了从断点继续；restart=True 从头再来
+    搬完之后再运行就从头再扫一遍：Id 不是按录入顺序递增的（日期早的新客户、序号 1000 排在 999 前面），
+    只看断点之后会漏掉新行；copy_sql 自己会跳过已经搬过的，重扫不会重复写入
+    限速：每批之后至少歇 pause 秒，max_rate 不为空时再按「每秒最多扫多少行源数据」多歇一会儿
+    返回这次新写入的行数"""
+    with get_engine().connect() as conn:
+        if restart:
+            conn.execute(text(f"DELETE FROM {COPY_CHECKPOINT_TABLE} WHERE `name` = :name"), {"name": name})
+        conn.execute(text(f"INSERT IGNORE INTO {COPY_CHECKPOINT_TABLE} (`name`) VALUES (:name)"), {"name": name})
+        conn.commit()
+        after, finished = conn.execute(text(
+            f"SELECT `last_key`, `finished` FROM {COPY_CHECKPOINT_TABLE} WHERE `name` = :name"
+        ), {"name": name}).one()
+        if finished:
+            after = ""
+            print(f"「{name}」上次已经搬完，从头再扫一遍，只补还没搬过的行")
+        elif after:
+            print(f"从断点继续：{key_column} > {after}")
+        remaining = conn.execute(text(f"SELECT COUNT(*) FROM `{source_table}` WHERE `{key_column}` > :after"),
+                                 {"after": after}).scalar()
+        conn.commit()
+        chunk_sql = text(f"""
+            SELECT COUNT(*), MAX(`{key_column}`) FROM (
+                SELECT `{key_column}` FROM `{source_table}` WHERE `{key_column}` > :after
+                ORDER BY `{key_column}` LIMIT :limit
+            ) AS chunk
+        """)
+        checkpoint_sql = text(f"""
+            UPDATE {COPY_CHECKPOINT_TABLE}
+            SET `last_key` = :upto, `rows_copied` = `rows_copied` + :copied, `finished` = 0
+            WHERE `name` = :name
+        """)
+        copy = text(copy_sql)
+        scanned = copied = 0
+        started = time.perf_counter()
+        while True:
+            batch_started = time.perf_counter()
+            count, upto = conn.execute(chunk_sql, {"after": after, "limit": chunk_size}).one()
+            if not count:
+                break
+            inserted = conn.execute(copy, {"after": after, "upto": upto}).rowcount
+            conn.execute(checkpoint_sql, {"upto": upto, "copied": inserted, "name": name})
+            conn.commit()
+            after = upto
+            scanned += count
+            copied += inserted
+            elapsed = time.perf_counter() - started
+            print(f"📦 已处理 {scanned}/{remaining} 行，新写入 {copied} 行，{scanned / elapsed if elapsed else 0:.0f} 行/秒")
+            wait = pause
+            if max_rate:
+                wait = max(wait, count / max_rate - (time.perf_counter() - batch_started))
+            if wait > 0:
+                time.sleep(wait)
+        conn.execute(text(f"UPDATE {COPY_CHECKPOINT_TABLE} SET `finished` = 1 WHERE `name` = :name"), {"name": name})
+        conn.commit()
+        return copied
@@ -0,0 +1,228 @@
+# 本地写入日志（write-behind）：跟进记录、客户修改先写进本机的 SQLite（WAL 模式，写完就落盘），界面立刻返回
+# 后台再按顺序把日志批量重放到 MySQL，网络慢或者数据库连不上时记录也不会丢，连上后自动补写
+# 只依赖标准库 sqlite3 和 SQLAlchemy，命令行 python cli.py journal 也能查看/手动同步
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from db import get_engine, statement
+
+JOURNAL_PATH = os.environ.get("CRM_JOURNAL_PATH", os.path.join(os.path.expanduser("~"), ".client_crm_journal.db"))
+JOURNAL_BATCH_SIZE = 50       # 每次最多把多少条日志放进一个 MySQL 事务
+JOURNAL_KEEP_SECONDS = 7 * 24 * 3600  # 已同步的日志保留 7 天（方便查问题），之后删掉
+
+# 日志条目：seq 递增编号（重放顺序），kind 操作类型，client_id 客户 Id，params SQL 参数
+JournalEntry = namedtuple("JournalEntry", ["seq", "kind", "client_id", "params"])
+# 日志里的时间参数（存成字符串，重放时再转回 datetime）
+DATETIME_PARAMS = ("follow_time", "original_time")
+# 每条日志在本机生成的唯一键（写进 follow_up_record 的「日志键」列）：同一条日志重放两次也只插入一条，
+# 不靠 (客户, 跟进时间) 判断，同一时间记多条跟进也不会被当成重复丢掉
+ENTRY_KEY = "entry_key"
+
+
+def new_entry_key():
+    return uuid.uuid4().hex
+
+
+class WriteJournal:
+    """SQLite 写入日志：界面线程追加、后台线程重放，共用一个连接，用锁保证同一时间只有一个线程在用"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")  # 每次提交都刷到磁盘，断电也不丢刚写的跟进
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                params TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                synced_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_journal_state ON journal (state, seq)")
+
+    def append(self, kind, client_id, params):
+        """追加一条待同步的写入，返回它的编号（写进磁盘后才返回）；params 里没有 entry_key 时自动生成一个"""
+        if kind not in REPLAY_STATEMENTS:
+            raise ValueError(f"未知的日志类型：{kind}")
+        data = {key: (value.isoformat(sep=" ") if key in DATETIME_PARAMS else value) for key, value in params.items()}
+        data.setdefault(ENTRY_KEY, new_entry_key())
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO journal (kind, client_id, params, created_at) VALUES (?, ?, ?, ?)",
+                (kind, client_id, json.dumps(data, ensure_ascii=False), time.time()))
+            return cursor.lastrowid
+
+    def pending(self, limit=None, client_id=None):
+        """按写入顺序取还没同步的条目（client_id 不为空时只取这个客户的）"""
+        sql = "SELECT seq, kind, client_id, params, created_at FROM journal WHERE state = 'pending'"
+        args = []
+        if client_id is not None:
+            sql += " AND client_id = ?"
+            args.append(client_id)
+        sql += " ORDER BY seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [JournalEntry(seq, kind, cid, _load_params(params, seq, created))
+                for seq, kind, cid, params, created in rows]
+
+    def counts(self):
+        """各状态的条数：{"pending": n, "failed": n, ...}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM journal GROUP BY state").fetchall())
+
+    def failed(self):
+        """同步失败（数据有问题，重试也没用）的条目和错误信息"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, kind, client_id, params, created_at, last_error FROM journal "
+                "WHERE state = 'failed' ORDER BY seq"
+            ).fetchall()
+        return [(JournalEntry(seq, kind, cid, _load_params(params, seq, created)), error)
+                for seq, kind, cid, params, created, error in rows]
+
+    def mark_synced(self, seqs):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE journal SET state = 'synced', synced_at = ? WHERE seq = ?",
+                                   [(now, seq) for seq in seqs])
+            self._conn.execute("DELETE FROM journal WHERE state = 'synced' AND synced_at < ?",
+                               (now - JOURNAL_KEEP_SECONDS,))
+            self._conn.execute("COMMIT")
+
+    def mark_failed(self, seq, error):
+        with self._lock:
+            self._conn.execute("UPDATE journal SET state = 'failed', attempts = attempts + 1, last_error = ? "
+                               "WHERE seq = ?", (error, seq))
+
+    def record_attempt(self, seqs, error):
+        """整批没写进去（连不上数据库等），记下次数和原因，条目还是待同步，稍后重试"""
+        with self._lock:
+            self._conn.executemany("UPDATE journal SET attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                                   [(error, seq) for seq in seqs])
+
+    def retry_failed(self):
+        """把失败的条目重新放回待同步（比如清理掉重复客户之后）"""
+        with self._lock:
+            return self._conn.execute("UPDATE journal SET state = 'pending' WHERE state = 'failed'").rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _load_params(text, seq, created_at):
+    params = json.loads(text)
+    for key in DATETIME_PARAMS:
+        if params.get(key) is not None:
+            params[key] = datetime.fromisoformat(params[key])
+    # 升级前写的日志没有 entry_key：用本机的编号和写入时间拼一个，每次读出来都一样，重放照样不会重复
+    params.setdefault(ENTRY_KEY, f"{seq}-{created_at:.6f}")
+    return params
+
+
+# 每种日志要重放的语句（按顺序执行，都在 db.STATEMENTS 里）
+REPLAY_STATEMENTS = {
+    "insert_follow_up": ("insert_follow_up", "update_client_follow_up"),
+    "update_follow_up": ("update_follow_up",),
+    "update_client": ("update_client",),
+}
+
+
+# 日志参数 -> 会改到的 new_quote 列（本地先把改动显示出来用）
+CLIENT_CHANGE_COLUMNS = {
+    "update_client": {"name": "名字", "country": "国家", "product": "产品", "grade": "等级", "feedback": "客户评价"},
+    "insert_follow_up": {"follow_time": "最近跟进日期", "follow_content": "跟进情况"},
+}
+CLIENT_DATE_COLUMNS = {"最近跟进日期"}  # new_quote 里是 DATE 的列：跟进时间写进去只留日期，本地显示也要一样
+
+
+def client_changes(kind, params):
+    """一条日志同步后，new_quote 里这个客户会变成什么样：{列名: 新值}（不改 new_quote 的返回空字典）"""
+    changes = {col: params[key] for key, col in CLIENT_CHANGE_COLUMNS.get(kind, {}).items()}
+    for col in CLIENT_DATE_COLUMNS & changes.keys():
+        if isinstance(changes[col], datetime):
+            changes[col] = changes[col].date()
+    return changes
+
+
+def overlay_pending(row, entries):
+    """把还没同步的修改按顺序叠加到从 MySQL 查到的客户信息上，返回新的 dict"""
+    row = dict(row)
+    for entry in entries:
+        row.update(client_changes(entry.kind, entry.params))
+    return row
+
+
+def replay(conn, entry):
+    for name in REPLAY_STATEMENTS[entry.kind]:
+        conn.execute(statement(name), entry.params)
+
+
+def flush_journal(journal, batch_size=JOURNAL_BATCH_SIZE):
+    """把最早的一批待同步条目写进 MySQL（一个事务），返回 (同步成功的条目, [(失败的条目, 错误信息)])
+    连不上数据库之类的错误整批留着、抛出异常让调用方稍后重试；某一条数据本身有问题（比如改成了重复客户）
+    就逐条重放，把那一条标成失败，其他照常写入，不让一条坏数据堵住后面所有的记录"""
+    entries = journal.pending(batch_size)
+    if not entries:
+        return [], []
+    synced, failed = [], []
+    with get_engine().connect() as conn:
+        try:
+            for entry in entries:
+                replay(conn, entry)
+            conn.commit()
+            synced = entries
+        except OperationalError as e:
+            conn.rollback()
+            journal.record_attempt([entry.seq for entry in entries], str(e.orig))
+            raise
+        except DBAPIError:
+            conn.rollback()
+            for entry in entries:
+                try:
+                    replay(conn, entry)
+                    conn.commit()
+                    synced.append(entry)
+                except OperationalError as e:
+                    conn.rollback()
+                    journal.record_attempt([entry.seq], str(e.orig))
+                    if synced:
+                        journal.mark_synced([done.seq for done in synced])
+                    raise  # 连接出问题了，剩下的稍后重试
+                except DBAPIError as e:
+                    conn.rollback()
+                    journal.mark_failed(entry.seq, str(e.orig))
+                    failed.append((entry, str(e.orig)))
+    if synced:
+        journal.mark_synced([entry.seq for entry in synced])
+    return synced, failed
+
+
+_journal = None
+
+
+def write_journal():
+    """全程序共用一个写入日志（第一次用的时候才打开文件）"""
+    global _journal
+    if _journal is None:
+        _journal = WriteJournal()
+    return _journal
@@ -0,0 +1,353 @@
+# 多人同时使用的压力模拟（不开界面）：每个线程扮演一台电脑上的 ClientInfoApp，按真实的操作比例
+# 录入新客户、修改客户、写/改跟进记录、打开客户、刷新表格，执行的就是界面和写入日志同步用的那些函数和语句
+# 跑完报告每种操作的延迟分位数、失败原因（死锁、锁等待超时、连接池借不到连接……）和 MySQL 的锁等待统计
+#   python load_sim.py --prepare 10000                    先在压测库里造 1 万个客户（同 benchmark.py 的数据）
+#   python load_sim.py --desks 12 --duration 60           12 台电脑同时用 1 分钟
+#   python load_sim.py --processes 3 --desks 4            3 个进程各 4 个线程（避开 Python GIL，更接近多台电脑）
+#   python load_sim.py --hot-clients 20 --mix edit=5,follow_insert=5   大家都改同一小撮客户，专门测锁冲突
+# 会往库里写数据，默认用压测库 client_db_bench，不碰正式客户库
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+BENCH_DATABASE = "client_db_bench"
+DEFAULT_DESKS = 12       # 模拟几台电脑（每个进程的线程数）
+DEFAULT_DURATION = 30    # 跑几秒
+THINK_SECONDS = 0.5      # 两次操作之间平均停几秒（按指数分布随机，模拟人在看屏幕、打字）
+REFRESH_PAGES = 5        # 一次刷新翻几页（界面滚动加载）
+ID_SAMPLE = 20000        # 每个进程最多读多少个现有客户 Id 来挑着操作
+PERCENTILES = (50, 90, 95, 99)
+# 默认操作比例：大部分时间在看（打开客户、刷新），写入里跟进记录最多
+DEFAULT_MIX = {
+    "open_client": 30,
+    "refresh": 15,
+    "delta_sync": 20,
+    "follow_insert": 15,
+    "follow_edit": 5,
+    "edit": 10,
+    "submit": 5,
+}
+MYSQL_DEADLOCK = 1213
+MYSQL_LOCK_WAIT_TIMEOUT = 1205
+
+
+class Desk:
+    """一台电脑：自己的随机数、看过的同步水位线、自己写过的跟进记录（之后改的就是这些）"""
+
+    def __init__(self, name, client_ids, seed):
+        self.name = name
+        self.client_ids = client_ids
+        self.rng = random.Random(seed)
+        self.watermark = None
+        self.follow_records = []  # [(客户 Id, 跟进时间)]
+        self.submitted = 0
+
+    def pick_client(self):
+        return self.rng.choice(self.client_ids)
+
+    # 每种操作对应界面上的一个动作，用的都是界面里实际调用的函数
+    def open_client(self):
+        """点一个客户：预取详情和最新一页跟进记录，再往下翻一页"""
+        from queries import FOLLOW_PAGE_SIZE, follow_cursor, query_client_prefetch, query_follow_page
+        cid = self.pick_client()
+        _, rows = query_client_prefetch(cid, FOLLOW_PAGE_SIZE)
+        if rows:
+            query_follow_page(cid, follow_cursor(rows[-1]), FOLLOW_PAGE_SIZE)
+
+    def refresh(self):
+        """整表刷新（load_data）：从第一页开始，滚动加载几页"""
+        from queries import CLIENT_PAGE_SIZE, DEFAULT_SORT_COLUMN, query_client_page
+        after = None
+        for _ in range(REFRESH_PAGES):
+            rows = query_client_page(DEFAULT_SORT_COLUMN, True, after, CLIENT_PAGE_SIZE)
+            if len(rows) < CLIENT_PAGE_SIZE:
+                break
+            after = (rows[-1][DEFAULT_SORT_COLUMN], rows[-1]["Id"])
+
+    def delta_sync(self):
+        """定时增量同步（update_table）：查上次水位线之后变了的行"""
+        from queries import query_changed_clients, query_sync_watermark
+        if self.watermark is None:
+            self.watermark = query_sync_watermark()
+            return
+        rows = query_changed_clients(self.watermark)
+        if rows:
+            self.watermark = max(row["更新时间"] for row in rows)
+
+    def follow_insert(self):
+        """写一条跟进记录（写入日志同步时重放的语句：插入记录 + 更新客户的最近跟进）"""
+        from journal import ENTRY_KEY, new_entry_key
+        cid = self.pick_client()
+        follow_time = datetime.now().replace(microsecond=0) + timedelta(seconds=self.rng.randint(0, 10 ** 6))
+        replay_entry("insert_follow_up", cid, {
+            "customer_id": cid, "follow_time": follow_time, "follow_content": f"{self.name} 压测跟进",
+            ENTRY_KEY: new_entry_key(),
+        })
+        self.follow_records.append((cid, follow_time))
+
+    def follow_edit(self):
+        """改一条自己写过的跟进记录（还没写过就先写一条）"""
+        if not self.follow_records:
+            return self.follow_insert()
+        index = self.rng.randrange(len(self.follow_records))
+        cid, original_time = self.follow_records[index]
+        follow_time = original_time + timedelta(seconds=1)
+        replay_entry("update_follow_up", cid, {
+            "customer_id": cid, "follow_time": follow_time, "original_time": original_time,
+            "follow_content": f"{self.name} 改过的压测跟进",
+        })
+        self.follow_records[index] = (cid, follow_time)
+
+    def edit(self):
+        """修改客户：先查详情（打开修改窗口），再改客户评价保存"""
+        from queries import query_client_detail
+        cid = self.pick_client()
+        row = query_client_detail(cid)
+        if row is None:
+            return
+        replay_entry("update_client", cid, {
+            "cid": cid, "name": row["名字"], "country": row["国家"], "product": row["产品"], "grade": row["等级"],
+            "feedback": f"{self.name} 压测修改 {self.rng.randint(0, 9999)}",
+        })
+
+    def submit(self):
+        """录入新询盘（Id 由序号表发号）"""
+        from queries import insert_client
+        self.submitted += 1
+        insert_client({
+            "时间": "压测", "日期": datetime.now().date(), "名字": f"Load {self.name}-{self.submitted}-{time.time_ns()}",
+            "等级": "L0", "国家": "压测", "产品": "光伏系统", "客户评价": "", "跟进情况": "",
+            "最近跟进日期": datetime.now(), "询盘信息": "压测询盘",
+        })
+
+
+def replay_entry(kind, client_id, params):
+    """像写入日志同步那样，在一个事务里重放一条修改"""
+    from db import get_engine
+    from journal import JournalEntry, replay
+    with get_engine().connect() as conn:
+        replay(conn, JournalEntry(0, kind, client_id, params))
+        conn.commit()
+
+
+def classify(error):
+    """把异常归类：死锁、锁等待超时、唯一键冲突、连接池借不到连接、其他"""
+    from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeout
+    from queries import MYSQL_DUPLICATE_KEY
+    if isinstance(error, PoolTimeout):
+        return "pool_timeout"
+    if isinstance(error, DBAPIError) and error.orig is not None and error.orig.args:
+        code = error.orig.args[0]
+        if code == MYSQL_DEADLOCK:
+            return "deadlock"
+        if code == MYSQL_LOCK_WAIT_TIMEOUT:
+            return "lock_wait_timeout"
+        if code == MYSQL_DUPLICATE_KEY:
+            return "duplicate"
+    return "error"
+
+
+def run_desk(desk, mix, deadline, think, samples):
+    """一台电脑一直操作到 deadline，每次操作的 (操作, 毫秒, 结果) 追加到 samples"""
+    operations, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        op = desk.rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            getattr(desk, op)()
+            outcome = "ok"
+        except Exception as e:
+            outcome = classify(e)
+        samples.append((op, (time.perf_counter() - started) * 1000, outcome))
+        if think:
+            time.sleep(min(desk.rng.expovariate(1 / think), max(0.0, deadline - time.monotonic())))
+
+
+def load_client_ids(hot_clients, seed):
+    from sqlalchemy import text
+    from db import get_engine
+    with get_engine().connect() as conn:
+        ids = conn.execute(text("SELECT `Id` FROM new_quote ORDER BY `Id` LIMIT :n"), {"n": ID_SAMPLE}).scalars().all()
+    if not ids:
+        raise RuntimeError("库里没有客户，先用 --prepare 造一些")
+    if hot_clients:
+        ids = random.Random(seed).sample(ids, min(hot_clients, len(ids)))
+    return ids
+
+
+def run_process(process_no, desks, duration, mix, think, hot_clients, seed):
+    """一个进程：desks 个线程同时跑，返回所有操作的记录（多进程时在子进程里执行）"""
+    from db import dispose_engines
+    client_ids = load_client_ids(hot_clients, seed)
+    deadline = time.monotonic() + duration
+    samples = []
+    threads = [
+        threading.Thread(target=run_desk, daemon=True, args=(
+            Desk(f"P{process_no}D{i}", client_ids, seed * 1000 + process_no * 100 + i), mix, deadline, think, samples))
+        for i in range(desks)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dispose_engines()
+    return samples
+
+
+def lock_stats():
+    """MySQL 的锁统计：行锁等待次数/总时间（SHOW GLOBAL STATUS）、死锁和锁超时次数（INNODB_METRICS）
+    没有权限看的项跳过"""
+    from sqlalchemy import text
+    from sqlalchemy.exc import DBAPIError
+    from db import get_engine
+    stats = {}
+    with get_engine().connect() as conn:
+        try:
+            for name, value in conn.execute(text("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock%'")):
+                stats[name] = int(value)
+            for name, value in conn.execute(text("""
+                SELECT NAME, COUNT FROM information_schema.INNODB_METRICS
+                WHERE NAME IN ('lock_deadlocks', 'lock_timeouts', 'lock_row_lock_waits')
+            """)):
+                stats[name] = int(value)
+        except DBAPIError as e:
+            print(f"⚠️ 读不到 MySQL 锁统计：{e.orig}")
+    return stats
+
+
+def percentile(sorted_values, p):
+    """最近秩法的第 p 百分位数（sorted_values 已排好序）"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-p * len(sorted_values) // 100))  # 向上取整
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """按操作汇总：次数、每秒次数、各种失败的次数、成功操作的延迟分位数（毫秒）"""
+    report = {}
+    for op in sorted({op for op, _, _ in samples}):
+        rows = [(ms, outcome) for name, ms, outcome in samples if name == op]
+        latencies = sorted(ms for ms, outcome in rows if outcome == "ok")
+        outcomes = {}
+        for _, outcome in rows:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        report[op] = {
+            "count": len(rows),
+            "per_sec": len(rows) / elapsed if elapsed else None,
+            "outcomes": outcomes,
+            **{f"p{p}_ms": percentile(latencies, p) for p in PERCENTILES},
+            "max_ms": latencies[-1] if latencies else None,
+        }
+    return report
+
+
+def print_report(report, locks_before, locks_after, elapsed):
+    print(f"\n用时 {elapsed:.1f} 秒")
+    print(f"{'操作':<14}{'次数':>8}{'次/秒':>8}" + "".join(f"{f'p{p}(ms)':>10}" for p in PERCENTILES)
+          + f"{'max(ms)':>10}  失败")
+    for op, row in report.items():
+        cells = "".join(f"{row[f'p{p}_ms']:>10.1f}" if row[f"p{p}_ms"] is not None else f"{'-':>10}"
+                        for p in PERCENTILES)
+        max_ms = f"{row['max_ms']:>10.1f}" if row["max_ms"] is not None else f"{'-':>10}"
+        failures = {k: v for k, v in row["outcomes"].items() if k != "ok"}
+        print(f"{op:<14}{row['count']:>8}{row['per_sec']:>8.1f}{cells}{max_ms}  {failures or ''}")
+    if locks_after:
+        print("\nMySQL 锁统计（这次压测期间的增量）：")
+        for name, value in locks_after.items():
+            if name in ("Innodb_row_lock_current_waits", "Innodb_row_lock_time_avg", "Innodb_row_lock_time_max"):
+                print(f"  {name}: {value}")  # 这几项是当前值/平均值，不是累计值
+            else:
+                print(f"  {name}: {value - locks_before.get(name, 0)}")
+
+
+def prepare(count, seed):
+    """删库重建压测库，造 count 个客户和跟进记录（和 benchmark.py 同一个数据生成器）"""
+    from benchmark import (FOLLOW_PER_CLIENT, assign_bench_ids, generate_clients, generate_follow_records,
+                           insert_rows, reset_database)
+    from db import MYSQL_DB, get_engine
+    from migrations import create_id_sequence_table
+    reset_database(MYSQL_DB)
+    clients = generate_clients(count, seed)
+    client_ids = assign_bench_ids(clients)
+    with get_engine().connect() as conn:
+        insert_rows(conn, "new_quote", [dict(c, Id=i) for c, i in zip(clients, client_ids)])
+        insert_rows(conn, "follow_up_record", generate_follow_records(client_ids, clients, FOLLOW_PER_CLIENT, seed))
+        create_id_sequence_table(conn)
+        conn.commit()
+    print(f"✅ 压测库 {MYSQL_DB} 已准备好：{count} 个客户")
+
+
+def parse_mix(text):
+    """"edit=5,submit=1" -> {"edit": 5, "submit": 1}"""
+    mix = {}
+    for part in text.split(","):
+        op, _, weight = part.partition("=")
+        if op.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"未知的操作：{op}（可选：{', '.join(DEFAULT_MIX)}）")
+        mix[op.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多台电脑同时使用的压力模拟")
+    parser.add_argument("--database", default=BENCH_DATABASE, help="压测用的库（会写入数据）")
+    parser.add_argument("--prepare", type=int, metavar="N", help="先删库重建，造 N 个客户再压测")
+    parser.add_argument("--desks", type=int, default=DEFAULT_DESKS, help="每个进程模拟几台电脑（线程数）")
+    parser.add_argument("--processes", type=int, default=1, help="进程数（总电脑数 = 进程数 × desks）")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="跑几秒")
+    parser.add_argument("--think", type=float, default=THINK_SECONDS, help="两次操作之间平均停几秒（0 = 不停）")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"操作比例，比如 edit=5,submit=1（可选：{', '.join(DEFAULT_MIX)}）")
+    parser.add_argument("--hot-clients", type=int, default=0, help="只在这么多个客户里挑着操作（制造锁冲突）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--out", help="结果写到这个 JSON 文件")
+    args = parser.parse_args(argv)
+
+    # 所有模块都从 db.MYSQL_DB 取默认库，必须在 import db 之前设置；每台电脑各有一个连接，连接池按线程数开
+    if args.database == os.environ.get("CRM_MYSQL_DB", "client_db"):
+        parser.error("压测会往库里写数据，不能用正在用的客户库，换一个 --database")
+    os.environ["CRM_MYSQL_DB"] = args.database
+    os.environ["CRM_DB_POOL_SIZE"] = str(args.desks)
+
+    from db import dispose_engines
+    if args.prepare:
+        prepare(args.prepare, args.seed)
+    locks_before = lock_stats()
+    dispose_engines()  # 子进程各建各的连接池，不要把父进程的连接带过去
+    started = time.monotonic()
+    worker_args = [(n, args.desks, args.duration, args.mix, args.think, args.hot_clients, args.seed)
+                   for n in range(args.processes)]
+    print(f"开始压测：{args.processes} 个进程 × {args.desks} 台电脑，{args.duration:.0f} 秒")
+    if args.processes == 1:
+        samples = run_process(*worker_args[0])
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            samples = [sample for result in pool.starmap(run_process, worker_args) for sample in result]
+    elapsed = time.monotonic() - started
+    locks_after = lock_stats()
+    dispose_engines()
+
+    report = summarize(samples, elapsed)
+    print_report(report, locks_before, locks_after, elapsed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {"created_at": datetime.now().isoformat(timespec="seconds"), "database": args.database,
+                         "processes": args.processes, "desks": args.desks, "duration": args.duration,
+                         "think": args.think, "mix": args.mix, "hot_clients": args.hot_clients, "seed": args.seed},
+                "operations": report,
+                "locks": {"before": locks_before, "after": locks_after},
+            }, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,88 @@
-# 1. 处理 Excel 数据的核心库
-import pandas as pd
-# 2. 连接 MySQL 数据库的核心库
-from sqlalchemy import create_engine, text
-# 3. 处理 MySQL 连接可能出现的错误（可选，但建议加）
-import pymysql
-pymysql.install_as_MySQLdb() #伪装成MySQLdb模块，好像新版的sqlalchemy已经支持pymysql了
-from sqlalchemy.types import DATE 
+# 1. 连接 MySQL 数据库的核心库（engine 由 db.py 统一创建）
+from sqlalchemy.exc import IntegrityError
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
+from bisect import bisect_left
 #可视化界面
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtGui import QFont, QColor, QFontMetrics, QPen, QPainter
 # 优化后的导入（合并成一行，新增组件直接加在后面）
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget,
     QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QTableWidget,
-    QTableWidgetItem, QMessageBox,
-    QComboBox, QDateEdit, QTextEdit,QSpinBox,QDialog,QListWidget,QListWidgetItem,QDateTimeEdit  # 新增的高频组件
+    QLineEdit, QPushButton, QTableView,
+    QAbstractItemView, QMessageBox,
+    QComboBox, QDateEdit, QTextEdit,QSpinBox,QDialog,QListView,QDateTimeEdit,  # 新增的高频组件
+    QCheckBox, QStyledItemDelegate, QStyle,
 )
-from PyQt5.QtCore import Qt,QDate,QSize,QDateTime,QTimer,QEvent  
-
-
-MYSQL_HOST = "localhost"       # 本地 MySQL 地址（默认都是 localhost，不用改）
-MYSQL_USER = "root"            # 你的 MySQL 用户名（默认一般是 root，插件里能看到）
-MYSQL_PASSWORD = "123456"  # 替换成你安装 MySQL 时的密码（比如 123456）
-MYSQL_DB = "client_db"        # 咱们之前创建的数据库名（必须和这个一致）
-
-# 5. 创建 MySQL 连接通道（engine）
-engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}")
+from PyQt5.QtCore import (
+    Qt, QDate, QSize, QDateTime, QTimer, QRect, QAbstractTableModel, QAbstractListModel,
+    QModelIndex, QAbstractProxyModel, pyqtSignal,
+)
+# 后台查询线程池（数据库查询不在界面线程里跑）
+from workers import query_worker
+# 数据库连接配置和连接池（所有脚本共用）
+from db import get_engine, dispose_engines
+# 客户数据的查询和写入（不依赖界面，命令行工具也用）
+from queries import (
+    SYNC_COLUMN, FILTER_DATE_COLUMNS, CLIENT_PAGE_SIZE, DEFAULT_SORT_COLUMN, FOLLOW_PAGE_SIZE,
+    client_matches_filter, query_client_page, query_changed_clients, query_sync_watermark, query_client_detail,
+    query_follow_page, query_client_prefetch, query_clients_by_ids, insert_client, client_key, is_duplicate_key_error,
+)
+# 数据库结构升级（建表、加列、加索引）
+from migrations import CLIENT_MIGRATIONS, run_migrations
+# 表格即时搜索用的 n-gram 索引
+from search_index import ClientSearchIndex
+# 最近打开过的客户详情、跟进记录的缓存
+from cache import client_cache
+# 本地写入日志：跟进记录、客户修改先落盘到本机，再由后台同步到 MySQL
+from workers import journal_flusher
+from journal import ENTRY_KEY, client_changes, new_entry_key, overlay_pending
+
+
+SYNC_OVERLAP_SECONDS = 5       # 增量同步时往回多查几秒，避免漏掉刚提交的事务
+# 允许点表头排序的列 -> 对应的索引（排序都在 MySQL 里按索引做，不在内存里排）
+SORTABLE_COLUMNS = {"Id": "PRIMARY", "日期": "idx_date", "最近跟进日期": "idx_last_follow"}
+PAGE_CHANNEL = "client_page"  # 主表格翻页用的后台查询通道
+FOLLOW_CHANNEL = "follow_records"  # 时间轴翻页用的后台查询通道
+PREFETCH_CHANNEL = "client_prefetch"  # 选中行时预取客户详情和跟进记录的通道
+PREFETCH_PRIORITY = -1                # 比正常查询优先级低，线程池忙时先让翻页、打开窗口的查询跑
+PAGE_ERROR_MESSAGE_MS = 10000  # 翻页失败的提示在状态栏显示多久（毫秒）
+TIMELINE_HEIGHT_CACHE = 2000   # 时间轴最多缓存多少条记录的排版高度（再多就丢掉最久没用的）
+
+
+def load_client_detail(client_id, on_result, on_error):
+    """取客户完整信息：缓存里有就直接回调，没有再到后台查数据库（查到后放进缓存）"""
+    row = client_cache().details.get(client_id)
+    if row is not None:
+        on_result(row)
+        return
+    query_worker().submit("client_detail", query_client_detail, client_id,
+                          on_result=partial(_cache_client_detail, client_id, on_result), on_error=on_error)
+
+
+def _cache_client_detail(client_id, on_result, row):
+    if row is not None:
+        row = with_pending_changes(client_id, row)
+        client_cache().details.put(client_id, row)
+    on_result(row)
+
+
+def _insert_client_checked(values):
+    """在后台线程里录入新客户，返回 (是否写入, 写好的这一行)
+    国家+名字 重复时返回 (False, None)，界面提示重复录入；其他错误照常抛出"""
+    try:
+        return True, insert_client(values)
+    except IntegrityError as e:
+        if is_duplicate_key_error(e):
+            return False, None
+        raise
+
+
+def with_pending_changes(client_id, row):
+    """数据库查到的客户信息，叠加上本机还没同步过去的修改（刚保存的内容打开窗口时能马上看到）"""
+    entries = journal_flusher().journal.pending(client_id=client_id)
+    return overlay_pending(row, entries) if entries else row
 
 
 # ---------------------- 1. 定义新窗口类（修改客户） ----------------------
@@ -56,19 +111,6 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
 
         # 创建布局和控件
         main_layout = QVBoxLayout(self)
-        #需要回显数据库里的数据
-        df = pd.read_sql_query(f"SELECT * FROM new_quote WHERE Id = '{self.selected_id}'", engine)
-        if not df.empty:
-            row = df.iloc[0]
-            self.name_text=row["名字"]
-            self.country_text=row["国家"]
-            self.product_text=row["产品"]
-            self.grade_text=row["等级"]
-            self.feedback_text=row["客户评价"]
-        else:
-            QMessageBox.warning(self, "提示", "客户不存在！")
-            self.close()
-
 
         #ID显示
         id_layout = QHBoxLayout()
@@ -83,7 +125,6 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
         name_layout = QHBoxLayout()
         name_layout.addWidget(QLabel("名字："))
         self.name_edit = QLineEdit()
-        self.name_edit.setText(self.name_text)
         name_layout.addWidget(self.name_edit)
         main_layout.addLayout(name_layout)
 
@@ -91,7 +132,6 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
         country_layout = QHBoxLayout()
         country_layout.addWidget(QLabel("客户国家："))
         self.country_edit = QLineEdit()
-        self.country_edit.setText(self.country_text)     
         country_layout.addWidget(self.country_edit)
         main_layout.addLayout(country_layout)
 
@@ -99,7 +139,6 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
         product_layout = QHBoxLayout()
         product_layout.addWidget(QLabel("客户产品："))
         self.product_edit = QLineEdit()
-        self.product_edit.setText(self.product_text)
         product_layout.addWidget(self.product_edit)
         main_layout.addLayout(product_layout)
 
@@ -108,21 +147,51 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
         grade_layout.addWidget(QLabel("客户等级："))
         self.grade_combo = QComboBox()
         self.grade_combo.addItems(["L0", "L1", "L2", "L3","L4"])
-        self.grade_combo.setCurrentText(self.grade_text)
         grade_layout.addWidget(self.grade_combo)
         main_layout.addLayout(grade_layout)
         # 客户评价输入
         feedback_layout = QHBoxLayout()
         feedback_layout.addWidget(QLabel("客户评价："))
         self.feedback_edit = QTextEdit()
-        self.feedback_edit.setText(self.feedback_text)
         feedback_layout.addWidget(self.feedback_edit)
         main_layout.addLayout(feedback_layout)
 
         #保存按钮
-        submit_button = QPushButton("保存修改")
-        submit_button.clicked.connect(self.submit_client)
-        main_layout.addWidget(submit_button)
+        self.submit_button = QPushButton("保存修改")
+        self.submit_button.clicked.connect(self.submit_client)
+        main_layout.addWidget(self.submit_button)
+
+        #需要回显数据库里的数据：后台查询，查到之前输入框显示「加载中」、保存按钮不可用
+        for edit in (self.name_edit, self.country_edit, self.product_edit):
+            edit.setPlaceholderText("加载中...")
+        self.submit_button.setEnabled(False)
+        load_client_detail(self.selected_id, self.show_client, self.show_load_error)
+
+    def show_client(self, row):
+        """后台查到客户信息后回显到输入框"""
+        if row is None:
+            QMessageBox.warning(self, "提示", "客户不存在！")
+            self.close()
+            return
+        self.name_text=row["名字"]
+        self.country_text=row["国家"]
+        self.product_text=row["产品"]
+        self.grade_text=row["等级"]
+        self.feedback_text=row["客户评价"]
+        self.name_edit.setText(self.name_text)
+        self.country_edit.setText(self.country_text)
+        self.product_edit.setText(self.product_text)
+        self.grade_combo.setCurrentText(self.grade_text)
+        self.feedback_edit.setText(self.feedback_text)
+        self.submit_button.setEnabled(True)
+
+    def show_load_error(self, message):
+        QMessageBox.warning(self, "提示", f"读取客户信息失败：{message}")
+        self.close()
+
+    def closeEvent(self, event):
+        query_worker().cancel("client_detail")  # 窗口关了，还没回来的查询结果不要了
+        event.accept()
 
     def submit_client(self):
         """提交新客户数据"""
@@ -139,31 +208,29 @@ class ModifyClientWindow(QWidget): #这个用来修改客户信息，包括ID 
 
 
 
+        # 查重：已加载的客户里有没有别的客户也是这个 国家+名字（没加载到的由 MySQL 唯一键在同步时拦住）
+        main_window = self.parent()
+        row = main_window.client_model.find_client(country, name)
+        if row >= 0 and main_window.client_model.row_id(row) != self.selected_id:
+            QMessageBox.warning(self, "重复客户", f"国家{country}客户{name}已存在，不能改成重复的客户！")
+            return
+        params = {
+            "cid": self.selected_id,
+            "name": name,
+            "country": country,
+            "product": product,
+            "grade": grade,
+            "feedback": feedback,
+        }
         try:
-            with engine.connect() as conn:
-               
-                # 插入数据（依赖Id）
-                sql = text("""
-                    UPDATE new_quote
-                    SET `名字` = :name, `国家` = :country, `产品` = :product, `等级` = :grade, `客户评价` = :feedback
-                    WHERE Id = :cid;
-                """)
-                conn.execute(sql, {
-                    "cid": self.selected_id,
-                    "name": name,
-                    "country": country,
-                    "product": product,
-                    "grade": grade,
-                    "feedback": feedback,
-                    
-                })
-                conn.commit()
-                QMessageBox.information(self, "成功", "客户修改成功！")
-                self.close()  # 关闭新窗口
-                self.parent().load_data()  # 刷新父窗口的表格数据
+            # 先写进本地日志（马上落盘），后台再同步到 MySQL，网络慢或断开也不会丢
+            journal_flusher().append("update_client", self.selected_id, params)
         except Exception as e:
-            
-             QMessageBox.critical(self, "失败", f"添加失败：{str(e)}")
+            QMessageBox.critical(self, "失败", f"修改失败：{str(e)}")
+            return
+        QMessageBox.information(self, "成功", "客户修改成功！")
+        self.close()  # 关闭新窗口
+        main_window.apply_local_edit(self.selected_id, client_changes("update_client", params))  # 直接更新父窗口表格里的这一行
 
 #跟进客户窗口
 class FollowUpClientWindow(QDialog):
@@ -177,23 +244,16 @@ class FollowUpClientWindow(QDialog):
         # 检查儿子是否存在（避免属性不存在报错）
         if hasattr(self, 'client_timeline'):
             self.client_timeline.stop_timer()  # 父亲调用儿子的停止方法
+            self.client_timeline.stop_sync_updates()
+        # 窗口关了，还没回来的后台查询结果不要了
+        query_worker().cancel("client_detail")
+        query_worker().cancel(FOLLOW_CHANNEL)
         event.accept()  # 允许父亲关闭
     def init_ui(self):
         """跟进客户窗口的界面初始化"""
         # 设置窗口属性
         self.setWindowTitle("跟进客户")
         self.setFixedSize(1000, 800)  # 固定大小，避免缩放
-        #从数据库获取客户信息
-        with engine.connect() as conn:
-            cursor = conn.connection.cursor(pymysql.cursors.DictCursor) # 使用字典游标，返回结果为字典格式
-            cursor.execute("SELECT 名字, 等级, 国家,最近跟进日期,跟进情况 FROM new_quote WHERE Id=%s", (self.selected_id,))
-            result = cursor.fetchone()
-            if result:
-                self.name_sqltext, self.grade_sqltext, self.country_sqltext, self.last_followup_sqltext, self.follow_up_record_sqltext = result.values()
-            else:
-                QMessageBox.warning(self, "提示", "客户不存在！")
-                self.close()
-                return
         #创建布局
         main_layout = QVBoxLayout(self)  # 垂直布局：组件从上到下排列（上方录入区+下方表格区）
         #回显客户信息，包括ID,名字，国家，等级，上一次跟进时间和记录
@@ -207,20 +267,20 @@ class FollowUpClientWindow(QDialog):
         info_layout2 = QHBoxLayout()  # 水平布局：组件从左到右排列（标签和输入框并排）
         info_layout.addWidget(QLabel("客户名字："))
         self.name_text = QLineEdit()
-        self.name_text.setText(self.name_sqltext)
+        self.name_text.setPlaceholderText("加载中...")
         self.name_text.setReadOnly(True)  # 设置为只读模式
         info_layout.addWidget(self.name_text)
         info_layout3 = QHBoxLayout()  # 水平布局：组件从左到右排列（标签和输入框并排）
         info_layout2.addWidget(QLabel("客户国家："))
         self.country_text = QLineEdit()
-        self.country_text.setText(self.country_sqltext)
+        self.country_text.setPlaceholderText("加载中...")
         self.country_text.setReadOnly(True)  # 设置为只读模式
         info_layout2.addWidget(self.country_text)
         main_layout.addLayout(info_layout3)
 
         info_layout2.addWidget(QLabel("客户等级："))
         self.grade_text = QLineEdit()
-        self.grade_text.setText(self.grade_sqltext)
+        self.grade_text.setPlaceholderText("加载中...")
         self.grade_text.setReadOnly(True)  # 设置为只读模式
         info_layout2.addWidget(self.grade_text)
         main_layout.addLayout(info_layout2)
@@ -229,6 +289,28 @@ class FollowUpClientWindow(QDialog):
         self.client_timeline = TimeLineWidget(self, self.selected_id)
         main_layout.addWidget(self.client_timeline) #把时间轴添加到布局中
 
+        #获取客户信息（缓存里没有才到后台查数据库，和时间轴的查询同时进行）
+        load_client_detail(self.selected_id, self.show_client, self.show_load_error)
+
+    def show_client(self, result):
+        """后台查到客户信息后回显"""
+        if result is None:
+            QMessageBox.warning(self, "提示", "客户不存在！")
+            self.close()
+            return
+        self.name_sqltext = result["名字"]
+        self.grade_sqltext = result["等级"]
+        self.country_sqltext = result["国家"]
+        self.last_followup_sqltext = result["最近跟进日期"]
+        self.follow_up_record_sqltext = result["跟进情况"]
+        self.name_text.setText(self.name_sqltext)
+        self.country_text.setText(self.country_sqltext)
+        self.grade_text.setText(self.grade_sqltext)
+
+    def show_load_error(self, message):
+        QMessageBox.warning(self, "提示", f"读取客户信息失败：{message}")
+        self.close()
+
       
         
        
@@ -242,19 +324,22 @@ class TimeLineWidget(QWidget):
         self.init_ui()
         # 关键：提供给父亲调用的“停止定时器”方法，这样主窗口关闭时也能停止定时器
 
-    def eventFilter(self, obj, event):
-        if event.type() == QEvent.MouseButtonPress:
-            # 把点击事件转发给 QListWidget，触发整行选中
-            QApplication.sendEvent(self.time_line_list, event)
-        return False        
     def stop_timer(self):
         if hasattr(self, 'time_timer') and self.time_timer.isActive():
             self.time_timer.stop()
+
+    def stop_sync_updates(self):
+        """关窗口时断开和全局 journal_flusher 的连接，否则关掉的时间轴一直挂在上面收同步通知"""
+        try:
+            journal_flusher().synced.disconnect(self.time_line_model.mark_synced)
+        except TypeError:  # 已经断开过了
+            pass
+
     def closeEvent(self, event):
-        print("closeEvent 触发了！") 
     # 检查定时器是否存在且在运行，是就停止
         if hasattr(self, 'time_timer') and self.time_timer.isActive():
             self.time_timer.stop()
+        self.stop_sync_updates()
         event.accept()  # 允许窗口关闭
     def init_ui(self):
         # 创建跟进时间轴
@@ -268,39 +353,24 @@ class TimeLineWidget(QWidget):
         self.title_label.setStyleSheet("color: #2C3E50;")
         self.layout.addWidget(self.title_label)
 
-        # 3. 时间轴核心组件：QListWidget（关键修复：加 position: relative）
-        self.time_line_list = QListWidget()
-        self.time_line_list.setStyleSheet("""
-                  QListWidget {
-                border: none;
-                background-color: transparent;
-                padding: 0;
-                
-            }
-            QListWidget::item {
-                border-left: 2px solid #3498DB;
-                padding-left: 20px;
-                position: relative;  /* 圆点定位必须 */
-            }
-            QListWidget::item:hover {
-                background-color: #F8F9FA;
-            }
-            QListWidget::item::before {
-                position: absolute;
-                left: -10px;
-                top: 10px;
-                width: 16px;
-                height: 16px;
-                border-radius: 8px;
-                background-color: #3498DB;
-            }
-        """)
-        # 时间轴列表初始化后，绑定信号
-        self.time_line_list.itemSelectionChanged.connect(self.highlight_selected_item) #选中高亮
+        # 3. 时间轴核心组件：QListView + 数据模型 + 绘制代理
+        # 不再给每条记录建 QWidget/QLabel，只画出屏幕上能看到的那几条，几千条记录也秒开
+        self.time_line_model = FollowRecordModel(self)
+        journal_flusher().synced.connect(self.time_line_model.mark_synced)  # 同步完成后去掉「待同步」标记
+        self.time_line_list = QListView()
+        self.time_line_list.setModel(self.time_line_model)
+        self.time_line_list.setItemDelegate(FollowRecordDelegate(self.time_line_list))
+        self.time_line_list.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.time_line_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.time_line_list.setResizeMode(QListView.Adjust)  # 宽度变了重新排版（换行后高度会变）
+        self.time_line_list.setLayoutMode(QListView.Batched)  # 分批排版，记录多时窗口先显示出来
+        self.time_line_list.setBatchSize(100)
+        self.time_line_list.setStyleSheet("QListView { border: none; background-color: transparent; }")
+        # 选中高亮由代理按 State_Selected 直接画，不用再遍历所有行改样式
         self.layout.addWidget(self.time_line_list)
 
         #下方加输入区
-        # 输入区容器（单独的Widget，和QListWidget平级）
+        # 输入区容器（单独的Widget，和时间轴列表平级）
 
         self.follow_input_widget = QWidget()
         self.follow_input_widget.setStyleSheet("""
@@ -429,217 +499,693 @@ class TimeLineWidget(QWidget):
             QMessageBox.warning(self, "输入错误", "请输入跟进内容！")
             return  # 内容为空，直接返回，不执行后续保存逻辑
         qdatetime = self.follow_time_edit.dateTime()
-        follow_time = qdatetime.toPyDateTime()# 转换为Python datetime对象，适配SQL存储
-        # 数据库操作
+        # 转换为Python datetime对象，适配SQL存储；去掉毫秒，和 DATETIME 列里存的一致（本地列表按这个时间排序、定位）
+        follow_time = qdatetime.toPyDateTime().replace(microsecond=0)
+        params = {"customer_id": self.selected_id, "follow_time": follow_time, "follow_content": follow_content,
+                  ENTRY_KEY: new_entry_key()}
+        original_time = None
         if self.is_edit_mode:
-            # 编辑模式下，更新跟进记录
-            #先拆分edit_key,获取original_time
-            original_time_str = self.current_edit_key.split("_")[1]
-            original_time = datetime.strptime(original_time_str, "%Y-%m-%d %H:%M:%S") 
-           
-            try:
-                with engine.connect() as conn:
-                    conn.execute(
-                        text("""
-                            UPDATE follow_up_record 
-                            SET 跟进时间 = :follow_time, 跟进情况 = :follow_content
-                            WHERE Id = :customer_id AND 跟进时间 = :original_time
-                        """),
-                        {"customer_id": self.selected_id,
-                         "follow_time": follow_time,
-                         "follow_content": follow_content,
-                         "original_time": original_time}
-                    )
-                    conn.commit()
-                    QMessageBox.information(self, "成功", "跟进记录已更新！")
-                    self.hide_follow_input()
-                    self.load_time_line(self.selected_id)
-                    #主窗口也要刷新
-                    self.parent().parent().load_data() #外层主窗口刷新
-                    self.is_edit_mode = False #编辑模式结束，切换为新增模式
-            except Exception as e:
-                QMessageBox.warning(self, "更新失败", f"数据库操作失败：{str(e)}")
-                conn.rollback()
-        else:
-            try:
-                with engine.connect() as conn:
-                    conn.execute(
-                        text("""
-                            INSERT INTO follow_up_record (Id, 跟进时间, 跟进情况)
-                            VALUES (:customer_id, :follow_time, :follow_content)
-                        """),
-                        {"customer_id": self.selected_id,
-                        "follow_time": follow_time,
-                        "follow_content": follow_content}
-                    )
-                    conn.execute(
-                text("""
-                    UPDATE new_quote 
-                    SET 最近跟进日期 = :follow_time, 跟进情况 = :follow_content
-                    WHERE Id = :customer_id
-                """),
-                {"customer_id": self.selected_id, "follow_time": follow_time, "follow_content": follow_content}
-            )
-
-                    conn.commit()
-                    QMessageBox.information(self, "成功", "跟进记录已保存！")
-                    self.hide_follow_input()
-                    self.load_time_line(self.selected_id)
-                    #主窗口也要刷新
-                    self.parent().parent().load_data()
-            except Exception as e:
-                QMessageBox.warning(self, "保存失败", f"数据库操作失败：{str(e)}")
-                conn.rollback()
+            # 编辑模式下，更新跟进记录（original_time 是选中那条记录原来的时间）
+            original_time = params["original_time"] = self.current_edit_time
+        kind = "update_follow_up" if self.is_edit_mode else "insert_follow_up"
+        try:
+            # 先写进本地日志（马上落盘），后台再同步到 MySQL，数据库慢或连不上也不会丢掉刚写的跟进
+            journal_flusher().append(kind, self.selected_id, params)
+        except Exception as e:
+            QMessageBox.warning(self, "保存失败", f"跟进记录保存失败：{str(e)}")
+            return
+        QMessageBox.information(self, "成功", "跟进记录已更新！" if self.is_edit_mode else "跟进记录已保存！")
+        self.hide_follow_input()  # 编辑模式结束，切换为新增模式
+        # 只在已加载的记录里改这一条（时间变了就挪到新位置），不重新加载；同步完成前标成「待同步」
+        self.time_line_model.upsert_record(follow_time, follow_content, original_time,
+                                           entry_key=params[ENTRY_KEY], pending=True)
+        #新增记录时主窗口也要刷新：只更新这个客户的一行（最近跟进日期、跟进情况）
+        #编辑旧记录只改 follow_up_record，主窗口表格里的 new_quote 没变，不用刷新
+        changes = client_changes(kind, params)
+        if changes:
+            self.parent().parent().apply_local_edit(self.selected_id, changes)
     # 4. 时间更新方法（把控件时间设为当前系统时间）
     def update_time(self):
         self.follow_time_edit.setDateTime(QDateTime.currentDateTime())
 
     def load_time_line(self, customer_id):
-        """加载指定客户的跟进记录，生成时间轴"""
-        follow_records = self.query_follow_records(customer_id) # 查询客户的所有跟进记录,这个方法是返回df的
-        if follow_records.empty:
-            self.add_empty_item()
-            return
-
-        self.time_line_list.clear()
-        # 修复：用 _ 忽略无用的 idx（不影响功能，但规范）
-        for _, row in follow_records.iterrows():
-            self.add_time_line_item(row["跟进时间"], row["跟进情况"])
+        """加载指定客户的跟进记录：先在后台取最新一页，往下滚动时再取更早的（查询期间显示「加载中」）"""
+        self.time_line_model.reset_paging(customer_id)
+        self.time_line_model.fetchMore()
 
-    def query_follow_records(self, customer_id):
-        """查询客户的所有跟进记录（按时间倒序）"""
-        try:
-            with engine.connect() as conn:
-                df = pd.read_sql(
-                    text("""
-                        SELECT 跟进时间, 跟进情况 
-                        FROM follow_up_record 
-                        WHERE Id = :customer_id 
-                        ORDER BY 跟进时间 DESC
-                    """),
-                    conn,
-                    params={"customer_id": customer_id}
-                )
-            return df
-        except Exception as e:
-            print(f"查询跟进记录失败：{str(e)}")
-            return pd.DataFrame()
-
-    def add_time_line_item(self, follow_time, follow_content):
-        """添加单个时间轴节点（解决右侧留白+垂直居中）"""
-        item = QListWidgetItem(self.time_line_list)
-
-        # 1. 先创建 widget 和布局，添加所有组件
-        widget = QWidget()
-        widget.setStyleSheet("background-color: white;")
-        h_layout = QHBoxLayout(widget)
-        
-        h_layout.setContentsMargins(0, 3, 0, 3)  # 上下内边距不变
-        h_layout.setSpacing(15)  # 时间和内容的横向间距不变
-        h_layout.setAlignment(Qt.AlignVCenter)  # 垂直居中
-
-        # 时间标签（不变，固定宽度180px）
-        time_label = QLabel(follow_time.strftime("%Y-%m-%d %H:%M:%S"))
-        time_label.setFont(QFont("微软雅黑", 10, QFont.Bold))
-        time_label.setStyleSheet("color: #E74C3C; background-color: transparent;")
-        time_label.setFixedWidth(180)
-        time_label.setTextInteractionFlags(Qt.TextSelectableByMouse)  # 允许鼠标选择
-        time_label.setCursor(Qt.IBeamCursor)  # 鼠标悬停时显示文本光标（可选，更友好）
-        #事件过滤，点击时间标签也能选中整行
-        time_label.installEventFilter(self)
-        h_layout.addWidget(time_label)
-
-        # 跟进内容标签（关键修改：解决右侧留白）
-        content_label = QLabel(follow_content)
-        content_label.setFont(QFont("微软雅黑", 10))
-        content_label.setStyleSheet("color: #34495E; background-color: transparent;")
-        content_label.setWordWrap(True)  # 自动换行保留
-        content_label.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)  # 垂直居中+左对齐
-        content_label.setMinimumWidth(400)
-        content_label.setTextInteractionFlags(Qt.TextSelectableByMouse)  # 允许鼠标选择
-        content_label.setCursor(Qt.IBeamCursor)  # 鼠标悬停时显示文本光标（可选，更友好）
-        #事件过滤，点击内容标签也能选中整行
-        content_label.installEventFilter(self)
-        h_layout.addWidget(content_label)
-        # 关键2：给 content_label 加拉伸因子（1=占满所有剩余空间）
-        h_layout.setStretchFactor(content_label, 1)
-
-        # 2. 计算 widget 高度
-        widget.adjustSize()
-        # 关键3：让 item 宽度自适应 QListWidget（不限制宽度）
-        item.setSizeHint(QSize(self.time_line_list.width() - 20, widget.height()))  # 减20px避免贴边
-
-        # 3. 把 widget 嵌入 item
-        self.time_line_list.setItemWidget(item, widget)
-    
     def edit_follow_up(self):
-        selected_items = self.time_line_list.selectedItems()
-        if not selected_items:
+        selected = self.time_line_list.selectionModel().selectedIndexes()
+        if not selected:
             QMessageBox.warning(self, "操作提示","请先选择一条跟进记录")
             return
-        
+        follow_time, follow_content = self.time_line_model.record(selected[0].row())
+
         self.is_edit_mode = True # 切换到编辑模式
         self.show_follow_input() #打开输入区
-        # 1. 拿到选中的 widget（容器）
-        selected_widget = self.time_line_list.itemWidget(selected_items[0])
-        
-        # 2. 拿到 widget 的布局（你创建的 h_layout）
-        h_layout = selected_widget.layout()  # 就是 add_time_line_item 里的 QHBoxLayout
-        
-        # 3. 按索引取两个标签（和创建顺序一致）itemAt拿到的是QLayoutItem，再调用widget()方法拿到QLabel
-        time_label = h_layout.itemAt(0).widget()  # 第0位：时间标签
-        content_label = h_layout.itemAt(1).widget()  # 第1位：内容标签
-        
-        # 4. 提取时间和内容（核心数据）
-        follow_time_str = time_label.text().strip()  # 拿到 "2025-12-18 10:00:00"
-        follow_content = content_label.text().strip()  # 拿到跟进内容
-        
-        # 5. （后续用）把数据填入输入框，准备编辑
-        # 时间字符串转 QDateTime（适配你的 follow_time_edit 控件）
-        follow_datetime = QDateTime.fromString(follow_time_str, "yyyy-MM-dd HH:mm:ss")
-        self.follow_time_edit.setDateTime(follow_datetime)
-        self.follow_content_edit.setPlainText(follow_content)
-        
-        # 6. 保存当前编辑的唯一标识（后续更新数据库用，内存临时存）
-        # 这里用「客户ID_时间字符串」当唯一标识（确保是某条特定记录）
-        self.current_edit_key = f"{self.selected_id}_{follow_time_str}"
-    def add_empty_item(self):
-        """无跟进记录时显示提示（修复3：不覆盖全局样式）"""
-        item = QListWidgetItem("暂无跟进记录")
-        # 修复3：直接给 Item 设样式（不用 QListWidget::item 选择器，避免冲突）
-        item.setStyleSheet("""
-            color: #95A5A6;
-            font-size: 12px;
-            text-align: center;
-            border: none;  /* 取消竖线 */
-        """)
-        # 让提示居中显示（设置 Item 高度，避免太矮）
-        item.setSizeHint(QSize(0, 60))
-        self.time_line_list.addItem(item)
-    def highlight_selected_item(self):
-        # 清除所有节点高亮（恢复默认样式）
-        for i in range(self.time_line_list.count()):
-            item = self.time_line_list.item(i)
-            widget = self.time_line_list.itemWidget(item)
-            # 恢复容器默认背景
-            widget.setStyleSheet("background-color: white;")
-            # 恢复标签默认颜色（按你原始样式），因为我同步修改了标签的样式
-            for label in widget.findChildren(QLabel):
-                if label.text().strip() and ":" in label.text():  # 判断是时间标签（含日期时间格式）
-                    label.setStyleSheet("color: #E74C3C; background-color: transparent;")
-                else:  # 内容标签
-                    label.setStyleSheet("color: #34495E; background-color: transparent;")
-        
-        # 给选中项加高亮（必生效）
-        selected_items = self.time_line_list.selectedItems()
-        if selected_items:
-            selected_widget = self.time_line_list.itemWidget(selected_items[0])
-            selected_widget.setStyleSheet("background-color: #1a85ff; border-radius: 8px;")
-            for label in selected_widget.findChildren(QLabel):
-                label.setStyleSheet("color: #e7f2ff; background-color: transparent;")
+        # 把数据填入输入框，准备编辑
+        self.follow_time_edit.setDateTime(QDateTime(follow_time))
+        self.follow_content_edit.setPlainText(follow_content or "")
+        # 保存当前编辑记录的原时间（客户ID + 原时间 确定是哪条记录，更新数据库时用）
+        self.current_edit_time = follow_time
+
+
+#时间轴的数据模型：只存 (跟进时间, 跟进情况) 两列数据，没有任何控件
+class FollowRecordModel(QAbstractListModel):
+    """按时间倒序存一个客户的跟进记录；滚动到底部时 Qt 调 canFetchMore/fetchMore，
+    按 (Id, 跟进时间, 记录Id) 键集分页向数据库要更早的一页"""
+    TIME_ROLE = Qt.UserRole + 1  # 代理取跟进时间用的角色
+    PENDING_ROLE = Qt.UserRole + 2  # 这条记录是不是还没同步到数据库
+
+    def __init__(self, parent=None, page_size=None):
+        super().__init__(parent)
+        self._times = []
+        self._contents = []
+        self._keys = []  # 每条记录的 记录Id（本机刚录入、还没查回来的是 None），翻页时作为起点的一部分
+        self._entry_keys = []  # 每条记录的 日志键（写入它的本地日志条目；老记录是 None）
+        self._message = None  # 没有记录时显示的提示（加载中/暂无跟进记录），作为一行不能选中的提示
+        self._pending = set()  # 还没同步到 MySQL 的记录的 日志键
+        self.customer_id = None
+        self.page_size = page_size or FOLLOW_PAGE_SIZE
+        self._has_more = False
+        self._loading = False  # 后台正在取下一页，这期间不重复请求
+
+    def set_message(self, message):
+        self.beginResetModel()
+        self._times, self._contents, self._keys, self._entry_keys = [], [], [], []
+        self._message = message
+        self.endResetModel()
+
+    def reset_paging(self, customer_id):
+        """清空已加载的记录，下一次 fetchMore 从最新一页开始"""
+        query_worker().cancel(FOLLOW_CHANNEL)
+        self.customer_id = customer_id
+        self._loading = False
+        self._has_more = True
+        self._pending = set()
+        self.set_message("加载中...")
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return (not parent.isValid() and self._has_more and not self._loading
+                and self.customer_id is not None)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """在后台取下一页（比已加载的最早一条更早的记录），取回来后追加到末尾"""
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        before = (self._times[-1], self._keys[-1] or 0) if self._times else None
+        if before is None:  # 最新一页先看缓存，最近打开过的客户不用再查数据库
+            rows = client_cache().follow_pages.get(self.customer_id)
+            if rows is not None:
+                self._on_page_loaded(rows)
+                return
+        query_worker().submit(FOLLOW_CHANNEL, query_follow_page, self.customer_id, before, self.page_size,
+                              on_result=self._on_page_loaded, on_error=self._on_page_failed)
+
+    def _on_page_loaded(self, rows):
+        self._loading = False
+        self._has_more = len(rows) >= self.page_size
+        if self._message is not None:  # 第一页：去掉「加载中」提示，并放进缓存
+            client_cache().follow_pages.put(self.customer_id, rows)
+            if not rows:
+                self.set_message("暂无跟进记录")
+                self.apply_pending()
+                return
+            self.beginResetModel()
+            self._message = None
+            self._times = [row["跟进时间"] for row in rows]
+            self._contents = [row["跟进情况"] or "" for row in rows]
+            self._keys = [row.get("记录Id") for row in rows]
+            self._entry_keys = [row.get("日志键") for row in rows]
+            self.endResetModel()
+            self.apply_pending()
+            return
+        if rows:
+            first = len(self._times)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._times.extend(row["跟进时间"] for row in rows)
+            self._contents.extend(row["跟进情况"] or "" for row in rows)
+            self._keys.extend(row.get("记录Id") for row in rows)
+            self._entry_keys.extend(row.get("日志键") for row in rows)
+            self.endInsertRows()
+
+    def _on_page_failed(self, message):
+        print(f"查询跟进记录失败：{message}")
+        self._loading = False
+        self._has_more = False
+        if self._message is not None:
+            self.set_message("暂无跟进记录")
+
+    def apply_pending(self):
+        """第一页加载后，把本机还没同步到数据库的跟进记录（新增、修改）叠加上去"""
+        for entry in journal_flusher().journal.pending(client_id=self.customer_id):
+            if entry.kind in ("insert_follow_up", "update_follow_up"):
+                params = entry.params
+                self.upsert_record(params["follow_time"], params["follow_content"],
+                                   params.get("original_time"), entry_key=params[ENTRY_KEY], pending=True)
+
+    def mark_synced(self, entries):
+        """本地日志同步成功后，去掉对应记录的「待同步」标记"""
+        keys = {entry.params[ENTRY_KEY] for entry in entries if entry.client_id == self.customer_id}
+        if not keys & self._pending:
+            return
+        self._pending -= keys
+        for row, entry_key in enumerate(self._entry_keys):
+            if entry_key in keys:
+                self.dataChanged.emit(self.index(row), self.index(row))
+
+    def upsert_record(self, follow_time, follow_content, original_time=None, entry_key=None, pending=False):
+        """保存后直接改已加载的记录：original_time 不为空是编辑（先删掉原来那条），再按时间插到对应位置
+        同一时间可以有多条记录，新增的总是单独一条；entry_key 是写入它的本地日志条目的键，已经显示了就只改内容
+        pending=True 表示还没同步到数据库。插入位置在已加载窗口之后、且还有没加载的页时不插，翻到那一页时自然会查出来"""
+        if original_time is not None:
+            row = self._position(original_time)
+            if row < len(self._times) and self._times[row] == original_time:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self._pending.discard(self._entry_keys[row])
+                del self._times[row]
+                del self._contents[row]
+                del self._keys[row]
+                del self._entry_keys[row]
+                self.endRemoveRows()
+        if self._message is not None:  # 原来显示「暂无跟进记录」，这是第一条
+            if self._loading:
+                self.cache_first_page()
+                return  # 第一页还没回来，回来的数据里已经包含这条
+            self.beginResetModel()
+            self._message = None
+            self.endResetModel()
+        if pending:
+            self._pending.add(entry_key)
+        if entry_key is not None and entry_key in self._entry_keys:  # 这条已经在列表里了（比如刚同步、查回来的页里就有）
+            row = self._entry_keys.index(entry_key)
+            self._contents[row] = follow_content
+            self.dataChanged.emit(self.index(row), self.index(row))
+            self.cache_first_page()
+            return
+        row = self._position(follow_time)
+        if row == len(self._times) and self._has_more:
+            self.cache_first_page()
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._times.insert(row, follow_time)
+        self._contents.insert(row, follow_content)
+        self._keys.insert(row, None)
+        self._entry_keys.insert(row, entry_key)
+        self.endInsertRows()
+        self.cache_first_page()
+
+    def cache_first_page(self):
+        """保存后把已加载的最新一页写回缓存；凑不满一页又还有没加载的记录时，作废缓存下次重新查"""
+        cache = client_cache().follow_pages
+        if self._loading or self._message is not None or (len(self._times) < self.page_size and self._has_more):
+            cache.pop(self.customer_id)
+            return
+        count = min(len(self._times), self.page_size)
+        cache.put(self.customer_id, [{"记录Id": self._keys[i], "跟进时间": self._times[i],
+                                      "跟进情况": self._contents[i], "日志键": self._entry_keys[i]}
+                                     for i in range(count)])
+
+    def _position(self, follow_time):
+        """二分查找：按时间倒序时 follow_time 应该在的位置（第一条不比它晚的记录）"""
+        lo, hi = 0, len(self._times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._times[mid] > follow_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def record(self, row):
+        return self._times[row], self._contents[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._times) if self._message is None else 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if self._message is not None:
+            return self._message if role == Qt.DisplayRole else None
+        if role == Qt.DisplayRole:
+            return self._contents[row]
+        if role == self.TIME_ROLE:
+            return self._times[row]
+        if role == self.PENDING_ROLE:
+            return self._entry_keys[row] in self._pending
+        if role == Qt.ToolTipRole:
+            return self._contents[row]
+        return None
+
+    def flags(self, index):
+        if self._message is not None:
+            return Qt.NoItemFlags  # 提示行不能被选中，也就不会被当成跟进记录去编辑
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+
+#时间轴的绘制代理：直接画左边的竖线和圆点、时间、自动换行的内容
+class FollowRecordDelegate(QStyledItemDelegate):
+    LINE_X = 10          # 竖线位置
+    TEXT_LEFT = 30       # 时间文字左边距
+    TIME_WIDTH = 180     # 时间列固定宽度
+    SPACING = 15         # 时间和内容的间距
+    PADDING = 6          # 上下内边距
+    MESSAGE_HEIGHT = 60  # 提示行高度
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.time_font = QFont("微软雅黑", 10, QFont.Bold)
+        self.content_font = QFont("微软雅黑", 10)
+        self.message_font = QFont("微软雅黑", 9)
+        self.content_metrics = QFontMetrics(self.content_font)
+        self.time_height = QFontMetrics(self.time_font).height()
+        # 排版高度缓存：(内容宽度, 内容) -> 高度；按内容缓存，插入/删除记录后不用整体作废
+        self._heights = {}
+
+    def content_width(self):
+        return max(self.view.viewport().width() - self.TEXT_LEFT - self.TIME_WIDTH - self.SPACING - 10, 100)
+
+    def content_height(self, width, text):
+        key = (width, text)
+        height = self._heights.pop(key, None)
+        if height is None:
+            height = self.content_metrics.boundingRect(QRect(0, 0, width, 100000), Qt.TextWordWrap, text).height()
+            if len(self._heights) >= TIMELINE_HEIGHT_CACHE:
+                del self._heights[next(iter(self._heights))]  # 丢掉最久没用的一条
+        self._heights[key] = height  # 重新放到最后，字典的顺序就是最近使用的顺序
+        return height
+
+    def sizeHint(self, option, index):
+        if not index.flags() & Qt.ItemIsSelectable:
+            return QSize(0, self.MESSAGE_HEIGHT)
+        # 待同步的记录在时间下面多一行「待同步」标记
+        time_height = self.time_height * (2 if index.data(FollowRecordModel.PENDING_ROLE) else 1)
+        height = max(self.content_height(self.content_width(), index.data()), time_height)
+        return QSize(0, height + self.PADDING * 2)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        if not index.flags() & Qt.ItemIsSelectable:  # 「加载中/暂无跟进记录」提示行
+            painter.setFont(self.message_font)
+            painter.setPen(QColor("#95A5A6"))
+            painter.drawText(rect, Qt.AlignCenter, index.data())
+            painter.restore()
+            return
+
+        selected = option.state & QStyle.State_Selected
+        if selected:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#1a85ff"))
+            painter.drawRoundedRect(rect.adjusted(self.LINE_X + 6, 1, -1, -1), 8, 8)
+        elif option.state & QStyle.State_MouseOver:
+            painter.fillRect(rect, QColor("#F8F9FA"))
+
+        # 左边的时间轴竖线和圆点
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor("#3498DB"), 2))
+        painter.drawLine(rect.left() + self.LINE_X, rect.top(), rect.left() + self.LINE_X, rect.bottom())
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#3498DB"))
+        painter.drawEllipse(rect.left() + self.LINE_X - 5, rect.top() + self.PADDING + self.time_height // 2 - 5, 10, 10)
+
+        # 时间（固定宽度）和内容（占满剩下的宽度，自动换行）
+        top = rect.top() + self.PADDING
+        painter.setFont(self.time_font)
+        painter.setPen(QColor("#e7f2ff" if selected else "#E74C3C"))
+        time_rect = QRect(rect.left() + self.TEXT_LEFT, top, self.TIME_WIDTH, self.time_height)
+        painter.drawText(time_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         index.data(FollowRecordModel.TIME_ROLE).strftime("%Y-%m-%d %H:%M:%S"))
+        if index.data(FollowRecordModel.PENDING_ROLE):
+            painter.setFont(self.message_font)
+            painter.setPen(QColor("#e7f2ff" if selected else "#F39C12"))
+            painter.drawText(time_rect.translated(0, self.time_height), Qt.AlignLeft | Qt.AlignVCenter, "待同步")
+        painter.setFont(self.content_font)
+        painter.setPen(QColor("#e7f2ff" if selected else "#34495E"))
+        content_left = time_rect.right() + self.SPACING
+        content_rect = QRect(content_left, top, self.content_width(), rect.height() - self.PADDING * 2)
+        painter.drawText(content_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, index.data())
+        painter.restore()
+
+#主表格的数据模型
+class ClientTableModel(QAbstractTableModel):
+    """按列存放 new_quote 的数据，视图要显示哪格才格式化哪格（不再给每个单元格建 QTableWidgetItem）
+    数据按页加载：滚动到底部时 Qt 调 canFetchMore/fetchMore，用键集分页向数据库要下一页"""
+    COLUMNS = ['Id',"时间","日期", "等级", "名字", "国家","产品","询盘信息","客户评价","最近跟进日期","跟进情况"]
+    DATE_COLUMNS = {"日期", "最近跟进日期"}  # 需要格式化成 yyyy-MM-dd 的列
+    TOOLTIP_COLUMNS = {"询盘信息", "客户评价", "跟进情况"}  # 内容较长，悬停显示完整内容
+    CENTER_COLUMNS = 10  # 前10列居中（跟进情况左对齐，和原来一样）
+    page_failed = pyqtSignal(str, bool)  # 加载一页失败：(错误信息, 是不是第一页)，主窗口负责提示
+
+    def __init__(self, parent=None, page_size=None):
+        super().__init__(parent)
+        self._columns = {col: [] for col in self.COLUMNS}  # 列名 -> 这一列所有行的值
+        self._row_count = 0
+        self._row_of_id = {}  # 客户 Id -> 行号，增量同步时按 Id 找到要改的行
+        self._id_of_key = {}  # 查重键(国家, 名字) -> 客户 Id，录入时 O(1) 查重
+        self.page_loader = None  # 取一页数据的函数：page_loader(排序列, 是否倒序, 上一页最后一行的键, 条数)
+        self.page_size = page_size or CLIENT_PAGE_SIZE
+        self.sort_column = DEFAULT_SORT_COLUMN
+        self.sort_desc = True
+        self._has_more = False
+        self._loading = False  # 后台正在取下一页，这期间不重复请求
+        self.search_index = ClientSearchIndex()  # 已加载行的搜索索引，随行的增、改同步更新
+        self.filters = {}  # 当前的筛选条件：合并进来的行不符合就移出表格
+
+    def reset_paging(self, page_loader):
+        """清空已加载的行，下一次 fetchMore 从第一页开始"""
+        query_worker().cancel(PAGE_CHANNEL)  # 之前排序/筛选条件下还没回来的页作废
+        self._loading = False
+        self.beginResetModel()
+        self.page_loader = page_loader
+        self._columns = {col: [] for col in self.COLUMNS}
+        self._row_count = 0
+        self._row_of_id = {}
+        self._id_of_key = {}
+        self.search_index.clear()
+        self._has_more = True
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return (not parent.isValid() and self._has_more and not self._loading
+                and self.page_loader is not None)
+
+    def fetchMore(self, parent=QModelIndex()):
+        """在后台取下一页，取回来后再插入行（界面线程不等数据库）"""
+        if not self.canFetchMore(parent):
+            return
+        self._loading = True
+        query_worker().submit(PAGE_CHANNEL, self.page_loader,
+                              self.sort_column, self.sort_desc, self._last_key(), self.page_size,
+                              on_result=self._on_page_loaded, on_error=self._on_page_failed)
+
+    def _on_page_loaded(self, rows):
+        self._loading = False
+        self._has_more = len(rows) >= self.page_size
+        if rows:
+            self._append_rows(rows)
+
+    def _on_page_failed(self, message):
+        # 停止翻页，点刷新可以重试
+        self._loading = False
+        self._has_more = False
+        self.page_failed.emit(message, self._row_count == 0)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """点表头排序：只支持有索引的列，换成服务器端 ORDER BY 后从第一页重新加载"""
+        col = self.COLUMNS[column]
+        if col not in SORTABLE_COLUMNS:
+            return
+        self.sort_column = col
+        self.sort_desc = order == Qt.DescendingOrder
+        if self.page_loader is not None:
+            self.reset_paging(self.page_loader)
+            self.fetchMore()
+
+    def upsert_rows(self, rows):
+        """把变化的行合并进来：已有的 Id 原地更新，新的 Id 插到排序位置上（还没加载到的位置就等翻页时再出现）
+        排序列的值变了的行先移出去、再按新值插到该在的位置，表格顺序和下一页的键集起点都不会乱"""
+        last_col = len(self.COLUMNS) - 1
+        for row_data in rows:
+            if not client_matches_filter(row_data, self.filters):
+                self._remove_row(row_data.get("Id"))  # 改得不再符合筛选条件了
+                continue
+            row = self._row_of_id.get(row_data.get("Id"))
+            if row is not None and row_data.get(self.sort_column) != self._columns[self.sort_column][row]:
+                self._remove_row(row_data.get("Id"))
+                row = None
+            if row is not None:
+                self._id_of_key.pop(client_key(self._columns["国家"][row], self._columns["名字"][row]), None)
+                for col in self.COLUMNS:
+                    self._columns[col][row] = row_data.get(col)
+                self._id_of_key[client_key(row_data.get("国家"), row_data.get("名字"))] = row_data.get("Id")
+                self.search_index.add(row_data.get("Id"), row_data)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_col))
+                continue
+            row = self._insert_position(self._sort_key(row_data))
+            if row == self._row_count and self._has_more:
+                continue  # 排在已加载窗口后面，翻到那一页时自然会查出来
+            self.beginInsertRows(QModelIndex(), row, row)
+            for col in self.COLUMNS:
+                self._columns[col].insert(row, row_data.get(col))
+            self._row_count += 1
+            self._reindex_from(row)
+            self._id_of_key[client_key(row_data.get("国家"), row_data.get("名字"))] = row_data.get("Id")
+            self.search_index.add(row_data.get("Id"), row_data)
+            self.endInsertRows()
+
+    def _remove_row(self, client_id):
+        """把已加载的一行移出表格（还没加载到的不用管）"""
+        row = self._row_of_id.pop(client_id, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._id_of_key.pop(client_key(self._columns["国家"][row], self._columns["名字"][row]), None)
+        for col in self.COLUMNS:
+            del self._columns[col][row]
+        self._row_count -= 1
+        self._reindex_from(row)
+        self.search_index.remove(client_id)
+        self.endRemoveRows()
+
+    def find_client(self, country, name):
+        """按 国家+名字 在已加载的客户里查重（哈希查找），返回行号，找不到返回 -1
+        没加载到的客户由 MySQL 的唯一键兜底"""
+        key = client_key(country, name)
+        if key not in self._id_of_key:
+            return -1
+        row = self._row_of_id.get(self._id_of_key[key])
+        return -1 if row is None else row
+
+    def row_id(self, row):
+        """取某一行的客户 Id（check_selection 用）"""
+        return self._columns["Id"][row]
+
+    def row_data(self, row):
+        """某一行所有列的值：{列名: 值}"""
+        return {col: self._columns[col][row] for col in self.COLUMNS}
+
+    def row_of(self, client_id):
+        """客户 Id 对应的行号，还没加载的返回 None"""
+        return self._row_of_id.get(client_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        col = self.COLUMNS[index.column()]
+        if role == Qt.DisplayRole or (role == Qt.ToolTipRole and col in self.TOOLTIP_COLUMNS):
+            return self._format(col, self._columns[col][index.row()])
+        if role == Qt.TextAlignmentRole and index.column() < self.CENTER_COLUMNS:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return str(section + 1)
+
+    def _format(self, col, value):
+        """单元格的显示文字：空值显示空串，日期列转成字符串"""
+        if value is None or value != value:  # value != value 用来判断 NaN/NaT
+            return ""
+        if col in self.DATE_COLUMNS and hasattr(value, "strftime"):
+            return value.strftime("%Y-%m-%d")
+        return str(value)
+
+    def _append_rows(self, rows):
+        start = self._row_count
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        for col in self.COLUMNS:
+            self._columns[col].extend(row.get(col) for row in rows)
+        for offset, row_data in enumerate(rows):
+            self._row_of_id[row_data.get("Id")] = start + offset
+            self._id_of_key[client_key(row_data.get("国家"), row_data.get("名字"))] = row_data.get("Id")
+            self.search_index.add(row_data.get("Id"), row_data)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+    def _reindex_from(self, start):
+        """插入/删除一行后，它后面的行号都变了，更新 Id -> 行号 的映射"""
+        ids = self._columns["Id"]
+        for row in range(start, self._row_count):
+            self._row_of_id[ids[row]] = row
+
+    def _last_key(self):
+        """已加载的最后一行的 (排序列的值, Id)，作为下一页键集查询的起点；还没加载时返回 None"""
+        if self._row_count == 0:
+            return None
+        last = self._row_count - 1
+        return (self._columns[self.sort_column][last], self._columns["Id"][last])
+
+    def _sort_key(self, row_data):
+        value = row_data.get(self.sort_column)
+        # 和 MySQL 一样把 NULL 当成最小值
+        return ((0, None) if value is None else (1, value), row_data.get("Id"))
+
+    def _insert_position(self, key):
+        """二分查找新行在当前排序下应插入的行号"""
+        ids = self._columns["Id"]
+        values = self._columns[self.sort_column]
+        low, high = 0, self._row_count
+        while low < high:
+            mid = (low + high) // 2
+            mid_key = self._sort_key({self.sort_column: values[mid], "Id": ids[mid]})
+            before = key > mid_key if self.sort_desc else key < mid_key
+            if before:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+#即时搜索的代理模型
+class ClientSearchProxyModel(QAbstractProxyModel):
+    """在已加载的行里按关键字筛选：匹配的行号由搜索索引直接给出，每次按键只处理匹配的行，不逐行判断
+    没有关键字时行号和源模型一一对应；排序、翻页都转交给源模型（服务器端）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._query = ""
+        self._rows = None  # 匹配的源行号（升序）；None 表示没在搜索
+        self._resetting = False  # 源模型插入/删除行时，搜索状态下改成整体刷新
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_source_reset)
+        model.rowsAboutToBeInserted.connect(self._on_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._on_rows_removed)
+        model.dataChanged.connect(self._on_data_changed)
+
+    def set_query(self, query):
+        """输入框每变一次调用一次：查索引得到匹配的行，整体刷新视图（只布局看得见的行）"""
+        self.beginResetModel()
+        self._query = query
+        self._rows = self._match_rows()
+        self.endResetModel()
+
+    def _match_rows(self):
+        source = self.sourceModel()
+        ids = source.search_index.search(self._query)
+        if ids is None:
+            return None
+        return sorted(row for row in map(source.row_of, ids) if row is not None)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or row >= self.rowCount() or column < 0 or column >= self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.sourceModel().rowCount() if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        row = proxy_index.row() if self._rows is None else self._rows[proxy_index.row()]
+        return self.sourceModel().index(row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._rows is None:
+            return self.index(source_index.row(), source_index.column())
+        pos = bisect_left(self._rows, source_index.row())
+        if pos < len(self._rows) and self._rows[pos] == source_index.row():
+            return self.index(pos, source_index.column())
+        return QModelIndex()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return str(section + 1) if role == Qt.DisplayRole else None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        # 搜索只在已加载的行里找，搜索时不触发翻页
+        return self._rows is None and self.sourceModel().canFetchMore(QModelIndex())
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.sourceModel().fetchMore(QModelIndex())
+
+    def _on_source_reset(self):
+        self._rows = self._match_rows()
+        self.endResetModel()
+
+    def _on_rows_about_to_be_inserted(self, parent, first, last):
+        self._resetting = self._rows is not None
+        if self._resetting:
+            self.beginResetModel()
+        else:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self._resetting:
+            self._rows = self._match_rows()
+            self._resetting = False
+            self.endResetModel()
+        else:
+            self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        self._resetting = self._rows is not None
+        if self._resetting:
+            self.beginResetModel()
+        else:
+            self.beginRemoveRows(QModelIndex(), first, last)
+
+    def _on_rows_removed(self, parent, first, last):
+        if self._resetting:
+            self._rows = self._match_rows()
+            self._resetting = False
+            self.endResetModel()
+        else:
+            self.endRemoveRows()
+
+    def _on_data_changed(self, top_left, bottom_right, roles=None):
+        if self._rows is not None:
+            rows = self._match_rows()
+            if rows != self._rows:  # 改过的行进出了搜索结果，整体刷新
+                self.beginResetModel()
+                self._rows = rows
+                self.endResetModel()
+                return
+        first = self.mapFromSource(top_left)
+        last = self.mapFromSource(bottom_right)
+        if first.isValid() and last.isValid():
+            self.dataChanged.emit(first, last)
+
 class ClientInfoApp(QMainWindow):
     def __init__(self):
         super().__init__()  # 继承 QMainWindow 的所有功能
+        self.sync_watermark = None  # 上次同步到的「更新时间」，None 表示还没全量加载过
+        self.prefetch_id = None  # 正在预取的客户 Id（同一个客户重复选中不重复查）
+        self.client_filters = {}  # 筛选栏当前生效的条件，翻页和增量同步都带上
         self.init_ui()  # 初始化界面（后面写这个方法）
         self.create_table()  # 创建学生表（后面写这个方法）
         self.load_data()  # 加载数据（后面写这个方法）
@@ -756,12 +1302,68 @@ class ClientInfoApp(QMainWindow):
         main_layout.addLayout(input_layout)
         main_layout.addLayout(input_layout2)
 
+        # ---------------------- 中间：筛选栏（条件拼成 WHERE 交给 MySQL 按索引查）----------------------
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("筛选等级："))
+        self.filter_grade = QComboBox()
+        self.filter_grade.addItems(["全部", "L0", "L1", "L2", "L3", "L4"])
+        filter_layout.addWidget(self.filter_grade)
+        filter_layout.addWidget(QLabel("国家："))
+        self.filter_country = QLineEdit()
+        self.filter_country.setPlaceholderText("开头匹配，例如：美")
+        filter_layout.addWidget(self.filter_country)
+        filter_layout.addWidget(QLabel("产品："))
+        self.filter_product = QLineEdit()
+        self.filter_product.setPlaceholderText("开头匹配")
+        filter_layout.addWidget(self.filter_product)
+        # 日期范围：勾选后才生效，可以选按询盘日期还是最近跟进日期
+        self.filter_date_check = QCheckBox("日期范围：")
+        filter_layout.addWidget(self.filter_date_check)
+        self.filter_date_column = QComboBox()
+        self.filter_date_column.addItems(FILTER_DATE_COLUMNS)
+        filter_layout.addWidget(self.filter_date_column)
+        self.filter_date_from = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.filter_date_to = QDateEdit(QDate.currentDate())
+        for date_edit in (self.filter_date_from, self.filter_date_to):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+        filter_layout.addWidget(self.filter_date_from)
+        filter_layout.addWidget(QLabel("至"))
+        filter_layout.addWidget(self.filter_date_to)
+        self.filter_btn = QPushButton("筛选")
+        self.filter_btn.clicked.connect(self.apply_filters)
+        filter_layout.addWidget(self.filter_btn)
+        self.clear_filter_btn = QPushButton("清空筛选")
+        self.clear_filter_btn.clicked.connect(self.clear_filters)
+        filter_layout.addWidget(self.clear_filter_btn)
+        # 在国家/产品输入框里按回车也直接筛选
+        self.filter_country.returnPressed.connect(self.apply_filters)
+        self.filter_product.returnPressed.connect(self.apply_filters)
+        main_layout.addLayout(filter_layout)
+
+        # 即时搜索：边输入边在已加载的行里找 名字/国家/产品
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("搜索："))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("输入名字/国家/产品的任意部分，边输边筛（只在已加载的行里找）")
+        self.search_input.setClearButtonEnabled(True)
+        search_layout.addWidget(self.search_input)
+        main_layout.addLayout(search_layout)
+
         # ---------------------- 下方：表格区域（显示学生信息）----------------------
-        self.table = QTableWidget()  # 创建表格
-        self.table.setColumnCount(11)  # 表格有10列（时间、日期、等级、名字、国家、产品、询盘信息、客户评价、最近跟进日期、跟进情况）
-        self.table.setHorizontalHeaderLabels(['Id',"时间","日期", "等级", "名字", "国家","产品","询盘信息","客户评价","最近跟进日期","跟进情况"])  # 表格列标题
+        self.client_model = ClientTableModel(self)  # 表格数据模型（按列存数据，只渲染看得见的行）
+        self.client_model.page_failed.connect(self.show_page_error)
+        self.search_proxy = ClientSearchProxyModel(self)  # 即时搜索：在已加载的行里按关键字筛选
+        self.search_proxy.setSourceModel(self.client_model)
+        self.table = QTableView()  # 创建表格
+        self.table.setModel(self.search_proxy)  # 列标题由模型提供（Id、时间、日期、等级、名字、国家、产品、询盘信息、客户评价、最近跟进日期、跟进情况）
          # 1. 设置选择行为：点击单元格自动选中整行（核心！）
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setWordWrap(False)  # 长文本不换行，行高固定，滚动时不用重新计算
+        # 点表头排序：交给模型在 MySQL 里用索引排序（先设好默认的排序列，避免开启时按第0列排）
+        self.table.horizontalHeader().setSortIndicator(
+            ClientTableModel.COLUMNS.index(DEFAULT_SORT_COLUMN), Qt.DescendingOrder)
+        self.table.setSortingEnabled(True)
         # 表格自适应列宽（让列宽跟着窗口大小变，更美观）
         self.table.horizontalHeader().setStretchLastSection(True)
         for i in range(11):
@@ -771,36 +1373,53 @@ class ClientInfoApp(QMainWindow):
         main_layout.addWidget(self.table)        
         self.table.setStyleSheet("""
         /* 表格整体样式（可选，优化基础外观） */
-        QTableWidget {
+        QTableView {
             border: 1px solid #eee;
             gridline-color: #eee;  /* 表格网格线颜色 */
             font-size: 14px;
         }
         /* 表头样式（可选） */
-        QTableWidget::horizontalHeader {
+        QTableView::horizontalHeader {
             background-color: #f8f9fa;
             border: none;
             padding: 5px;
         }
-         QTableWidget::item:!selected:hover {
+         QTableView::item:!selected:hover {
         background-color: #e8f4f8;
         color: #2196F3;
     }
         /* 选中行样式（可选，和 hover 区分） */
-        QTableWidget::item:selected {
+        QTableView::item:selected {
             background-color: #1d83c0;  /* 选中行背景色（比 hover 深一点） */
             color: #ffffff;              /* 选中行文字色 */
         }
         /* 行交替颜色（可选，配合 hover 更易读） */
-        QTableWidget {
+        QTableView {
             alternate-background-color: #fafafa;
         }
     """)
 
         #新增监听，检查是否有选中行，有则启用按钮
         self.table.selectionModel().selectionChanged.connect(self.check_selection)
+        self.search_input.textChanged.connect(self.search_proxy.set_query)
+
+        # 状态栏：后台查询的加载提示
+        self.loading_label = QLabel("")
+        self.statusBar().addWidget(self.loading_label)
+        query_worker().busy_changed.connect(self.show_loading)
+        # 状态栏：本地写入日志的同步状态（待同步几条、有没有同步失败的）
+        self.journal_label = QLabel("")
+        self.statusBar().addPermanentWidget(self.journal_label)
+        flusher = journal_flusher()
+        flusher.state_changed.connect(self.show_journal_state)
+        flusher.synced.connect(self.journal_synced)
+        flusher.failed.connect(self.journal_failed)
+        flusher.emit_state()
     # 检查是否有选中行，有则启用按钮
     def check_selection(self)->list:
+        # 换了选中行，上一个客户还没回来的详情/跟进记录查询就没用了
+        query_worker().cancel("client_detail")
+        query_worker().cancel(FOLLOW_CHANNEL)
         selected_rows = self.table.selectionModel().selectedRows()
         has_selected = len(selected_rows) > 0
         self.follow_btn.setEnabled(has_selected)
@@ -808,110 +1427,199 @@ class ClientInfoApp(QMainWindow):
          # 3. 提取选中行的 ID（核心新增逻辑）
         selected_ids = []  # 用列表存储选中行的 ID（支持多选）
         for index in selected_rows:
-            # index.row() → 获取选中行在表格中的「行号」（和 self.df 的行索引一致）
-            row_num = index.row()
-            # 从 self.df 中取出当前行的 ID（列名替换成你的实际 ID 列名，比如 'id'/'Id'）
-            row_id = self.df.iloc[row_num]["Id"]  # 关键：df.iloc[行号][列名]
+            # index.row() 是搜索代理里的行号，先换算成表格模型里的「行号」
+            row_num = self.search_proxy.mapToSource(index).row()
+            # 从表格模型中取出当前行的 ID（模型按列存数据，直接按行号取）
+            row_id = self.client_model.row_id(row_num)
             selected_ids.append(row_id)
         
         # 4. 按需使用选中的 ID（比如返回、存储或传递给其他函数）
-            self.selected_ids = selected_ids  # 存储到实例变量，供其他按钮（如修改/跟进）使用
+        self.selected_ids = selected_ids  # 存储到实例变量，供其他按钮（如修改/跟进）使用
+        self.prefetch_client(selected_ids[0] if selected_ids else None)
         return selected_ids  # 返回选中的 ID 列表（单选返回 [id]，多选返回 [id1, id2...]）
 
 
 
     # 把这段代码写在 ClientInfoApp 类里（紧跟在 init_ui 方法后面）
     def create_table(self):
+        """建表、补列、补索引交给 migrations.py：数据库已经是最新版本时只查一次版本号"""
         try:
-            with engine.connect() as conn:
-                check_sql = text("""
-                SELECT TABLE_NAME 
-                FROM information_schema.TABLES 
-                WHERE TABLE_SCHEMA = :db_name  -- 数据库名（client_db）
-                  AND TABLE_NAME = :table_name  -- 表名（client_info）
-            """)
-            # 传递参数（避免 SQL 注入，更规范）
-                result = conn.execute(
-                    check_sql,
-                    {"db_name": MYSQL_DB, "table_name": "new_quote"}
-            ).fetchone()  # fetchone()：有结果返回表名，无结果返回 None
-
-                # 1. 定义SQL语句（确保格式正确，无多余符号）
-            if result is None:   
-                create_sql = """
-    CREATE TABLE IF NOT EXISTS new_quote (
-    询盘日期 DATE NOT NULL,
-    名字 VARCHAR(20) NOT NULL,
-    客户等级 VARCHAR(20) NOT NULL,
-    国家 VARCHAR(20) NOT NULL
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """
-                # 2. 用 text() 包装SQL，转为可执行对象
-                conn.execute(text(create_sql.strip()))
-                conn.commit()
+            applied = run_migrations(get_engine(), CLIENT_MIGRATIONS)
+            if 1 in applied:
                 QMessageBox.information(self, "建表成功", "new_quote表创建成功！")
         except Exception as e:
             QMessageBox.critical(self, "建表失败", f"建表失败原因：{str(e)}")
+
     # 写在 create_table 方法后面，ClientInfoApp 类里
     def load_data(self):
-        try:
-            # 用 text() 包装查询SQL
-            self.df = pd.read_sql(text("SELECT * FROM new_quote"), engine)
-            self.update_table()
-        except Exception as e:
-            self.df = pd.DataFrame(columns=["询盘日期", "名字", "客户等级", "国家"])
-            QMessageBox.warning(self, "加载提示", f"暂无询盘数据：{str(e)}")
-            # 写在 load_data 方法后面，ClientInfoApp 类里 
-    def update_table(self):
-        # 1. 清空表格里已有的数据（避免重复显示）
-        self.table.setRowCount(0)
-        
-        # 2. 遍历 self.df（从 MySQL 读到的数据），逐行添加到表格
-        for row_idx, row in self.df.iterrows():
-            # 插入一行（行号是 row_idx）
-            self.table.insertRow(row_idx)
-            
-            # 给每一列赋值（11列：Id、时间、日期、等级、名字、国家、产品、询盘信息、客户评价、最近跟进日期、跟进情况）
-            
+        """第一次全量加载；之后（保存后、点刷新）只拉取水位线之后变化的行（都在后台查询）"""
+        if self.sync_watermark is None:
+            self.load_all_data()
+            return
+        # 往前多看 SYNC_OVERLAP_SECONDS 秒，防止漏掉「先打时间戳、后提交」的事务；重复拉到的行合并是幂等的
+        since = self.sync_watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        query_worker().submit("client_sync", query_changed_clients, since,
+                              on_result=self.apply_changed_rows, on_error=self.show_sync_error)
+
+    def prefetch_client(self, client_id):
+        """选中一个客户时，后台低优先级预取它的详情和最新一页跟进记录放进缓存，点「跟进客户」时直接显示
+        同一个客户正在预取就不重复提交；换了客户，之前的预取（还在排队的直接撤掉）作废"""
+        if client_id == self.prefetch_id and query_worker().is_pending(PREFETCH_CHANNEL):
+            return
+        cache = client_cache()
+        if client_id is None or (client_id in cache.details and client_id in cache.follow_pages):
+            self.cancel_prefetch()
+            return
+        self.prefetch_id = client_id
+        query_worker().submit(PREFETCH_CHANNEL, query_client_prefetch, client_id, FOLLOW_PAGE_SIZE,
+                              on_result=partial(self.cache_prefetched, client_id),
+                              on_error=self.prefetch_failed, priority=PREFETCH_PRIORITY)
+
+    def cache_prefetched(self, client_id, result):
+        self.prefetch_id = None
+        detail, follow_rows = result
+        cache = client_cache()
+        # 预取期间窗口可能已经自己查过、或者保存过了，缓存里已有的更新，不覆盖
+        if detail is not None and client_id not in cache.details:
+            cache.details.put(client_id, with_pending_changes(client_id, detail))  # 和打开窗口时查到的一样叠加本地修改
+        if client_id not in cache.follow_pages:
+            cache.follow_pages.put(client_id, follow_rows)
+
+    def prefetch_failed(self, message):
+        self.prefetch_id = None  # 预取失败不提示，打开窗口时会正常再查一次
+
+    def cancel_prefetch(self, client_ids=None):
+        """作废正在进行的预取（client_ids 不为空时只在预取的是其中某个客户时才作废）"""
+        if self.prefetch_id is None or (client_ids is not None and self.prefetch_id not in client_ids):
+            return
+        query_worker().cancel(PREFETCH_CHANNEL)
+        self.prefetch_id = None
+
+    def apply_changed_rows(self, rows):
+        """增量同步查回来的行合并进表格模型"""
+        if rows:
+            self.client_model.upsert_rows(rows)
+            self.sync_watermark = max(self.sync_watermark, rows[-1][SYNC_COLUMN])
+            # 这些客户在数据库里变过（可能是别人改的），缓存的详情和跟进记录都作废
+            changed_ids = {row["Id"] for row in rows}
+            client_cache().invalidate(changed_ids)
+            self.cancel_prefetch(changed_ids)  # 预取的是改之前的数据，不要了
+
+    def apply_saved_row(self, row):
+        """保存成功后，把数据库返回的这一行直接合并进表格模型（O(1)，不重新加载）"""
+        if row is None:
+            self.load_data()  # 没查回来（比如刚被别人删了），退回增量同步
+            return
+        self.client_model.upsert_rows([row])
+        # 缓存的详情作废，下次打开重新查；跟进记录由时间轴保存时自己更新缓存
+        client_cache().invalidate([row["Id"]], follow_records=False)
+        self.cancel_prefetch([row["Id"]])
+
+    def apply_local_edit(self, client_id, changes):
+        """本地保存（还没同步到数据库）后，先把改动合并进表格里这一行，界面马上就能看到"""
+        row = self.client_model.row_of(client_id)
+        if row is not None:
+            row_data = self.client_model.row_data(row)
+            row_data.update(changes)
+            self.client_model.upsert_rows([row_data])
+        client_cache().invalidate([client_id], follow_records=False)
+        self.cancel_prefetch([client_id])
+
+    def show_journal_state(self, pending, failed, error):
+        """状态栏显示本地写入的同步状态"""
+        parts = []
+        if pending:
+            parts.append(f"待同步 {pending} 条" + ("（数据库连不上，稍后自动重试）" if error else ""))
+        if failed:
+            parts.append(f"同步失败 {failed} 条")
+        self.journal_label.setText("，".join(parts) if parts else "已全部同步")
+        self.journal_label.setToolTip(error)
+        self.journal_label.setStyleSheet("color: #C0392B;" if failed or error else "")
+
+    def journal_synced(self, entries):
+        """本地修改写进数据库后，增量同步一次，表格换成数据库里的最终结果（更新时间等）"""
+        if self.sync_watermark is not None:
+            self.load_data()
 
+    def journal_failed(self, failures):
+        """数据本身有问题、写不进数据库的修改（比如改成了别人刚录入的重复客户）：提示用户，表格恢复成数据库里的样子"""
+        lines = [f"客户 {entry.client_id}：{error}" for entry, error in failures]
+        QMessageBox.warning(self, "同步失败", "以下修改没能保存到数据库：\n" + "\n".join(lines))
+        client_ids = {entry.client_id for entry, _ in failures}
+        client_cache().invalidate(client_ids)
+        query_worker().submit("client_restore", query_clients_by_ids, client_ids,
+                              on_result=self.client_model.upsert_rows)
+
+    def show_sync_error(self, message):
+        QMessageBox.warning(self, "加载提示", f"同步询盘数据失败：{message}")
+
+    def load_all_data(self):
+        """重新从第一页加载 new_quote，并记下当前最大的「更新时间」作为下一次增量同步的起点"""
+        # 先取水位线再取第一页：这中间改过的行下次增量同步会再拉一遍，不会漏
+        query_worker().submit("client_sync", query_sync_watermark,
+                              on_result=self.start_paging, on_error=self.show_load_error)
+
+    def start_paging(self, watermark):
+        self.sync_watermark = watermark or datetime(1970, 1, 2)
+        self.reload_pages()
+
+    def reload_pages(self):
+        """按当前筛选条件从第一页重新加载（筛选条件跟着翻页函数走，排序、翻页都会带上）"""
+        self.client_model.filters = self.client_filters
+        self.client_model.reset_paging(partial(query_client_page, filters=self.client_filters))
+        self.client_model.fetchMore()  # 先加载第一页，后面的页滚动到底部时再加载
+
+    def apply_filters(self):
+        """读取筛选栏，生成筛选条件后重新加载表格"""
+        filters = {}
+        if self.filter_grade.currentText() != "全部":
+            filters["grade"] = self.filter_grade.currentText()
+        if self.filter_country.text().strip():
+            filters["country"] = self.filter_country.text().strip()
+        if self.filter_product.text().strip():
+            filters["product"] = self.filter_product.text().strip()
+        if self.filter_date_check.isChecked():
+            date_from = self.filter_date_from.date().toPyDate()
+            date_to = self.filter_date_to.date().toPyDate()
+            if date_from > date_to:
+                QMessageBox.warning(self, "筛选错误", "开始日期不能晚于结束日期！")
+                return
+            filters["date_column"] = self.filter_date_column.currentText()
+            filters["date_from"] = date_from
+            filters["date_to"] = date_to
+        self.client_filters = filters
+        if self.sync_watermark is None:
+            self.load_all_data()  # 还没成功加载过，连水位线一起重新取
+        else:
+            self.reload_pages()
+
+    def clear_filters(self):
+        self.filter_grade.setCurrentIndex(0)
+        self.filter_country.clear()
+        self.filter_product.clear()
+        self.filter_date_check.setChecked(False)
+        self.apply_filters()
+
+    def show_load_error(self, message):
+        self.client_model.reset_paging(None)
+        self.sync_watermark = None
+        QMessageBox.warning(self, "加载提示", f"暂无询盘数据：{message}")
+
+    def show_page_error(self, message, first_page):
+        """第一页都没加载出来时弹窗提示（和原来一样）；后面的页失败只在状态栏提示，已加载的行留着"""
+        if first_page:
+            self.show_load_error(message)
+        else:
+            self.statusBar().showMessage(f"加载下一页失败（点刷新重试）：{message}", PAGE_ERROR_MESSAGE_MS)
 
-            self.table.setItem(row_idx, 0, QTableWidgetItem(str(row["Id"]))) 
-            self.table.setItem(row_idx, 1, QTableWidgetItem(row["时间"])) 
-            #日期不能直接显示，需要转换为字符串，先判断是否为空
-            if pd.notna(row["日期"]):
-                self.table.setItem(row_idx, 2, QTableWidgetItem(row["日期"].strftime("%Y-%m-%d"))) 
-            else:
-                self.table.setItem(row_idx, 2, QTableWidgetItem(""))  
-
-            self.table.setItem(row_idx, 3, QTableWidgetItem(row["等级"])) 
-            self.table.setItem(row_idx, 4, QTableWidgetItem(row["名字"]))   
-            # 国家是 VARCHAR 类型，直接显示即可
-            self.table.setItem(row_idx, 5, QTableWidgetItem(row["国家"]))
-            self.table.setItem(row_idx, 6, QTableWidgetItem(row["产品"]))           
-            #客户评价和跟进情况有点长，增加悬停提示
-            follow_item = QTableWidgetItem(row["客户评价"])
-            follow_item.setToolTip(row["客户评价"])  # 悬停仍显示完整内容
-            self.table.setItem(row_idx, 8, follow_item)
-            #跟进情况也增加悬停提示
-            follow_item = QTableWidgetItem(row["跟进情况"])
-            follow_item.setToolTip(row["跟进情况"])  # 悬停仍显示完整内容
-            self.table.setItem(row_idx, 10, follow_item)
-            #询盘信息也增加悬停提示
-            quote_item = QTableWidgetItem(row["询盘信息"])
-            quote_item.setToolTip(row["询盘信息"])  # 悬停仍显示完整内容
-            self.table.setItem(row_idx, 7, quote_item)
-            #最近跟进日期不能直接显示，需要转换为字符串，先判断是否为空
-            if pd.notna(row["最近跟进日期"]):
-                self.table.setItem(row_idx, 9, QTableWidgetItem(row["最近跟进日期"].strftime("%Y-%m-%d")))
-            else:
-                self.table.setItem(row_idx, 9, QTableWidgetItem(""))  
-            
-            
-            
-            # 3. 让表格内容居中对齐（更美观）
-            for col in range(10):
-                self.table.item(row_idx, col).setTextAlignment(Qt.AlignCenter)
-# 写在 update_table 方法后面，ClientInfoApp 类里
+    def show_loading(self, busy):
+        """后台有查询在跑时，状态栏提示「加载中」，表格上显示忙碌光标"""
+        self.loading_label.setText("正在从数据库加载..." if busy else "")
+        if busy:
+            self.table.viewport().setCursor(Qt.BusyCursor)
+        else:
+            self.table.viewport().unsetCursor()
+# 写在 load_data 方法后面，ClientInfoApp 类里
     def submit_client(self):
         # 1. 获取输入框里的内容（strip() 去掉前后空格，避免输入空字符）
         week = self.week_input.value()#周数
@@ -933,56 +1641,57 @@ class ClientInfoApp(QMainWindow):
  
             
         
-        # 3. 把输入的信息整理成 DataFrame（方便 pandas 写入 MySQL）
-        new_data = pd.DataFrame({
-            "时间": [f"第{week}周"],
-            "日期": [quote_date],
-            "名字": [client_name],
-            "等级": [client_level],
-            "国家": [country],
-            "产品": [product],
-            "客户评价": [eval],
-            "跟进情况": [""],
-            "最近跟进日期": [datetime.now()],
-            "询盘信息": [quote_info],
-
-        })
-        #判断是否重复数据，用国家+名字判断是否重复
-        current_data = self.df[(self.df["国家"] == country) & (self.df["名字"] == client_name)]
-        if not current_data.empty:
+        #判断是否重复数据，用国家+名字判断是否重复（先查已加载的客户，哈希查找不用访问数据库）
+        if self.client_model.find_client(country, client_name) >= 0:
             QMessageBox.warning(self, "重复录入", f"国家{country}客户{client_name}已存在，请勿重复提交！")
             return
-        # 4. 把数据写入 MySQL
-        try:
-            # df.to_sql() 本质是执行 SQL：INSERT INTO student_info (...) VALUES (...)
-            new_data.to_sql(
-                name="new_quote",  # 要写入的表名   
-                con=engine,           # 连接通道
-                if_exists="append",   # 追加数据（不覆盖已有数据）
-                index=False           # 不把 DataFrame 的索引写入 MySQL（避免多一列）
-            )
-            
-            # 5. 写入成功后，提示用户
-            QMessageBox.information(self, "成功", "客户信息录入成功！")
-            
-            # 6. 重新加载数据，更新表格（让新数据显示在表格里）
-            self.load_data()
-            
-            # 7. 清空输入框，方便下次录入
-            self.name_input.clear()
-            self.grade_input.setCurrentIndex(0)
-            self.country_input.clear()
-            self.product_input.clear()
-            self.eval_input.clear()
-            self.quote_input.clear()
-            
-        
-        except pymysql.IntegrityError:
-            # 捕获主键冲突（学号重复，因为 MySQL 表的学号是 PRIMARY KEY）
-            QMessageBox.warning(self, "重复录入", f"学号{client_id}已存在，请勿重复提交！")
-        except Exception as e:
-            # 其他错误（比如连接失败）
-            QMessageBox.error(self, "提交失败", f"录入失败：{str(e)}")
+        # 3. 把输入的信息整理好（列名 -> 值）
+        new_data = {
+            "时间": f"第{week}周",
+            "日期": quote_date,
+            "名字": client_name,
+            "等级": client_level,
+            "国家": country,
+            "产品": product,
+            "客户评价": eval,
+            "跟进情况": "",
+            "最近跟进日期": datetime.now(),
+            "询盘信息": quote_info,
+        }
+        # 4. 在后台把数据写入 MySQL（发 Id、INSERT、查回这一行要好几次往返，数据库慢时界面也不卡）
+        #    别的电脑刚录入的同名客户由唯一键拦住；写完之前提交按钮先禁用，防止重复提交
+        self.set_submitting(True)
+        query_worker().submit("client_insert", _insert_client_checked, new_data,
+                              on_result=partial(self.client_inserted, country, client_name),
+                              on_error=self.client_insert_failed)
+
+    def set_submitting(self, submitting):
+        for button in (self.submit_btn, self.quote_submit_btn):
+            button.setEnabled(not submitting)
+
+    def client_inserted(self, country, client_name, result):
+        self.set_submitting(False)
+        inserted, saved_row = result
+        if not inserted:
+            # 唯一键冲突（国家+名字 已存在，可能是别人刚录入的，界面上还没同步到）
+            QMessageBox.warning(self, "重复录入", f"国家{country}客户{client_name}已存在，请勿重复提交！")
+            return
+        # 5. 写入成功后，提示用户
+        QMessageBox.information(self, "成功", "客户信息录入成功！")
+        # 6. 把数据库里写好的这一行直接放进表格（不重新查整表）
+        self.apply_saved_row(saved_row)
+        # 7. 清空输入框，方便下次录入
+        self.name_input.clear()
+        self.grade_input.setCurrentIndex(0)
+        self.country_input.clear()
+        self.product_input.clear()
+        self.eval_input.clear()
+        self.quote_input.clear()
+
+    def client_insert_failed(self, message):
+        # 其他错误（比如连接失败）
+        self.set_submitting(False)
+        QMessageBox.critical(self, "提交失败", f"录入失败：{message}")
 
 
     #打开修改客户窗口
@@ -1010,10 +1719,16 @@ class ClientInfoApp(QMainWindow):
         self.follow_up_window.exec_() # exec_() 方法会阻塞主窗口，直到子窗口关闭
 
 # 7. 程序入口（固定写法，让程序能运行起来）
-if __name__ == "__main__":
-    app = QApplication(sys.argv)  # 创建应用实例
+def run_gui(argv=None):
+    """启动界面，返回退出码（命令行 python cli.py gui 也走这里）"""
+    app = QApplication(sys.argv if argv is None else argv)  # 创建应用实例
     window = ClientInfoApp()     # 创建主窗口
     window.show()                 # 显示窗口
-    sys.exit(app.exec_())         # 让程序持续运行
-# 最后，关闭数据库连接（好习惯，释放资源）
-engine.dispose()
+    exit_code = app.exec_()       # 让程序持续运行
+    # 最后，关闭数据库连接（好习惯，释放资源）
+    dispose_engines()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(run_gui())
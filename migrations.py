@@ -0,0 +1,300 @@
+# 数据库结构升级：建表、加列、加索引都写成按顺序编号的迁移，数据库里用 schema_version 表记下做到了第几步
+# 程序启动时只查一次做过了哪些步骤，都做过了就什么都不做（不用每次都去 information_schema 检查一遍）
+# 某一步暂时做不了（抛 MigrationPending，比如要先清理重复数据）就先跳过、不记版本号，不挡后面的步骤，下次启动再试
+# 每一步都先检查再修改，重复执行也没关系（MySQL 的 DDL 会自动提交，中途失败重跑一遍即可）
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+
+from db import statement
+
+SCHEMA_VERSION_TABLE = "schema_version"
+MIGRATION_LOCK = "crm_schema_migration"  # 多台电脑同时启动时，只让一台做升级（MySQL 命名锁）
+MIGRATION_LOCK_TIMEOUT = 60              # 等别人升级完最多等几秒
+MYSQL_NO_SUCH_TABLE = 1146               # 表不存在的错误码（第一次运行时还没有 schema_version 表）
+
+SYNC_COLUMN = "更新时间"  # new_quote 的变更时间列，增量同步靠它判断哪些行变了
+ID_SEQUENCE_TABLE = "client_id_sequence"  # 按天发客户 Id 的序号表：每天一行，记着这天发到了第几号
+COPY_CHECKPOINT_TABLE = "data_copy_checkpoint"  # 分批搬数据的进度（follow_migration.copy_in_chunks 断点续跑用）
+ROW_HASH_COLUMN = "内容哈希"  # 这一行上次从 Excel 导入时的内容指纹，Excel 差量同步靠它判断哪些行改过
+# new_quote 上的索引：索引名 -> 索引列
+CLIENT_INDEXES = {
+    "idx_date": "`日期`",
+    "idx_last_follow": "`最近跟进日期`",
+    # 筛选用的索引：筛选列在前、日期在后，筛选后按日期翻页也能走索引（文本列只索引前 20 个字）
+    "idx_grade_date": "`等级`(20), `日期`",
+    "idx_country_date": "`国家`(20), `日期`",
+    "idx_product_date": "`产品`(20), `日期`",
+}
+# 国家+名字 唯一，重复录入由 MySQL 拦住（多台电脑同时录入也不会重复）；TEXT 列只能按前缀建索引
+CLIENT_UNIQUE_KEY = ("uk_country_name", "`国家`(20), `名字`(50)")
+# 跟进记录按 (客户 Id, 跟进时间) 查询和翻页
+FOLLOW_INDEX = ("idx_id_time", "`Id`, `跟进时间`")
+FOLLOW_RECORD_KEY = "记录Id"  # follow_up_record 的自增主键，同一时间的多条记录靠它排先后
+# 有了 记录Id 之后的翻页索引，代替 FOLLOW_INDEX：和 ORDER BY 跟进时间 DESC, 记录Id DESC 完全对应
+FOLLOW_PAGE_INDEX = ("idx_id_time_key", f"`Id`, `跟进时间`, `{FOLLOW_RECORD_KEY}`")
+FOLLOW_ENTRY_KEY = "日志键"  # 写入这条跟进的本地日志条目的唯一键（journal.ENTRY_KEY），重放去重用
+
+
+class MigrationPending(Exception):
+    """这一步现在还做不了（表里的数据要先处理），先跳过，不记版本号，下次运行再试"""
+
+
+def run_migrations(engine, migrations, force=False):
+    """把 engine 连的库升级到 migrations 的最新版本，返回这次执行了的版本号列表
+    没做过的步骤按编号依次执行；抛 MigrationPending 的步骤打印原因后跳过，后面的步骤照常执行
+    force=True 时所有步骤都重跑一遍（整表被替换、或者补完数据后要补主键时用）"""
+    numbers = {number for number, _, _ in migrations}
+    with engine.connect() as conn:
+        if not force and numbers <= applied_versions(conn):
+            return []  # 最常见的情况：只查了一次版本号
+        locked = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                              {"name": MIGRATION_LOCK, "timeout": MIGRATION_LOCK_TIMEOUT}).scalar()
+        if locked != 1:  # 0 是等超时（别的电脑还在升级），NULL 是出错；没拿到锁就不能动表结构
+            raise RuntimeError(f"{MIGRATION_LOCK_TIMEOUT} 秒内没有等到数据库升级锁（别的电脑可能正在升级），请稍后再试")
+        try:
+            create_version_table(conn)
+            done = set() if force else applied_versions(conn)  # 拿到锁后再查一次，别人可能刚升级完
+            applied = []
+            for number, description, step in migrations:
+                if number in done:
+                    continue
+                print(f"数据库升级 {number}：{description}")
+                try:
+                    step(conn)
+                except MigrationPending as e:
+                    conn.rollback()
+                    print(f"⚠️ 数据库升级 {number} 暂缓（下次启动再试）：{e}")
+                    continue
+                conn.execute(text(f"""
+                    INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (:version, :description)
+                    ON DUPLICATE KEY UPDATE applied_at = CURRENT_TIMESTAMP
+                """), {"version": number, "description": description})
+                conn.commit()
+                applied.append(number)
+            return applied
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK})
+
+
+def applied_versions(conn):
+    """数据库里已经做过的步骤编号；还没有 schema_version 表时是空集合"""
+    try:
+        return set(conn.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")).scalars())
+    except ProgrammingError as e:
+        if e.orig.args[0] != MYSQL_NO_SUCH_TABLE:
+            raise
+        conn.rollback()
+        return set()
+
+
+def create_version_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+            version INT PRIMARY KEY,
+            description VARCHAR(200) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    conn.commit()
+
+
+def column_exists(conn, table, column):
+    database = conn.engine.url.database
+    return conn.execute(statement("column_exists"), {
+        "db_name": database, "table_name": table, "col_name": column
+    }).scalar() > 0
+
+
+def table_columns(conn, table):
+    """表的列名（按表里的顺序）；表不存在时是空列表"""
+    database = conn.engine.url.database
+    return [row[0] for row in conn.execute(statement("table_columns"), {"db_name": database, "table_name": table})]
+
+
+def index_names(conn, table):
+    database = conn.engine.url.database
+    return {row[0] for row in conn.execute(statement("index_names"), {"db_name": database, "table_name": table})}
+
+
+# ---------------------- 客户库（new_quote、follow_up_record）的迁移 ----------------------
+def create_client_tables(conn):
+    """客户表和跟进记录表（平时由 Excel 导入建表，这里保证新库也能直接用）"""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS new_quote (
+            `Id` VARCHAR(50) NOT NULL,
+            `时间` TEXT, `日期` DATE, `等级` TEXT, `名字` TEXT, `国家` TEXT, `产品` TEXT,
+            `询盘信息` TEXT, `客户评价` TEXT, `最近跟进日期` DATE, `跟进情况` TEXT,
+            PRIMARY KEY (`Id`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS follow_up_record (
+            `Id` VARCHAR(50) NOT NULL,
+            `跟进时间` DATETIME NOT NULL,
+            `跟进情况` TEXT
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    conn.commit()
+
+
+def add_client_id(conn):
+    """客户 Id 列和主键（原来在 给数据库加上ID.py 里临时 ALTER）
+    Excel 刚导入时还没有 Id，先只加列；client_ids.generate_client_id 填好 Id 后会重跑一遍，那时再加主键"""
+    if not column_exists(conn, "new_quote", "Id"):
+        conn.execute(text("ALTER TABLE new_quote ADD COLUMN `Id` VARCHAR(50) FIRST"))
+        print("✅ 成功新增 Id 列")
+    if "PRIMARY" in index_names(conn, "new_quote"):
+        return
+    missing = conn.execute(text("SELECT COUNT(*) FROM new_quote WHERE `Id` IS NULL")).scalar()
+    if missing:
+        print(f"ℹ️ 还有 {missing} 个客户没有 Id，暂不设主键（生成 Id 后会自动补上）")
+        return
+    conn.execute(text("ALTER TABLE new_quote ADD PRIMARY KEY (`Id`)"))
+    print("✅ 成功设置 Id 为主键")
+
+
+def add_sync_column(conn):
+    """给 new_quote 加上「更新时间」列（增量同步的水位线），每次 INSERT/UPDATE 由 MySQL 自动刷新"""
+    if not column_exists(conn, "new_quote", SYNC_COLUMN):
+        # TIMESTAMP(3) 精确到毫秒；加索引后按水位线查变化的行不用全表扫描
+        conn.execute(text(f"""
+            ALTER TABLE new_quote
+            ADD COLUMN `{SYNC_COLUMN}` TIMESTAMP(3) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+            ADD INDEX idx_updated_at (`{SYNC_COLUMN}`)
+        """))
+
+
+def add_client_indexes(conn):
+    """分页排序、筛选用的索引（InnoDB 二级索引自带主键 Id，正好对应 ORDER BY 列, Id）"""
+    existing = index_names(conn, "new_quote")
+    for index_name, columns in CLIENT_INDEXES.items():
+        if index_name not in existing:
+            conn.execute(text(f"ALTER TABLE new_quote ADD INDEX {index_name} ({columns})"))
+
+
+def add_client_unique_key(conn):
+    """国家+名字 唯一键。表里已经有重复客户时建不起来：这一步暂缓、不记版本号，
+    清理掉重复的客户后下次启动会再试（这期间只靠界面上的查重）"""
+    unique_name, unique_columns = CLIENT_UNIQUE_KEY
+    if unique_name in index_names(conn, "new_quote"):
+        return
+    try:
+        conn.execute(text(f"ALTER TABLE new_quote ADD UNIQUE KEY {unique_name} ({unique_columns})"))
+    except IntegrityError as e:
+        raise MigrationPending(f"唯一键 {unique_name} 建立失败：new_quote 里已有重复的 国家+名字，"
+                           f"请先合并或删除重复客户（{e.orig}）") from e
+
+
+def add_follow_index(conn):
+    """跟进记录的 (Id, 跟进时间) 联合索引：查一个客户的记录、按时间倒序翻页都直接走索引"""
+    index_name, columns = FOLLOW_INDEX
+    existing = index_names(conn, "follow_up_record")
+    if index_name in existing or FOLLOW_PAGE_INDEX[0] in existing:  # 已经换成了带 记录Id 的索引
+        return
+    id_type = conn.execute(text("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME = 'follow_up_record' AND COLUMN_NAME = 'Id'
+    """), {"db_name": conn.engine.url.database}).scalar()
+    if id_type in ("text", "mediumtext", "longtext"):
+        # 老表的 Id 是 TEXT 只能建前缀索引，前缀索引没法用来按时间排序，改成和 new_quote 一样的 VARCHAR(50)
+        conn.execute(text("ALTER TABLE follow_up_record MODIFY `Id` VARCHAR(50)"))
+    conn.execute(text(f"ALTER TABLE follow_up_record ADD INDEX {index_name} ({columns})"))
+
+
+def add_follow_record_key(conn):
+    """给 follow_up_record 加自增主键「记录Id」，(Id, 跟进时间) 索引换成 (Id, 跟进时间, 记录Id)：
+    同一客户同一时间有多条记录时，时间轴按 (跟进时间, 记录Id) 翻页也有唯一的先后（一条 ALTER 只重建一次表）"""
+    changes = []
+    if not column_exists(conn, "follow_up_record", FOLLOW_RECORD_KEY):
+        changes.append(f"ADD COLUMN `{FOLLOW_RECORD_KEY}` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST")
+    existing = index_names(conn, "follow_up_record")
+    index_name, columns = FOLLOW_PAGE_INDEX
+    if index_name not in existing:
+        changes.append(f"ADD INDEX {index_name} ({columns})")
+    if FOLLOW_INDEX[0] in existing:  # 新索引的前缀，留着是多余的
+        changes.append(f"DROP INDEX {FOLLOW_INDEX[0]}")
+    if changes:
+        conn.execute(text(f"ALTER TABLE follow_up_record {', '.join(changes)}"))
+
+
+def add_follow_entry_key(conn):
+    """给 follow_up_record 加「日志键」列和唯一键：本地日志重放按它去重（老记录是 NULL，唯一键允许多个 NULL）"""
+    if not column_exists(conn, "follow_up_record", FOLLOW_ENTRY_KEY):
+        conn.execute(text(f"""
+            ALTER TABLE follow_up_record
+            ADD COLUMN `{FOLLOW_ENTRY_KEY}` VARCHAR(64) NULL,
+            ADD UNIQUE KEY uk_entry_key (`{FOLLOW_ENTRY_KEY}`)
+        """))
+
+
+def add_row_hash_column(conn):
+    """给 new_quote 加上「内容哈希」列（SHA-1 十六进制 40 位）；界面里录入/修改的客户是空的，只有 Excel 导入的有"""
+    if not column_exists(conn, "new_quote", ROW_HASH_COLUMN):
+        conn.execute(text(f"ALTER TABLE new_quote ADD COLUMN `{ROW_HASH_COLUMN}` CHAR(40) NULL"))
+
+
+def create_id_sequence_table(conn):
+    """客户 Id 序号表（client_ids.reserve_ids 用），按 new_quote 里已有的 Id 设好每天的起点"""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {ID_SEQUENCE_TABLE} (
+            `day` CHAR(8) NOT NULL PRIMARY KEY,
+            `last_seq` INT UNSIGNED NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {ID_SEQUENCE_TABLE} (`day`, `last_seq`)
+        SELECT * FROM (
+            SELECT SUBSTRING(`Id`, 3, 8) AS day, MAX(CAST(SUBSTRING(`Id`, 11) AS UNSIGNED)) AS used
+            FROM new_quote
+            WHERE `Id` REGEXP '^KZ[0-9]{{9,}}$'
+            GROUP BY day
+        ) AS existing
+        ON DUPLICATE KEY UPDATE `last_seq` = GREATEST(`last_seq`, existing.used)
+    """))
+
+
+def create_copy_checkpoint_table(conn):
+    """分批搬数据的断点表：每个任务一行，记着搬到了哪个主键、搬了多少行"""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {COPY_CHECKPOINT_TABLE} (
+            `name` VARCHAR(100) NOT NULL PRIMARY KEY,
+            `last_key` VARCHAR(50) NOT NULL DEFAULT '',
+            `rows_copied` BIGINT NOT NULL DEFAULT 0,
+            `finished` TINYINT(1) NOT NULL DEFAULT 0,
+            `updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+
+
+# (版本号, 说明, 执行函数)：只能在末尾追加，已经发布的步骤不要改编号
+CLIENT_MIGRATIONS = [
+    (1, "创建 new_quote、follow_up_record 表", create_client_tables),
+    (2, "new_quote 增加 Id 列和主键", add_client_id),
+    (3, "new_quote 增加「更新时间」列", add_sync_column),
+    (4, "new_quote 增加分页/筛选索引", add_client_indexes),
+    (5, "follow_up_record 增加 (Id, 跟进时间) 索引", add_follow_index),
+    (6, "new_quote 增加「内容哈希」列", add_row_hash_column),
+    (7, "创建客户 Id 序号表", create_id_sequence_table),
+    (8, "创建分批搬数据的断点表", create_copy_checkpoint_table),
+    (9, "follow_up_record 增加自增主键 记录Id", add_follow_record_key),
+    (10, "new_quote 增加 国家+名字 唯一键", add_client_unique_key),
+    (11, "follow_up_record 增加「日志键」列", add_follow_entry_key),
+]
+
+
+# ---------------------- 学生库（student_info）的迁移 ----------------------
+def create_student_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS student_info (
+            学号 CHAR(4) PRIMARY KEY,
+            姓名 VARCHAR(20) NOT NULL,
+            年龄 INT NOT NULL,
+            班级 VARCHAR(20) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """))
+
+
+STUDENT_MIGRATIONS = [
+    (1, "创建 student_info 表", create_student_table),
+]
@@ -0,0 +1,191 @@
+# 客户数据的查询和写入（不依赖界面）：主窗口、命令行、批处理脚本都用这里的函数
+# 只依赖 SQLAlchemy，不 import PyQt5 和 pandas，命令行工具启动很快
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
+
+from client_ids import client_id_allocator
+from db import get_engine, statement
+from migrations import SYNC_COLUMN
+
+TEXT_PREVIEW_CHARS = 300       # 询盘信息/客户评价/跟进情况这些长文本在表格里只取前面这么多字
+FILTER_DATE_COLUMNS = ["日期", "最近跟进日期"]  # 筛选栏里可以选的日期范围列
+MYSQL_DUPLICATE_KEY = 1062  # MySQL 唯一键冲突的错误码
+CLIENT_PAGE_SIZE = 200         # 主表格每次滚动到底部时加载的行数
+DEFAULT_SORT_COLUMN = "日期"   # 默认按询盘日期倒序（最新的在最上面）
+FOLLOW_PAGE_SIZE = 50          # 时间轴每次加载的跟进记录条数（先显示最新的，往下滚再加载更早的）
+
+# 主表格用的查询：大段文本只取前 TEXT_PREVIEW_CHARS 个字，完整内容在修改/跟进窗口里再查
+CLIENT_LIST_SQL = f"""
+    SELECT `Id`, `时间`, `日期`, `等级`, `名字`, `国家`, `产品`,
+           LEFT(`询盘信息`, {TEXT_PREVIEW_CHARS}) AS `询盘信息`,
+           LEFT(`客户评价`, {TEXT_PREVIEW_CHARS}) AS `客户评价`,
+           `最近跟进日期`,
+           LEFT(`跟进情况`, {TEXT_PREVIEW_CHARS}) AS `跟进情况`,
+           `{SYNC_COLUMN}`
+    FROM new_quote
+"""
+
+
+def build_client_filter(filters):
+    """把筛选栏的条件拼成参数化的 WHERE 条件列表，返回 (条件列表, 参数字典)
+    filters 里可以有：grade 等级、country 国家前缀、product 产品前缀、date_column + date_from/date_to 日期范围"""
+    conditions, params = [], {}
+    if not filters:
+        return conditions, params
+    if filters.get("grade"):
+        conditions.append("`等级` = :f_grade")
+        params["f_grade"] = filters["grade"]
+    # 国家、产品按前缀匹配（LIKE 'xx%' 能用上索引，'%xx%' 就不行了）
+    for key, col in (("country", "国家"), ("product", "产品")):
+        if filters.get(key):
+            conditions.append(f"`{col}` LIKE :f_{key}")
+            params[f"f_{key}"] = escape_like(filters[key]) + "%"
+    date_col = filters.get("date_column")
+    if date_col in FILTER_DATE_COLUMNS:
+        if filters.get("date_from") is not None:
+            conditions.append(f"`{date_col}` >= :f_date_from")
+            params["f_date_from"] = filters["date_from"]
+        if filters.get("date_to") is not None:
+            conditions.append(f"`{date_col}` <= :f_date_to")
+            params["f_date_to"] = filters["date_to"]
+    return conditions, params
+
+
+def client_matches_filter(row, filters):
+    """在程序里判断一行客户符不符合筛选条件（和 build_client_filter 拼出的 WHERE 一致）
+    增量同步查回来的行不带筛选条件，由界面用它决定这一行留在表格里还是移出去
+    国家、产品前缀不区分大小写，和 MySQL 默认的排序规则一样"""
+    if not filters:
+        return True
+    if filters.get("grade") and row.get("等级") != filters["grade"]:
+        return False
+    for key, col in (("country", "国家"), ("product", "产品")):
+        if filters.get(key) and not (row.get(col) or "").casefold().startswith(filters[key].casefold()):
+            return False
+    date_col = filters.get("date_column")
+    if date_col in FILTER_DATE_COLUMNS:
+        value = row.get(date_col)  # 日期为空的行在 SQL 里也不符合范围条件
+        if filters.get("date_from") is not None and (value is None or value < filters["date_from"]):
+            return False
+        if filters.get("date_to") is not None and (value is None or value > filters["date_to"]):
+            return False
+    return True
+
+
+def escape_like(value):
+    """转义 LIKE 里的通配符，用户输入的 % 和 _ 按普通字符匹配"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def query_client_page(sort_column, descending, after_key, limit, filters=None):
+    """键集分页取一页客户：按 (排序列, Id) 排序，从上一页最后一行之后接着取，不用 OFFSET 扫描前面的行"""
+    col = f"`{sort_column}`"
+    op = "<" if descending else ">"
+    conditions, params = build_client_filter(filters)
+    params["limit"] = limit
+    if after_key is not None:
+        last_value, last_id = after_key
+        params["last_id"] = last_id
+        if sort_column == "Id":
+            conditions.append(f"`Id` {op} :last_id")
+        elif last_value is None:
+            # MySQL 里 NULL 最小：倒序时 NULL 排在最后，正序时排在最前
+            conditions.append(f"({col} IS NULL AND `Id` < :last_id)" if descending
+                              else f"(({col} IS NULL AND `Id` > :last_id) OR {col} IS NOT NULL)")
+        else:
+            params["last_value"] = last_value
+            keyset = f"{col} {op} :last_value OR ({col} = :last_value AND `Id` {op} :last_id)"
+            conditions.append(f"({keyset} OR {col} IS NULL)" if descending else f"({keyset})")
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    direction = "DESC" if descending else "ASC"
+    order_by = "`Id` " + direction if sort_column == "Id" else f"{col} {direction}, `Id` {direction}"
+    with get_engine().connect() as conn:
+        return conn.execute(
+            text(f"{CLIENT_LIST_SQL} {where} ORDER BY {order_by} LIMIT :limit"), params
+        ).mappings().all()
+
+
+def query_changed_clients(since):
+    """增量同步：查「更新时间」不早于 since 的所有行。不带筛选条件：改得不再符合筛选的行也要查回来，
+    界面才知道要把它从表格里移走（用 client_matches_filter 判断）"""
+    with get_engine().connect() as conn:
+        return conn.execute(text(f"""
+            {CLIENT_LIST_SQL}
+            WHERE `{SYNC_COLUMN}` >= :since
+            ORDER BY `{SYNC_COLUMN}`
+        """), {"since": since}).mappings().all()
+
+
+def query_sync_watermark():
+    """当前 new_quote 里最大的「更新时间」（有索引，只读一个值）"""
+    with get_engine().connect() as conn:
+        return conn.execute(text(f"SELECT MAX(`{SYNC_COLUMN}`) FROM new_quote")).scalar()
+
+
+def query_client_detail(client_id):
+    """按 Id 查一个客户的完整信息，查不到返回 None"""
+    with get_engine().connect() as conn:
+        row = conn.execute(statement("client_by_id"), {"cid": client_id}).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def query_clients_by_ids(client_ids):
+    """按 Id 查一批客户（表格用的列），比如本地修改没能同步时，把表格里这几行恢复成数据库里的样子"""
+    stmt = text(f"{CLIENT_LIST_SQL} WHERE `Id` IN :ids").bindparams(bindparam("ids", expanding=True))
+    with get_engine().connect() as conn:
+        return conn.execute(stmt, {"ids": list(client_ids)}).mappings().all()
+
+
+def client_key(country, name):
+    """国家+名字 的查重键：去掉首尾空格、忽略大小写（和 MySQL 默认排序规则的比较方式一致）"""
+    return (str(country or "").strip().casefold(), str(name or "").strip().casefold())
+
+
+def is_duplicate_key_error(error):
+    """是不是唯一键冲突（国家+名字 已存在）"""
+    return isinstance(error, IntegrityError) and error.orig.args[0] == MYSQL_DUPLICATE_KEY
+
+
+def fetch_client_row(conn, where, params):
+    """写入后把这一行按表格的列查回来（含数据库生成的 Id、默认值、更新时间），用来直接更新表格"""
+    row = conn.execute(text(f"{CLIENT_LIST_SQL} WHERE {where}"), params).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def insert_client(values):
+    """一条 INSERT 写入新客户（Id 由序号表按询盘日期发号）；国家+名字 重复时 MySQL 直接报唯一键冲突，不用先查一遍
+    返回写入后的完整一行（按 Id 查回来）"""
+    with get_engine().connect() as conn:
+        values = dict(values, Id=client_id_allocator().next_id(conn, values.get("日期")))
+        columns = ", ".join(f"`{col}`" for col in values)
+        placeholders = ", ".join(f":{col}" for col in values)
+        conn.execute(text(f"INSERT INTO new_quote ({columns}) VALUES ({placeholders})"), values)
+        conn.commit()
+        return fetch_client_row(conn, "`Id` = :cid", {"cid": values["Id"]})
+
+
+def query_client_prefetch(client_id, follow_limit):
+    """预取一个客户：完整信息 + 最新一页跟进记录，用同一个连接查完，返回 (客户信息, 跟进记录列表)"""
+    with get_engine().connect() as conn:
+        row = conn.execute(statement("client_by_id"), {"cid": client_id}).mappings().first()
+        follow_rows = conn.execute(statement("follow_records_first_page"),
+                                   {"customer_id": client_id, "limit": follow_limit}).mappings().all()
+    return (dict(row) if row is not None else None), follow_rows
+
+
+def follow_cursor(row):
+    """一条跟进记录在时间轴上的位置 (跟进时间, 记录Id)，作为下一页的起点
+    本机刚录入、还没有 记录Id 的记录算 0：下一页从比它的时间更早的记录开始"""
+    return row["跟进时间"], row.get("记录Id") or 0
+
+
+def query_follow_page(customer_id, before, limit):
+    """取客户的一页跟进记录（按时间倒序）：before 为 None 取最新一页，
+    否则是上一页最后一条的 (跟进时间, 记录Id)，取排在它后面的"""
+    params = {"customer_id": customer_id, "limit": limit}
+    name = "follow_records_first_page"
+    if before is not None:
+        params["before"], params["before_key"] = before
+        name = "follow_records_before"
+    with get_engine().connect() as conn:
+        return conn.execute(statement(name), params).mappings().all()
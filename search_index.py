@@ -0,0 +1,76 @@
+# 表格即时搜索用的索引：把 名字/国家/产品 转成小写后拆成 1~3 个字的片段（n-gram），
+# 每个片段记下包含它的客户 Id，输入关键字时查几个集合求交集就行，不用每次把所有行扫一遍
+from collections import defaultdict
+
+SEARCH_FIELDS = ("名字", "国家", "产品")  # 参与搜索的列
+MAX_GRAM = 3  # 片段最长 3 个字；更长的关键字拆成多个 3 字片段求交集，再核对一遍原文
+FIELD_SEPARATOR = "\x00"  # 字段之间的分隔符，保证片段不会跨字段拼出来
+
+
+class ClientSearchIndex:
+    """n-gram 倒排索引：片段 -> 包含这个片段的客户 Id 集合；支持单行增、删、改"""
+
+    def __init__(self):
+        self._grams = defaultdict(set)  # 片段 -> {客户 Id}
+        self._texts = {}  # 客户 Id -> 拼好的小写文本（长关键字核对原文用）
+
+    def clear(self):
+        self._grams.clear()
+        self._texts.clear()
+
+    def add(self, key, row):
+        """加入（或更新）一行：row 是能按列名取值的对象（dict、RowMapping 都行）"""
+        if key in self._texts:
+            self.remove(key)
+        text = normalize(FIELD_SEPARATOR.join(str(row.get(col) or "") for col in SEARCH_FIELDS))
+        self._texts[key] = text
+        for gram in split_grams(text):
+            self._grams[gram].add(key)
+
+    def remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in split_grams(text):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def search(self, query):
+        """返回匹配关键字的客户 Id 集合；关键字为空返回 None（表示不筛选）。返回的集合只读，不要修改"""
+        query = normalize(query)
+        if not query:
+            return None
+        if len(query) <= MAX_GRAM:
+            return self._grams.get(query, set())
+        # 长关键字：所有 3 字片段都出现的行才可能匹配，从最小的集合开始求交集
+        candidates = sorted((self._grams.get(query[i:i + MAX_GRAM], set())
+                             for i in range(len(query) - MAX_GRAM + 1)), key=len)
+        result = set(candidates[0])
+        for keys in candidates[1:]:
+            if not result:
+                break
+            result &= keys
+        # 片段都在但不一定连在一起，最后核对一遍原文
+        return {key for key in result if query in self._texts[key]}
+
+    def __len__(self):
+        return len(self._texts)
+
+
+def normalize(text):
+    """统一大小写和首尾空格（casefold 比 lower 更彻底，比如德语 ß）"""
+    return text.casefold().strip()
+
+
+def split_grams(text):
+    """把文本拆成所有 1~MAX_GRAM 个字的片段（去重；含分隔符的片段不要）"""
+    grams = set()
+    for size in range(1, MAX_GRAM + 1):
+        for i in range(len(text) - size + 1):
+            gram = text[i:i + size]
+            if FIELD_SEPARATOR not in gram:
+                grams.add(gram)
+    return grams
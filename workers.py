@@ -0,0 +1,190 @@
+# 后台查询线程池：数据库查询放到子线程里跑，查完用信号把结果送回界面线程，界面不会卡住
+import itertools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+
+QUERY_THREADS = 4  # 同时跑的查询数，engine 的连接池要比这个大（每个查询各自从池里借一个连接）
+
+
+class QuerySignals(QObject):
+    """QRunnable 不是 QObject，不能直接发信号，所以单独放一个信号对象"""
+    finished = pyqtSignal(int, object)  # (任务编号, 查询结果)
+    failed = pyqtSignal(int, str)  # (任务编号, 错误信息)
+
+
+class QueryTask(QRunnable):
+    """在线程池里执行一次查询函数"""
+    def __init__(self, ticket, fn, args, kwargs):
+        super().__init__()
+        self.ticket = ticket
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False  # 被新请求顶掉后置为 True，结果直接丢弃
+        self.signals = QuerySignals()
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.ticket, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.ticket, result)
+
+
+class QueryWorker(QObject):
+    """按「通道」管理后台查询：同一个通道只保留最新的请求，旧请求还没开始就撤掉，已经在跑的结果丢弃"""
+    busy_changed = pyqtSignal(bool)  # 有/没有查询在跑，界面用来显示「加载中」
+
+    def __init__(self, parent=None, max_threads=QUERY_THREADS):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._tickets = itertools.count(1)
+        self._latest = {}  # 通道名 -> 最新的任务编号
+        self._pending = {}  # 任务编号 -> (通道名, 任务, 成功回调, 失败回调)
+
+    def submit(self, channel, fn, *args, on_result=None, on_error=None, priority=0, **kwargs):
+        """在后台执行 fn(*args, **kwargs)，完成后在界面线程里调用 on_result(结果) 或 on_error(错误信息)"""
+        self.cancel(channel)
+        ticket = next(self._tickets)
+        task = QueryTask(ticket, fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        was_idle = not self._pending
+        self._latest[channel] = ticket
+        self._pending[ticket] = (channel, task, on_result, on_error)
+        self.pool.start(task, priority)
+        if was_idle:
+            self.busy_changed.emit(True)
+        return ticket
+
+    def cancel(self, channel):
+        """作废某个通道上还没返回的请求（比如用户已经点了别的行、或者窗口已经关了）"""
+        ticket = self._latest.pop(channel, None)
+        if ticket is None or ticket not in self._pending:
+            return
+        task = self._pending[ticket][1]
+        task.cancelled = True
+        if self.pool.tryTake(task):  # 还在排队的直接从线程池里拿掉
+            self._finish(ticket)
+
+    def is_pending(self, channel):
+        return channel in self._latest
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, ticket, result):
+        entry = self._finish(ticket)
+        if entry is None or entry[1].cancelled:
+            return
+        if entry[2] is not None:
+            entry[2](result)
+
+    @pyqtSlot(int, str)
+    def _on_failed(self, ticket, message):
+        entry = self._finish(ticket)
+        if entry is None or entry[1].cancelled:
+            return
+        if entry[3] is not None:
+            entry[3](message)
+        else:
+            print(f"后台查询失败：{message}")
+
+    def _finish(self, ticket):
+        entry = self._pending.pop(ticket, None)
+        if entry is not None and self._latest.get(entry[0]) == ticket:
+            del self._latest[entry[0]]
+        if entry is not None and not self._pending:
+            self.busy_changed.emit(False)
+        return entry
+
+
+_worker = None
+
+
+def query_worker():
+    """全程序共用一个后台查询线程池（第一次用的时候才创建）"""
+    global _worker
+    if _worker is None:
+        _worker = QueryWorker()
+    return _worker
+
+
+JOURNAL_CHANNEL = "journal_flush"  # 本地写入日志同步到 MySQL 用的通道
+JOURNAL_RETRY_MIN = 2000           # 同步失败后第一次重试等 2 秒，之后每次翻倍
+JOURNAL_RETRY_MAX = 60000          # 最多等 1 分钟重试一次
+JOURNAL_CHECK_INTERVAL = 30000     # 平时每 30 秒看一眼有没有没同步的（比如上次退出时留下的）
+
+
+class JournalFlusher(QObject):
+    """在后台把本地写入日志（journal.py）重放到 MySQL：有新写入马上同步，失败了按间隔翻倍重试
+    用自己的单线程 QueryWorker：日志按顺序一批一批写，不占界面查询的线程，也不触发「加载中」提示"""
+    state_changed = pyqtSignal(int, int, str)  # (待同步条数, 失败条数, 最近一次同步出错的原因，没出错是空串)
+    synced = pyqtSignal(list)  # 刚同步成功的日志条目
+    failed = pyqtSignal(list)  # 数据有问题、写不进去的 [(日志条目, 错误信息)]
+
+    def __init__(self, journal, parent=None):
+        super().__init__(parent)
+        self.journal = journal
+        self.worker = QueryWorker(self, max_threads=1)
+        self.retry_delay = JOURNAL_RETRY_MIN
+        self.last_error = ""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(0)  # 程序启动后先把上次没同步完的补上
+
+    def append(self, kind, client_id, params):
+        """写入本地日志（落盘后返回编号），然后马上开始同步"""
+        seq = self.journal.append(kind, client_id, params)
+        self.emit_state()
+        self.flush()
+        return seq
+
+    def flush(self):
+        if self.worker.is_pending(JOURNAL_CHANNEL):
+            return  # 上一批还在写，写完会接着同步
+        self.timer.stop()
+        from journal import flush_journal
+        self.worker.submit(JOURNAL_CHANNEL, flush_journal, self.journal,
+                              on_result=self._on_flushed, on_error=self._on_flush_failed)
+
+    def emit_state(self):
+        counts = self.journal.counts()
+        self.state_changed.emit(counts.get("pending", 0), counts.get("failed", 0), self.last_error)
+
+    def _on_flushed(self, result):
+        synced, failed = result
+        self.retry_delay = JOURNAL_RETRY_MIN
+        self.last_error = ""
+        if synced:
+            self.synced.emit(synced)
+        if failed:
+            self.failed.emit(failed)
+        self.emit_state()
+        if synced or failed:
+            self.timer.start(0)  # 可能还有下一批
+        else:
+            self.timer.start(JOURNAL_CHECK_INTERVAL)
+
+    def _on_flush_failed(self, message):
+        self.last_error = message
+        self.emit_state()
+        self.timer.start(self.retry_delay)
+        self.retry_delay = min(self.retry_delay * 2, JOURNAL_RETRY_MAX)
+
+
+_flusher = None
+
+
+def journal_flusher():
+    """全程序共用一个日志同步器（第一次用的时候才打开本地日志）"""
+    global _flusher
+    if _flusher is None:
+        from journal import write_journal
+        _flusher = JournalFlusher(write_journal())
+    return _flusher
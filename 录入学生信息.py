@@ -9,17 +9,14 @@ from PyQt5.QtCore import Qt
 # 3. 导入数据处理和 MySQL 相关库
 import pandas as pd
 import pymysql
-from sqlalchemy import create_engine, text  # 新增 text 函数
+from sqlalchemy import text  # 新增 text 函数
+# 4. MySQL 连接配置在 db.py 里统一管理（主机、用户、密码可以用环境变量改）
+from db import get_engine
+# 建表由 migrations.py 统一管理（按版本号升级）
+from migrations import STUDENT_MIGRATIONS, run_migrations
 
-# 4. MySQL 连接配置（必须改成你的真实信息！）
-MYSQL_HOST = "localhost"       # 本地 MySQL 地址（默认都是 localhost，不用改）
-MYSQL_USER = "root"            # 你的 MySQL 用户名（默认一般是 root，插件里能看到）
-MYSQL_PASSWORD = "123456"  # 替换成你安装 MySQL 时的密码（比如 123456）
 MYSQL_DB = "student"        # 咱们之前创建的数据库名（必须和这个一致）
 
-# 5. 创建 MySQL 连接通道（engine）
-engine = create_engine(f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}")
-
 # 6. 定义主窗口类（所有功能都写在这个类里）
 class StudentInfoApp(QMainWindow):
     def __init__(self):
@@ -97,33 +94,10 @@ class StudentInfoApp(QMainWindow):
 
     # 把这段代码写在 StudentInfoApp 类里（紧跟在 init_ui 方法后面）
     def create_table(self):
+        """建表交给 migrations.py：数据库已经是最新版本时只查一次版本号"""
         try:
-            with engine.connect() as conn:
-                check_sql = text("""
-                SELECT TABLE_NAME 
-                FROM information_schema.TABLES 
-                WHERE TABLE_SCHEMA = :db_name  -- 数据库名（student_db）
-                  AND TABLE_NAME = :table_name  -- 表名（student_info）
-            """)
-            # 传递参数（避免 SQL 注入，更规范）
-                result = conn.execute(
-                    check_sql,
-                    {"db_name": MYSQL_DB, "table_name": "student_info"}
-            ).fetchone()  # fetchone()：有结果返回表名，无结果返回 None
-
-                # 1. 定义SQL语句（确保格式正确，无多余符号）
-            if result is None:   
-                create_sql = """
-    CREATE TABLE IF NOT EXISTS student_info (
-    学号 CHAR(4) PRIMARY KEY,
-    姓名 VARCHAR(20) NOT NULL,
-    年龄 INT NOT NULL,
-    班级 VARCHAR(20) NOT NULL
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """
-                # 2. 用 text() 包装SQL，转为可执行对象
-                conn.execute(text(create_sql.strip()))
-                conn.commit()
+            applied = run_migrations(get_engine(MYSQL_DB), STUDENT_MIGRATIONS)
+            if 1 in applied:
                 QMessageBox.information(self, "建表成功", "student_info表创建成功！")
         except Exception as e:
             QMessageBox.critical(self, "建表失败", f"建表失败原因：{str(e)}")
@@ -131,7 +105,7 @@ class StudentInfoApp(QMainWindow):
     def load_data(self):
         try:
             # 用 text() 包装查询SQL
-            self.df = pd.read_sql(text("SELECT * FROM student_info"), engine)
+            self.df = pd.read_sql(text("SELECT * FROM student_info"), get_engine(MYSQL_DB))
             self.update_table()
         except Exception as e:
             self.df = pd.DataFrame(columns=["学号", "姓名", "年龄", "班级"])
@@ -197,7 +171,7 @@ class StudentInfoApp(QMainWindow):
             # df.to_sql() 本质是执行 SQL：INSERT INTO student_info (...) VALUES (...)
             new_data.to_sql(
                 name="student_info",  # 要写入的表名
-                con=engine,           # 连接通道
+                con=get_engine(MYSQL_DB),  # 连接通道
                 if_exists="append",   # 追加数据（不覆盖已有数据）
                 index=False           # 不把 DataFrame 的索引写入 MySQL（避免多一列）
             )